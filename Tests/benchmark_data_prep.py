@@ -0,0 +1,165 @@
+"""
+Benchmarks des fonctions chaudes de prepare_data sur des jeux COCO synthétiques.
+
+    python Tests/benchmark_data_prep.py --sizes 1000 10000 --output bench.json
+    python Tests/benchmark_data_prep.py --compare Tests/benchmark_baseline.json
+
+Les résultats (temps médian en secondes) sont écrits en JSON ; --compare signale
+les benchmarks plus lents que la référence au-delà de --tolerance et sort en erreur.
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+from prepare_data.data_loader import load_coco_json
+from prepare_data.data_explorer import bbox_issues, bbox_stats
+from prepare_data.data_cleaner import clean_annotations, get_images_without_annotations
+from prepare_data.coco_stream import iter_coco_chunks
+from prepare_data.data_preparation import (
+    build_file_index,
+    materialize_split,
+    prepare_dirs,
+    split_dataset,
+    stratified_split,
+    stratify_keys,
+)
+from prepare_data.synthetic import write_synthetic_dataset
+
+
+BASELINE_FILE = Path(__file__).resolve().parent / "benchmark_baseline.json"
+DEFAULT_SIZES = [1_000, 10_000]
+
+
+def timeit(func, repeat: int) -> float:
+    """Temps médian d'exécution de func sur repeat essais."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run_size(n_images: int, repeat: int, max_image_files: int) -> dict:
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_prepare_data_"))
+    try:
+        write_images = n_images <= max_image_files
+        data_dir = work_dir / "data"
+        json_file = write_synthetic_dataset(data_dir, n_images, write_images=write_images)
+        results = {}
+
+        results["load_coco_json"] = timeit(lambda: load_coco_json(json_file, use_cache=False), repeat)
+        load_coco_json(json_file)  # remplit le cache
+        results["load_coco_json_cached"] = timeit(lambda: load_coco_json(json_file), repeat)
+
+        images_df, annotations_df, _ = load_coco_json(json_file)
+        results["bbox_stats"] = timeit(lambda: bbox_stats(annotations_df), repeat)
+        results["bbox_issues"] = timeit(lambda: bbox_issues(annotations_df, images_df), repeat)
+        results["clean_annotations"] = timeit(lambda: clean_annotations(annotations_df, images_df), repeat)
+
+        # Découpage stratifié sur tableaux (hors construction des tableaux)
+        positions = images_df.reset_index(drop=True).reset_index().set_index('id')['index']
+        box_images = positions.reindex(annotations_df['image_id']).to_numpy()
+        box_rel_areas = (annotations_df['w'] * annotations_df['h']).to_numpy() / (640 * 640)
+        box_categories = annotations_df['category_id'].to_numpy()
+        results["stratified_split"] = timeit(lambda: stratified_split(
+            stratify_keys(len(images_df), box_images, box_rel_areas, box_categories)), repeat)
+        results["get_images_without_annotations"] = timeit(
+            lambda: get_images_without_annotations(data_dir, json_file), repeat)
+
+        if write_images:
+            images_info, annotations_per_image = {}, {}
+            for section, chunk in iter_coco_chunks(json_file, sections=("images", "annotations")):
+                if section == "images":
+                    images_info.update((img["id"], img) for img in chunk)
+                else:
+                    for ann in chunk:
+                        annotations_per_image.setdefault(ann["image_id"], []).append(ann)
+
+            def split_and_copy():
+                output_dir = work_dir / "dataset"
+                shutil.rmtree(output_dir, ignore_errors=True)
+                prepare_dirs(output_dir)
+                file_index = build_file_index(data_dir)
+                dataset_split = split_dataset(list(images_info.values()))
+                materialize_split(dataset_split, file_index, annotations_per_image, output_dir,
+                                  mode="copy", incremental=False)
+            results["split_and_copy"] = timeit(split_and_copy, repeat)
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).resolve().parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Liste des benchmarks plus lents que baseline * tolerance."""
+    regressions = []
+    for size, benches in results["results"].items():
+        for name, seconds in benches.items():
+            reference = baseline["results"].get(size, {}).get(name)
+            if reference is None:
+                continue
+            ratio = seconds / reference if reference else float("inf")
+            flag = "  <-- régression" if ratio > tolerance else ""
+            print(f"{size:>8} {name:<32} {reference:9.4f}s -> {seconds:9.4f}s  x{ratio:5.2f}{flag}")
+            if ratio > tolerance:
+                regressions.append(f"{size}/{name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="nombre d'images synthétiques")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-image-files", type=int, default=20_000,
+                        help="au-delà, pas de fichiers JPEG (le benchmark split/copie est ignoré)")
+    parser.add_argument("--output", type=Path, help="fichier JSON des résultats")
+    parser.add_argument("--compare", type=Path, help="fichier de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {},
+    }
+    for size in args.sizes:
+        print(f"--- {size} images ---")
+        results["results"][str(size)] = run_size(size, args.repeat, args.max_image_files)
+        for name, seconds in results["results"][str(size)].items():
+            print(f"{name:<32} {seconds:9.4f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\n--- Comparaison avec {baseline.get('commit')} ---")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Régressions : {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
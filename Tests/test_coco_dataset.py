@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import json
+from prepare_data.coco_dataset import CocoDataset
+from prepare_data.data_cleaner import get_images_without_annotations, save_coco_json
+
+# === Faux fichier COCO ===
+@pytest.fixture
+def coco_file(tmp_path):
+    json_file = tmp_path / "_annotations.coco.json"
+    coco_dict = {
+        "images": [
+            {"id": 1, "file_name": "img1.jpg", "width": 100, "height": 100},
+            {"id": 2, "file_name": "img2.jpg", "width": 50, "height": 50},
+            {"id": 3, "file_name": "img3.jpg", "width": 200, "height": 200},
+        ],
+        "annotations": [
+            {"id": 10, "image_id": 1, "category_id": 1, "bbox": [0, 0, 50, 50]},
+            {"id": 11, "image_id": 2, "category_id": 1, "bbox": [5, 5, 0, 20]},
+            {"id": 12, "image_id": 1, "category_id": 2, "bbox": [10, 10, 20, 20]},
+        ],
+        "categories": [
+            {"id": 1, "name": "fire"},
+            {"id": 2, "name": "smoke"},
+        ],
+    }
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(coco_dict, f)
+    for name in ["img1.jpg", "img2.jpg", "img3.jpg"]:
+        (tmp_path / name).touch()
+    return json_file
+
+# === Tests ===
+
+def test_indexes_are_built(coco_file):
+    dataset = CocoDataset.from_json(coco_file)
+    assert len(dataset) == 3
+    assert dataset.file_name_index["img2.jpg"] == 2
+    assert dataset.category_index == {1: "fire", 2: "smoke"}
+    assert dataset.image(3)["file_name"] == "img3.jpg"
+
+def test_annotations_for_groups_by_image(coco_file):
+    dataset = CocoDataset.from_json(coco_file)
+    assert set(dataset.annotations_for(1)["id"]) == {10, 12}
+    assert dataset.annotations_for(3).empty
+    assert dataset.annotated_image_ids() == {1, 2}
+
+def test_get_images_without_annotations_accepts_dataset(coco_file):
+    dataset = CocoDataset.from_json(coco_file)
+    from_dataset = get_images_without_annotations(coco_file.parent, dataset)
+    from_json = get_images_without_annotations(coco_file.parent, coco_file)
+    assert sorted(from_dataset) == sorted(from_json) == ["img3.jpg"]
+
+def test_bbox_is_loaded_as_float32_columns(coco_file):
+    dataset = CocoDataset.from_json(coco_file)
+    annotations = dataset.annotations_df
+    assert "bbox" not in annotations.columns
+    for col in ["x", "y", "w", "h", "area"]:
+        assert annotations[col].dtype == "float32"
+    assert annotations["area"].tolist() == [2500.0, 0.0, 400.0]
+
+def test_save_coco_json_restores_bbox(coco_file, tmp_path):
+    dataset = CocoDataset.from_json(coco_file)
+    out = tmp_path / "clean.json"
+    save_coco_json(dataset.images_df, dataset.annotations_df, [], out)
+    with open(out, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["annotations"][0]["bbox"] == [0, 0, 50, 50]
+    assert "x" not in saved["annotations"][0]
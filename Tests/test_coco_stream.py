@@ -0,0 +1,105 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import json
+from prepare_data.coco_stream import iter_coco_chunks, iter_coco_section
+from prepare_data.data_loader import iter_coco_frames, load_coco_json
+
+# === Faux fichier COCO avec sections annexes ===
+@pytest.fixture
+def coco_file(tmp_path):
+    json_file = tmp_path / "_annotations.coco.json"
+    coco_dict = {
+        "info": {"year": "2024", "description": "fires"},
+        "licenses": [{"id": 1, "name": "CC BY 4.0"}],
+        "categories": [{"id": 0, "name": "fire"}],
+        "images": [{"id": i, "file_name": f"img{i}.jpg", "width": 640, "height": 640}
+                   for i in range(25)],
+        "annotations": [{"id": i, "image_id": i % 25, "category_id": 0,
+                         "bbox": [1.5, 2, 10, 20.25], "area": 202.5, "segmentation": []}
+                        for i in range(40)],
+    }
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(coco_dict, f, indent=2)
+    return json_file, coco_dict
+
+def test_iter_coco_section_yields_chunks(coco_file):
+    json_file, coco_dict = coco_file
+    chunks = list(iter_coco_section(json_file, "annotations", chunk_size=16))
+    assert [len(c) for c in chunks] == [16, 16, 8]
+    assert [a for c in chunks for a in c] == coco_dict["annotations"]
+
+def test_small_read_size_matches_json_load(coco_file, monkeypatch):
+    # Des blocs minuscules forcent des coupures au milieu des nombres et des chaînes
+    monkeypatch.setattr("prepare_data.coco_stream.READ_SIZE", 7)
+    json_file, coco_dict = coco_file
+    sections = {}
+    for section, chunk in iter_coco_chunks(json_file, chunk_size=5):
+        sections.setdefault(section, []).extend(chunk)
+    for key in ("images", "annotations", "categories"):
+        assert sections[key] == coco_dict[key]
+
+def test_iter_coco_frames_expands_bbox(coco_file):
+    json_file, _ = coco_file
+    frames = list(iter_coco_frames(json_file, "annotations", chunk_size=30))
+    assert [len(f) for f in frames] == [30, 10]
+    assert frames[0]["h"].iloc[0] == pytest.approx(20.25)
+
+def test_load_coco_json_concatenates_chunks(coco_file):
+    json_file, _ = coco_file
+    images_df, annotations_df, categories_df = load_coco_json(json_file, chunk_size=7)
+    assert len(images_df) == 25
+    assert len(annotations_df) == 40
+    assert annotations_df.index.tolist() == list(range(40))
+    assert categories_df["name"].tolist() == ["fire"]
+
+def test_empty_object(tmp_path):
+    json_file = tmp_path / "empty.json"
+    json_file.write_text("{}")
+    assert list(iter_coco_chunks(json_file)) == []
+
+def test_load_coco_json_uses_cache(coco_file, tmp_path, monkeypatch):
+    json_file, _ = coco_file
+    cache_dir = tmp_path / "cache"
+    first = load_coco_json(json_file, cache_dir=cache_dir)
+    assert (cache_dir / json_file.name / "manifest.json").is_file()
+
+    # Le second chargement ne doit pas reparser le JSON
+    def fail(*args, **kwargs):
+        raise AssertionError("JSON reparsé malgré le cache")
+    monkeypatch.setattr("prepare_data.data_loader.iter_coco_chunks", fail)
+    second = load_coco_json(json_file, cache_dir=cache_dir)
+    for before, after in zip(first, second):
+        assert before.columns.tolist() == after.columns.tolist()
+        assert before.astype(str).equals(after.astype(str))
+    assert second[1]["x"].dtype == "float32"
+    assert second[1]["segmentation"].iloc[0] == []
+
+def test_cache_invalidated_when_file_changes(coco_file, tmp_path):
+    json_file, coco_dict = coco_file
+    cache_dir = tmp_path / "cache"
+    load_coco_json(json_file, cache_dir=cache_dir)
+    coco_dict["images"] = coco_dict["images"][:3]
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(coco_dict, f)
+    images_df, _, _ = load_coco_json(json_file, cache_dir=cache_dir)
+    assert len(images_df) == 3
+
+def test_cache_stores_variable_length_columns_compactly(coco_file, tmp_path):
+    json_file, coco_dict = coco_file
+    coco_dict["images"][0]["file_name"] = "incendie_é.jpg"
+    coco_dict["annotations"][0]["segmentation"] = [[float(i) for i in range(10_000)]]
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(coco_dict, f)
+    cache_dir = tmp_path / "cache"
+    load_coco_json(json_file, cache_dir=cache_dir)
+    # Une seule longue segmentation ne doit pas élargir toutes les lignes
+    cache_size = sum(p.stat().st_size for p in (cache_dir / json_file.name).iterdir())
+    assert cache_size < 2 * json_file.stat().st_size
+
+    images_df, annotations_df, _ = load_coco_json(json_file, cache_dir=cache_dir)
+    assert images_df["file_name"].iloc[0] == "incendie_é.jpg"
+    assert len(annotations_df["segmentation"].iloc[0][0]) == 10_000
+    assert annotations_df["segmentation"].iloc[1] == []
@@ -5,11 +5,13 @@ sys.path.append(str(Path(__file__).resolve().parent.parent))
 import pytest
 import pandas as pd
 import json
+import gzip
 from prepare_data.data_cleaner import (
     annotations_without_image,
     detect_bbox_anomalies,
     clean_annotations,
-    get_images_without_annotations
+    get_images_without_annotations,
+    save_coco_json
 )
 
 # === Faux DataFrames pour tests sur annotations/images existantes ===
@@ -90,3 +92,63 @@ def test_get_images_without_annotations_empty_folder(tmp_path):
         json.dump({"images": [], "annotations": []}, f)
     result = get_images_without_annotations(tmp_path, json_file)
     assert len(result) == 0
+
+# === Équivalence avec l'ancienne version quadratique (le temps est mesuré dans benchmark_data_prep.py) ===
+def _get_images_without_annotations_quadratic(images_folder, json_file):
+    with open(json_file, "r", encoding="utf-8") as f:
+        coco = json.load(f)
+    annotated = {
+        img["file_name"]
+        for img in coco.get("images", [])
+        if any(ann["image_id"] == img["id"] for ann in coco.get("annotations", []))
+    }
+    all_images = {p.name for p in Path(images_folder).glob("*.jpg")}
+    return list(all_images - annotated)
+
+def test_get_images_without_annotations_matches_quadratic_version(tmp_path):
+    n_images, n_annotations = 1500, 3000
+    images = [{"id": i, "file_name": f"img{i}.jpg"} for i in range(n_images)]
+    # Les annotations ne couvrent qu'une image sur deux
+    annotations = [{"id": k, "image_id": (k * 2) % n_images, "bbox": [0, 0, 1, 1]}
+                   for k in range(n_annotations)]
+    json_file = tmp_path / "annotations.json"
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump({"images": images, "annotations": annotations}, f)
+    for img in images:
+        (tmp_path / img["file_name"]).touch()
+
+    fast = get_images_without_annotations(tmp_path, json_file)
+    slow = _get_images_without_annotations_quadratic(tmp_path, json_file)
+    assert sorted(fast) == sorted(slow)
+    assert len(fast) == n_images // 2
+
+# === Tests pour save_coco_json ===
+@pytest.mark.parametrize("compact", [False, True])
+def test_save_coco_json_roundtrip(tmp_path, compact):
+    out = tmp_path / "clean.json"
+    save_coco_json(df_images, df_annotations, [{"id": 1, "name": "fire"}], out,
+                   compact=compact, chunk_size=2)
+    with open(out, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["images"] == df_images.to_dict(orient="records")
+    assert [a["bbox"] for a in saved["annotations"]] == df_annotations["bbox"].tolist()
+    assert saved["categories"] == [{"id": 1, "name": "fire"}]
+    assert ("\n" in out.read_text()) != compact
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_save_coco_json_exact_chunk_multiple(tmp_path, compact):
+    # Sections dont la taille est un multiple exact de chunk_size : pas de virgule finale
+    out = tmp_path / "clean.json"
+    save_coco_json(df_images.iloc[:2], df_annotations.iloc[:2], [{"id": 1, "name": "fire"}], out,
+                   compact=compact, chunk_size=2)
+    with open(out, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["images"] == df_images.iloc[:2].to_dict(orient="records")
+    assert len(saved["annotations"]) == 2
+
+def test_save_coco_json_gzip_and_empty_frames(tmp_path):
+    out = tmp_path / "clean.json.gz"
+    save_coco_json(df_images.iloc[:0], df_annotations.iloc[:0], [], out, compact=True)
+    with gzip.open(out, "rt", encoding="utf-8") as f:
+        assert json.load(f) == {"images": [], "annotations": [], "categories": []}
+    assert list(tmp_path.iterdir()) == [out]
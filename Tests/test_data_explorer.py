@@ -3,6 +3,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 import pytest
+import subprocess
 import pandas as pd
 from prepare_data.data_explorer import (
     annotations_per_image,
@@ -62,3 +63,55 @@ def test_bbox_issues_detects_invalid():
     result = bbox_issues(df_annotations, df_images)
     assert len(result) == 1
     assert result.iloc[0]["bbox"] == [5, 5, 0, 20]
+
+# === Import sans effet de bord ===
+IMPORT_SCRIPT = """
+import sys, time
+opened = []
+sys.addaudithook(lambda event, args: opened.append(str(args[0])) if event == "open" else None)
+import numpy, pandas, PIL  # dépendances lourdes exclues de la mesure
+start = time.perf_counter()
+import prepare_data.pipeline
+elapsed = time.perf_counter() - start
+json_opened = [path for path in opened if path.endswith(".json")]
+print(elapsed, len(json_opened))
+"""
+
+def test_import_pipeline_is_fast_and_reads_no_json():
+    root = Path(__file__).resolve().parent.parent
+    out = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=root,
+                         capture_output=True, text=True, check=True)
+    elapsed, json_opened = out.stdout.split()
+    assert int(json_opened) == 0
+    assert float(elapsed) < 0.5
+
+def test_lazy_frames_are_loaded_on_access(monkeypatch):
+    import prepare_data.data_explorer as data_explorer
+    import prepare_data.pipeline as pipeline
+
+    class FakeDataset:
+        def frames(self):
+            return df_images, df_annotations, df_categories
+
+    monkeypatch.setattr(pipeline, "get_dataset", lambda json_file=None: FakeDataset())
+    for name in ("images_df", "annotations_df", "categories_df"):
+        monkeypatch.delitem(vars(data_explorer), name, raising=False)
+    assert data_explorer.images_df is df_images
+    assert data_explorer.categories_df is df_categories
+    for name in ("images_df", "annotations_df", "categories_df"):
+        vars(data_explorer).pop(name, None)
+
+def test_get_dataset_shares_one_cache_entry(monkeypatch):
+    import prepare_data.pipeline as pipeline
+    parses = []
+    monkeypatch.setattr(pipeline.CocoDataset, "from_json", classmethod(lambda cls, path: parses.append(path) or object()))
+    pipeline._load_dataset.cache_clear()
+    try:
+        relative = Path(pipeline.JSON_FILE.parent.name) / ".." / pipeline.JSON_FILE.parent.name / pipeline.JSON_FILE.name
+        monkeypatch.chdir(pipeline.BASE_DIR)
+        first = pipeline.get_dataset()
+        assert pipeline.get_dataset(pipeline.JSON_FILE) is first
+        assert pipeline.get_dataset(relative) is first
+        assert len(parses) == 1
+    finally:
+        pipeline._load_dataset.cache_clear()
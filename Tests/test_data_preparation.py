@@ -0,0 +1,201 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import os
+import numpy as np
+from prepare_data.data_preparation import (
+    SPLITS,
+    build_file_index,
+    build_split_labels,
+    convert_coco_to_yolo,
+    load_label_cache,
+    materialize_split,
+    place_file,
+    prepare_dirs,
+    split_dataset_stratified,
+    stratified_split,
+    stratify_keys,
+)
+
+# === Faux dossier Roboflow ===
+@pytest.fixture
+def dataset_dir(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    for name in ["a_jpg.rf.111.jpg", "b_rf.222.jpg", "c_rf.333.jpg"]:
+        (data / name).write_bytes(name.encode())
+    (data / "_annotations.coco.json").write_text("{}")
+    return data
+
+images = [
+    {"id": 1, "file_name": "a_jpg.rf.111.jpg", "width": 100, "height": 50},
+    {"id": 2, "file_name": "b_rf.999.jpg", "width": 100, "height": 100},  # hash différent
+    {"id": 3, "file_name": "missing_rf.444.jpg", "width": 100, "height": 100},
+]
+annotations_per_image = {
+    1: [{"image_id": 1, "category_id": 0, "bbox": [0, 0, 50, 25]}],
+}
+
+# === Tests ===
+
+def test_build_file_index_uses_roboflow_base_name(dataset_dir):
+    index = build_file_index(dataset_dir)
+    assert set(index) == {"a_jpg.rf.111.jpg", "b", "c"}
+    assert index["b"].endswith("b_rf.222.jpg")
+
+@pytest.mark.parametrize("mode", ["copy", "hardlink", "symlink", "reflink"])
+def test_place_file_modes(tmp_path, mode):
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"image")
+    dst = tmp_path / "dst.jpg"
+    dst.write_bytes(b"old")
+    place_file(str(src), str(dst), mode)
+    assert dst.read_bytes() == b"image"
+
+def test_materialize_split_copies_and_writes_labels(dataset_dir, tmp_path):
+    output = tmp_path / "dataset"
+    prepare_dirs(output)
+    split = {"train": images[:2], "val": images[2:], "test": []}
+    materialize_split(split, build_file_index(dataset_dir), annotations_per_image, output, workers=4)
+
+    train_images = sorted(os.listdir(output / "train" / "images"))
+    assert train_images == ["a_jpg.rf.111.jpg", "b_rf.222.jpg"]
+    label = (output / "train" / "labels" / "a_jpg.rf.111.txt").read_text()
+    assert label == "0 0.250000 0.250000 0.500000 0.500000\n"
+    assert (output / "train" / "labels" / "b_rf.222.txt").read_text() == ""
+    assert os.listdir(output / "val" / "images") == []
+
+def test_resplit_only_touches_moved_files(dataset_dir, tmp_path, monkeypatch):
+    output = tmp_path / "dataset"
+    prepare_dirs(output)
+    index = build_file_index(dataset_dir)
+    first = {"train": images[:2], "val": [], "test": []}
+    materialize_split(first, index, annotations_per_image, output, mode="hardlink")
+
+    placed = []
+    original_place_file = place_file
+    def counting_place_file(src, dst, mode):
+        placed.append(os.path.basename(dst))
+        original_place_file(src, dst, mode)
+    monkeypatch.setattr("prepare_data.data_preparation.place_file", counting_place_file)
+
+    # b passe de train à val, a ne bouge pas
+    second = {"train": images[:1], "val": images[1:2], "test": []}
+    materialize_split(second, index, annotations_per_image, output, mode="hardlink")
+    assert placed == ["b_rf.222.jpg"]
+    assert sorted(os.listdir(output / "train" / "images")) == ["a_jpg.rf.111.jpg"]
+    assert os.listdir(output / "val" / "labels") == ["b_rf.222.txt"]
+    assert os.path.samefile(output / "val" / "images" / "b_rf.222.jpg", dataset_dir / "b_rf.222.jpg")
+
+    # Aucun changement : aucune opération
+    placed.clear()
+    materialize_split(second, index, annotations_per_image, output, mode="hardlink")
+    assert placed == []
+
+def test_resplit_replaces_sources_edited_in_place(dataset_dir, tmp_path):
+    output = tmp_path / "dataset"
+    prepare_dirs(output)
+    index = build_file_index(dataset_dir)
+    split = {"train": images[:1], "val": [], "test": []}
+    materialize_split(split, index, annotations_per_image, output, mode="copy")
+    source = dataset_dir / "a_jpg.rf.111.jpg"
+    source.write_bytes(b"nouvelle version")
+    os.utime(source, ns=(0, 10**9))
+    materialize_split(split, index, annotations_per_image, output, mode="copy")
+    assert (output / "train" / "images" / "a_jpg.rf.111.jpg").read_bytes() == b"nouvelle version"
+
+def test_full_resplit_removes_files_from_previous_split(dataset_dir, tmp_path):
+    output = tmp_path / "dataset"
+    prepare_dirs(output)
+    index = build_file_index(dataset_dir)
+    materialize_split({"train": images[:2], "val": [], "test": []}, index, annotations_per_image, output)
+    (output / "test" / "images" / "orphan.jpg").write_bytes(b"x")  # hors manifeste
+
+    # --full : b passe en val, plus aucune copie ne reste dans train ni ailleurs
+    second = {"train": images[:1], "val": images[1:2], "test": []}
+    materialize_split(second, index, annotations_per_image, output, incremental=False)
+    assert os.listdir(output / "train" / "images") == ["a_jpg.rf.111.jpg"]
+    assert os.listdir(output / "train" / "labels") == ["a_jpg.rf.111.txt"]
+    assert os.listdir(output / "val" / "images") == ["b_rf.222.jpg"]
+    assert os.listdir(output / "test" / "images") == []
+
+def test_build_split_labels_matches_convert_coco_to_yolo():
+    imgs = [{"id": 1, "width": 640, "height": 480}, {"id": 2, "width": 10, "height": 10},
+            {"id": 3, "width": 320, "height": 320}]
+    anns = {
+        1: [{"category_id": 0, "bbox": [10, 20, 30, 40]}, {"category_id": 1, "bbox": [0, 0, 640, 480]}],
+        3: [{"category_id": 1, "bbox": [1.5, 2.5, 3, 4]}],
+    }
+    labels, offsets = build_split_labels(imgs, anns)
+    assert offsets.tolist() == [0, 2, 2, 3]
+    expected = [convert_coco_to_yolo(ann, img["width"], img["height"])
+                for img in imgs for ann in anns.get(img["id"], [])]
+    assert labels.ravel().tolist() == pytest.approx([v for row in expected for v in row])
+
+def test_materialize_split_writes_label_cache(dataset_dir, tmp_path):
+    output = tmp_path / "dataset"
+    prepare_dirs(output)
+    split = {"train": images[:2], "val": [], "test": []}
+    materialize_split(split, build_file_index(dataset_dir), annotations_per_image, output, label_cache=True)
+    files, labels, offsets = load_label_cache(output / "train" / "labels.npz")
+    assert files == ["a_jpg.rf.111.jpg", "b_rf.222.jpg"]
+    assert offsets.tolist() == [0, 1, 1]
+    assert labels[0].tolist() == [0, 0.25, 0.25, 0.5, 0.5]
+
+def make_coco_split_input(n, seed=0):
+    rng = np.random.default_rng(seed)
+    images = [{"id": i, "file_name": f"img{i}.jpg", "width": 640, "height": 640} for i in range(n)]
+    annotations = {}
+    for i in range(n):
+        k = int(rng.poisson(2))
+        size = 10 if i % 3 else 200  # un tiers d'images à grandes boxes
+        annotations[i] = [{"image_id": i, "category_id": int(rng.integers(1, 3)), "bbox": [0, 0, size, size]}
+                          for _ in range(k)]
+    return images, annotations
+
+def test_stratified_split_is_deterministic_and_balanced():
+    images, annotations = make_coco_split_input(3000)
+    split, quality = split_dataset_stratified(images, annotations)
+    again, _ = split_dataset_stratified(images, annotations)
+    assert {k: [img["id"] for img in v] for k, v in split.items()} == \
+        {k: [img["id"] for img in v] for k, v in again.items()}
+    assert sum(len(v) for v in split.values()) == 3000
+    for name, fraction in SPLITS.items():
+        assert abs(len(split[name]) - fraction * 3000) <= 3
+    # Distributions proches d'un split à l'autre
+    assert quality["boxes_per_image"].max() - quality["boxes_per_image"].min() < 0.1
+    assert quality["empty_share"].max() - quality["empty_share"].min() < 0.02
+    assert quality["category_1_share"].max() - quality["category_1_share"].min() < 0.05
+
+def test_stratified_split_strata_are_spread():
+    # 50 strates de 10 unités : chacune est répartie 7/2/1 à une unité près
+    strata = np.repeat(np.arange(50), 10)
+    assignment = stratified_split(strata)
+    for stratum in range(50):
+        counts = np.bincount(assignment[strata == stratum], minlength=3)
+        assert np.abs(counts - np.array([7, 2, 1])).max() <= 1
+
+def test_stratify_keys_buckets():
+    # image 0 : vide ; image 1 : 1 petite box cat 1 ; image 2 : 3 grandes boxes cat 2 (majoritaire)
+    keys = stratify_keys(3, [1, 2, 2, 2], [0.001, 0.2, 0.3, 0.1], [1, 2, 2, 1])
+    assert len(set(keys.tolist())) == 3
+    same = stratify_keys(2, [0, 1], [0.001, 0.001], [1, 1])
+    assert same[0] == same[1]
+
+def test_stratify_keys_same_dominant_category_on_both_paths(monkeypatch):
+    rng = np.random.default_rng(3)
+    n_units, n_boxes = 500, 3000
+    args = (n_units, rng.integers(0, n_units, n_boxes), rng.random(n_boxes) * 0.1, rng.integers(0, 4, n_boxes))
+    dense = stratify_keys(*args)
+    monkeypatch.setattr("prepare_data.data_preparation.MAX_COUNT_MATRIX", 0)  # chemin par paires triées
+    np.testing.assert_array_equal(stratify_keys(*args), dense)
+
+def test_stratified_split_keeps_groups_together():
+    images, annotations = make_coco_split_input(400, seed=1)
+    groups = [i // 4 for i in range(400)]
+    split, _ = split_dataset_stratified(images, annotations, groups)
+    owner = {img["id"] // 4: name for name, members in split.items() for img in members}
+    for name, members in split.items():
+        assert all(owner[img["id"] // 4] == name for img in members)
@@ -0,0 +1,124 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import json
+import pytest
+import numpy as np
+import pandas as pd
+from prepare_data.coco_dataset import CocoDataset
+from prepare_data.data_explorer import bbox_issues, bbox_stats, images_per_category
+from prepare_data.data_loader import expand_bbox
+from prepare_data.dataset_stats import DatasetStats, QuantileSketch, RELATIVE_ACCURACY
+from prepare_data.pipeline import explorer
+from prepare_data.synthetic import generate_coco
+
+
+# === Faux dataset ===
+@pytest.fixture
+def coco():
+    return generate_coco(500, n_categories=3, seed=3)
+
+@pytest.fixture
+def frames(coco):
+    images_df = pd.DataFrame(coco["images"])
+    annotations_df = expand_bbox(pd.DataFrame(coco["annotations"]))
+    return images_df, annotations_df, pd.DataFrame(coco["categories"])
+
+# === Tests ===
+
+def test_quantile_sketch_relative_accuracy():
+    values = np.random.default_rng(0).lognormal(3, 1, size=20_000)
+    sketch = QuantileSketch()
+    sketch.add(values)
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+        assert sketch.quantile(q) == pytest.approx(np.quantile(values, q, method="lower"), rel=RELATIVE_ACCURACY)
+    assert sketch.mean() == pytest.approx(values.mean())
+    assert sketch.std() == pytest.approx(values.std(ddof=1))
+    assert sketch.histogram().sum() == len(values)
+
+def test_matches_data_explorer(frames):
+    images_df, annotations_df, categories_df = frames
+    stats = DatasetStats.from_frames(images_df, annotations_df, categories_df, chunk_size=97)
+
+    expected = bbox_stats(annotations_df)
+    result = stats.bbox_stats()
+    for row in ["count", "mean", "std", "min", "max"]:
+        np.testing.assert_allclose(result.loc[row], expected.loc[row], rtol=1e-5)
+    np.testing.assert_allclose(result.loc["50%"], expected.loc["50%"], rtol=2 * RELATIVE_ACCURACY)
+
+    issues = bbox_issues(annotations_df, images_df)
+    assert sorted(stats.invalid_annotation_ids) == sorted(issues["id_ann"].tolist())
+    assert stats.images_per_category().values.tolist() == \
+        images_per_category(annotations_df, categories_df).values.tolist()
+    per_image = annotations_df.groupby("image_id").size()
+    assert stats.annotations_per_image()["num_annotations"].tolist() == per_image.tolist()
+    assert set(stats.images_without_annotations().tolist()) == set(images_df["id"]) - set(per_image.index)
+
+def test_merge_of_shards_equals_single_pass(frames):
+    images_df, annotations_df, categories_df = frames
+    full = DatasetStats.from_frames(images_df, annotations_df, categories_df)
+
+    # Chaque worker connaît toutes les images mais seulement une partie des annotations
+    shards = np.array_split(np.random.default_rng(1).permutation(len(annotations_df)), 3)
+    parts = [DatasetStats.from_frames(images_df, annotations_df.iloc[idx], categories_df) for idx in shards]
+    merged = parts[0].merge(parts[1]).merge(parts[2])
+
+    pd.testing.assert_frame_equal(merged.bbox_stats(), full.bbox_stats())
+    pd.testing.assert_frame_equal(merged.per_category(), full.per_category())
+    pd.testing.assert_frame_equal(merged.annotations_per_image(), full.annotations_per_image())
+    assert merged.num_images == full.num_images == len(images_df)
+    assert sorted(merged.invalid_annotation_ids) == sorted(full.invalid_annotation_ids)
+
+def test_merge_rejects_annotations_split_from_their_images(frames):
+    images_df, annotations_df, categories_df = frames
+    # Partition par image : fusion exacte
+    ids = images_df["id"].to_numpy()
+    halves = [ids[: len(ids) // 2], ids[len(ids) // 2:]]
+    parts = [DatasetStats.from_frames(images_df[images_df["id"].isin(h)],
+                                      annotations_df[annotations_df["image_id"].isin(h)], categories_df)
+             for h in halves]
+    full = DatasetStats.from_frames(images_df, annotations_df, categories_df)
+    pd.testing.assert_frame_equal(parts[0].merge(parts[1]).per_category(), full.per_category())
+
+    # Annotations d'un worker dont les images sont chez l'autre : refusé
+    wrong = [DatasetStats.from_frames(images_df[images_df["id"].isin(halves[0])], annotations_df, categories_df),
+             DatasetStats.from_frames(images_df[images_df["id"].isin(halves[1])], annotations_df.iloc[:0])]
+    with pytest.raises(ValueError):
+        wrong[0].merge(wrong[1])
+
+def test_from_json_single_pass(tmp_path, coco, frames):
+    json_file = tmp_path / "_annotations.coco.json"
+    json_file.write_text(json.dumps(coco))
+    stats = DatasetStats.from_json(json_file, chunk_size=50)
+    expected = DatasetStats.from_frames(*frames)
+    pd.testing.assert_frame_equal(stats.per_category(), expected.per_category())
+    assert stats.category_names[1] == "fire_1"
+
+def test_from_json_annotations_before_images(tmp_path, coco, frames):
+    json_file = tmp_path / "_annotations.coco.json"
+    reordered = {"annotations": coco["annotations"], "categories": coco["categories"], "images": coco["images"]}
+    json_file.write_text(json.dumps(reordered))
+    stats = DatasetStats.from_json(json_file, chunk_size=50)
+    expected = DatasetStats.from_frames(*frames)
+    assert stats.annotations_without_image == expected.annotations_without_image
+    pd.testing.assert_frame_equal(stats.per_category(), expected.per_category())
+    stats.merge(DatasetStats())  # pas d'orphelins fictifs : la fusion est acceptée
+
+def test_annotations_without_image_are_counted():
+    stats = DatasetStats()
+    stats.add_images(pd.DataFrame([{"id": 1, "width": 10, "height": 10}]))
+    stats.update(pd.DataFrame([
+        {"id": 1, "image_id": 1, "category_id": 0, "bbox": [5, 5, 10, 2]},  # hors limites
+        {"id": 2, "image_id": 7, "category_id": 0, "bbox": [0, 0, 1, 1]},
+    ]))
+    assert stats.annotations_without_image == 1
+    assert stats.invalid_annotation_ids == [1]
+    assert stats.per_category()["out_of_bounds"].tolist() == [1]
+
+def test_explorer_stage_uses_single_pass(frames):
+    dataset = CocoDataset(*frames)
+    ann_per_img, img_no_ann, img_per_category, box_stats = explorer(dataset)
+    assert ann_per_img["num_annotations"].sum() == len(frames[1])
+    assert len(img_no_ann) + len(ann_per_img) == len(frames[0])
+    assert list(box_stats.columns) == ["width", "height", "area"]
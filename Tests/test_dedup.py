@@ -0,0 +1,87 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import numpy as np
+from PIL import Image, ImageOps
+from prepare_data.dedup import phash, compute_hashes, group_duplicates, hamming_distance
+from prepare_data.data_preparation import split_dataset
+
+# === Fausses scènes ===
+@pytest.fixture
+def scenes(tmp_path):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(3):
+        pixels = (rng.random((16, 16, 3)) * 255).astype(np.uint8)
+        img = Image.fromarray(pixels).resize((128, 128), Image.Resampling.BILINEAR)
+        img.save(tmp_path / f"scene{i}.jpg", quality=95)
+        # Variante légèrement différente de la même scène (recompression + luminosité)
+        ImageOps.autocontrast(img, cutoff=2).save(tmp_path / f"scene{i}_FALSE_COLOR.jpg", quality=70)
+        paths += [tmp_path / f"scene{i}.jpg", tmp_path / f"scene{i}_FALSE_COLOR.jpg"]
+    return paths
+
+# === Tests ===
+
+def test_phash_is_stable_for_variants(scenes):
+    hashes = np.array([phash(p) for p in scenes], dtype=np.uint64)
+    assert hamming_distance(hashes[0], hashes[1]) <= 4
+    assert hamming_distance(hashes[0], hashes[2]) > 10
+
+def test_compute_hashes_uses_cache(scenes, tmp_path, monkeypatch):
+    cache = tmp_path / "cache.json"
+    first = compute_hashes(scenes, cache_path=cache, workers=1)
+    monkeypatch.setattr("prepare_data.dedup.phash", lambda path: pytest.fail("hash recalculé"))
+    second = compute_hashes(scenes, cache_path=cache, workers=1)
+    assert first.tolist() == second.tolist()
+
+def test_group_duplicates_matches_brute_force():
+    rng = np.random.default_rng(1)
+    base = rng.integers(0, 2**63, size=300, dtype=np.uint64)
+    # Ajoute des variantes à 1-4 bits de distance
+    flips = np.uint64(1) << rng.integers(0, 64, size=(300, 3)).astype(np.uint64)
+    variants = base ^ flips[:, 0] ^ flips[:, 1]
+    hashes = np.concatenate([base, variants, base[:10]])
+    groups = group_duplicates(hashes, threshold=4)
+
+    distances = np.bitwise_count(hashes[:, None] ^ hashes[None, :])
+    for i, j in zip(*np.nonzero(distances <= 4)):
+        assert groups[i] == groups[j]
+    assert len(set(groups.tolist())) == 300
+
+def test_split_dataset_keeps_groups_together():
+    items = list(range(100))
+    groups = [i // 4 for i in items]
+    split = split_dataset(items, groups)
+    assert sum(len(v) for v in split.values()) == 100
+    for name, members in split.items():
+        for other, other_members in split.items():
+            if name != other:
+                assert not {groups[i] for i in members} & {groups[i] for i in other_members}
+
+def test_group_duplicates_compares_whole_large_buckets(monkeypatch):
+    monkeypatch.setattr("prepare_data.dedup.MAX_BUCKET_LAG", 2)
+    monkeypatch.setattr("prepare_data.dedup.PAIR_BLOCK", 7)
+    rng = np.random.default_rng(2)
+    # Tous les hashes partagent le premier segment (bits bas à zéro) : un seul grand segment
+    others = rng.integers(0, 2**63, size=40, dtype=np.uint64) & ~np.uint64(0xFFF)
+    a = np.uint64(0x0123456789ABC000)
+    # Quasi-doublon qui ne partage que le premier segment, loin dans l'ordre de tri
+    b = a ^ np.uint64((1 << 13) | (1 << 26) | (1 << 39) | (1 << 63))
+    hashes = np.concatenate([[a], others, [b]])
+    groups = group_duplicates(hashes, threshold=4)
+    assert groups[0] == groups[-1]
+
+    distances = np.bitwise_count(hashes[:, None] ^ hashes[None, :])
+    for i, j in zip(*np.nonzero(distances <= 4)):
+        assert groups[i] == groups[j]
+
+def test_group_duplicates_exact_threshold():
+    hashes = np.array([5, 7, 5, 2**63 + 1, 7], dtype=np.uint64)
+    with np.errstate(all="raise"):
+        groups = group_duplicates(hashes, threshold=0)
+    assert groups[0] == groups[2] and groups[1] == groups[4]
+    assert len(set(groups.tolist())) == 3
+    with pytest.raises(ValueError):
+        group_duplicates(hashes, threshold=-1)
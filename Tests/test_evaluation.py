@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import numpy as np
+import pandas as pd
+from prepare_data.data_cleaner import save_coco_json
+from prepare_data.evaluation import evaluate, evaluate_frames, pairwise_iou, pr_curve
+
+
+# === Faux jeux de données ===
+images = pd.DataFrame({"id": [1, 2], "file_name": ["a.jpg", "b.jpg"], "width": [640, 640], "height": [640, 640]})
+categories = pd.DataFrame({"id": [1, 2], "name": ["fire", "smoke"]})
+ground_truth = pd.DataFrame([
+    {"id": 1, "image_id": 1, "category_id": 1, "bbox": [0, 0, 100, 100]},
+    {"id": 2, "image_id": 1, "category_id": 1, "bbox": [300, 300, 20, 20]},
+])
+
+def detections(rows):
+    return pd.DataFrame([{"id": i, "image_id": img, "category_id": cat, "bbox": box, "score": score}
+                         for i, (img, cat, box, score) in enumerate(rows)])
+
+# === Tests ===
+
+def test_pairwise_iou():
+    a = np.array([[0, 0, 10, 10], [0, 0, 0, 0]], dtype=np.float64)
+    b = np.array([[5, 0, 10, 10], [0, 0, 10, 10], [50, 50, 1, 1]], dtype=np.float64)
+    np.testing.assert_allclose(pairwise_iou(a, b), [[50 / 150, 1, 0], [0, 0, 0]])
+
+def test_perfect_predictions():
+    preds = detections([(1, 1, [0, 0, 100, 100], 0.9), (1, 1, [300, 300, 20, 20], 0.8)])
+    result = evaluate_frames(images, ground_truth, categories, preds, workers=1)
+    assert result["summary"]["mAP"] == pytest.approx(1.0)
+    assert result["per_size"].loc["small", "num_gt"] == 1 and result["per_size"].loc["large", "num_gt"] == 1
+    assert result["per_image"]["fn"].tolist() == [0, 0]
+
+def test_average_precision_with_one_false_positive():
+    preds = detections([(1, 1, [0, 0, 100, 100], 0.9), (1, 1, [500, 500, 50, 50], 0.8),
+                        (1, 1, [300, 300, 20, 20], 0.7)])
+    result = evaluate_frames(images, ground_truth, categories, preds, workers=1)
+    # PR : (r=.5, p=1), (.5, .5), (1, 2/3) -> 51 points à 1 et 50 points à 2/3
+    assert result["summary"]["mAP"] == pytest.approx((51 + 50 * 2 / 3) / 101)
+    curve = pr_curve(result, iou=0.5, category_id=1)
+    assert curve["precision"].iloc[0] == 1 and curve["precision"].iloc[-1] == pytest.approx(2 / 3)
+
+def test_per_image_error_breakdown():
+    preds = detections([
+        (1, 1, [0, 0, 100, 100], 0.9),      # vrai positif
+        (1, 1, [2, 2, 100, 100], 0.8),      # doublon
+        (1, 2, [300, 300, 20, 20], 0.7),    # mauvaise classe
+        (1, 1, [310, 310, 20, 20], 0.6),    # localisation (IoU ~0.14)
+        (2, 1, [10, 10, 10, 10], 0.5),      # fond (aucune gt)
+        (2, 1, [50, 50, 10, 10], 0.1),      # sous le seuil de score
+    ])
+    per_image = evaluate_frames(images, ground_truth, categories, preds, workers=1)["per_image"]
+    first, second = per_image.iloc[0], per_image.iloc[1]
+    assert (first["tp"], first["fp"], first["fn"]) == (1, 3, 1)
+    assert (first["fp_duplicate"], first["fp_class"], first["fp_localization"]) == (1, 1, 1)
+    assert (second["num_det"], second["fp_background"]) == (1, 1)
+
+def test_evaluate_files_matches_workers_and_file_names(tmp_path):
+    rng = np.random.default_rng(0)
+    gt_rows, pred_rows = [], []
+    for image_id in range(1, 201):
+        for _ in range(rng.integers(0, 4)):
+            x, y, w, h = rng.uniform(0, 500, 2).tolist() + rng.uniform(5, 120, 2).tolist()
+            gt_rows.append({"id": len(gt_rows), "image_id": image_id, "category_id": int(rng.integers(1, 3)),
+                            "bbox": [x, y, w, h]})
+            jitter = rng.normal(0, 0.02, 2) * [w, h]
+            pred_rows.append({"id": len(pred_rows), "image_id": 1000 + image_id, "category_id": gt_rows[-1]["category_id"],
+                              "bbox": [x + jitter[0], y + jitter[1], w, h], "score": float(rng.uniform(0.3, 1))})
+    gt_images = pd.DataFrame({"id": range(1, 201), "file_name": [f"{i}.jpg" for i in range(1, 201)]})
+    # Les prédictions numérotent leurs images autrement : l'appariement se fait par file_name
+    pred_images = pd.DataFrame({"id": range(1001, 1201), "file_name": [f"{i}.jpg" for i in range(1, 201)]})
+    cats = [{"id": 1, "name": "fire"}, {"id": 2, "name": "smoke"}]
+    save_coco_json(gt_images, pd.DataFrame(gt_rows), cats, tmp_path / "gt.json")
+    save_coco_json(pred_images, pd.DataFrame(pred_rows), cats, tmp_path / "pred.json")
+
+    single = evaluate(tmp_path / "gt.json", tmp_path / "pred.json", workers=1)
+    parallel = evaluate(tmp_path / "gt.json", tmp_path / "pred.json", workers=2)
+    assert single["summary"] == parallel["summary"]
+    assert single["summary"]["AP50"] > 0.9
+    assert single["per_image"]["fn"].sum() < len(gt_rows) * 0.05
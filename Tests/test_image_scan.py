@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import pandas as pd
+from PIL import Image
+from prepare_data.image_scan import scan_image, scan_images, check_dimensions
+
+# === Fausses images ===
+@pytest.fixture
+def images_folder(tmp_path):
+    Image.new("RGB", (64, 32), "red").save(tmp_path / "ok.jpg")
+    Image.new("L", (16, 24)).save(tmp_path / "gray.jpg", progressive=True)
+    Image.new("RGBA", (10, 20)).save(tmp_path / "alpha.png")
+    data = (tmp_path / "ok.jpg").read_bytes()
+    (tmp_path / "truncated.jpg").write_bytes(data[:len(data) // 2])
+    (tmp_path / "broken.jpg").write_bytes(b"not an image")
+    (tmp_path / "notes.txt").write_text("ignored")
+    return tmp_path
+
+# === Tests ===
+
+def test_scan_image_reads_jpeg_and_png_headers(images_folder):
+    ok = scan_image(images_folder / "ok.jpg")
+    assert (ok["format"], ok["width"], ok["height"], ok["mode"]) == ("JPEG", 64, 32, "RGB")
+    assert not ok["truncated"]
+    gray = scan_image(images_folder / "gray.jpg")
+    assert (gray["width"], gray["height"], gray["mode"]) == (16, 24, "L")
+    png = scan_image(images_folder / "alpha.png")
+    assert (png["format"], png["width"], png["height"], png["mode"]) == ("PNG", 10, 20, "RGBA")
+
+def test_scan_image_flags_corruption(images_folder):
+    assert scan_image(images_folder / "truncated.jpg")["truncated"]
+    assert scan_image(images_folder / "broken.jpg")["error"] == "format inconnu"
+
+def test_scan_images_with_process_pool(images_folder):
+    result = scan_images(images_folder, workers=2, chunksize=1)
+    assert sorted(result["file_name"]) == ["alpha.png", "broken.jpg", "gray.jpg", "ok.jpg", "truncated.jpg"]
+
+def test_check_dimensions_reports_issues(images_folder):
+    scan_df = scan_images(images_folder, workers=1)
+    images_df = pd.DataFrame([
+        {"id": 1, "file_name": "ok.jpg", "width": 64, "height": 32},
+        {"id": 2, "file_name": "gray.jpg", "width": 24, "height": 16},
+        {"id": 3, "file_name": "truncated.jpg", "width": 64, "height": 32},
+        {"id": 4, "file_name": "broken.jpg", "width": 1, "height": 1},
+        {"id": 5, "file_name": "absent.jpg", "width": 1, "height": 1},
+    ])
+    issues = check_dimensions(scan_df, images_df)
+    assert dict(zip(issues["id"], issues["issue"])) == {
+        2: "dimensions", 3: "truncated", 4: "unreadable", 5: "missing"}
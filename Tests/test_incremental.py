@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import pandas as pd
+from prepare_data.coco_dataset import CocoDataset
+from prepare_data.incremental import run_incremental
+
+# === Faux dataset ===
+def make_dataset(images, annotations):
+    return CocoDataset(pd.DataFrame(images), pd.DataFrame(annotations), pd.DataFrame([{"id": 0, "name": "fire"}]))
+
+images = [
+    {"id": 1, "file_name": "img1.jpg", "width": 100, "height": 100},
+    {"id": 2, "file_name": "img2.jpg", "width": 100, "height": 100},
+    {"id": 3, "file_name": "img3.jpg", "width": 100, "height": 100},
+]
+annotations = [
+    {"id": 10, "image_id": 1, "category_id": 0, "bbox": [0, 0, 50, 50]},
+    {"id": 11, "image_id": 2, "category_id": 0, "bbox": [5, 5, 0, 20]},  # bbox anormale
+]
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for name in ["img1.jpg", "img2.jpg"]:
+        (tmp_path / name).write_bytes(name.encode())
+    return tmp_path
+
+# === Tests ===
+
+def test_first_run_processes_everything(data_dir):
+    result = run_incremental(make_dataset(images, annotations), data_dir, labels_dir=data_dir / "labels")
+    assert result["added"] == [1, 2, 3]
+    assert result["bbox_anomalies"]["id"].tolist() == [11]
+    assert result["images_without_annotations"] == ["img3.jpg"]
+    assert result["missing_files"] == ["img3.jpg"]
+    assert (data_dir / "labels" / "img1.txt").read_text() == "0 0.250000 0.250000 0.500000 0.500000\n"
+
+def test_second_run_only_processes_delta(data_dir):
+    run_incremental(make_dataset(images, annotations), data_dir)
+    unchanged = run_incremental(make_dataset(images, annotations), data_dir)
+    assert unchanged["added"] == unchanged["changed"] == unchanged["removed"] == []
+    assert unchanged["labels"] == {}
+    # Les résultats précédents restent disponibles
+    assert unchanged["images_without_annotations"] == ["img3.jpg"]
+
+    # Une annotation corrigée, une image supprimée du JSON, un fichier ajouté
+    fixed = [dict(annotations[0]), {**annotations[1], "bbox": [5, 5, 10, 20]}]
+    (data_dir / "img3.jpg").write_bytes(b"img3")
+    delta = run_incremental(make_dataset(images[1:], fixed[1:]), data_dir)
+    assert delta["added"] == []
+    assert sorted(delta["changed"]) == [2, 3]
+    assert delta["removed"] == [1]
+    assert delta["bbox_anomalies"].empty
+    assert set(delta["labels"]) == {"img2.jpg", "img3.jpg"}
+    assert delta["missing_files"] == []
+
+def test_pipeline_incremental_cleaner_writes_labels(data_dir, tmp_path, monkeypatch):
+    from prepare_data import pipeline
+    monkeypatch.setattr(pipeline, "DATA_DIR", data_dir)
+    labels_dir = tmp_path / "labels"
+    delta = pipeline.incremental_cleaner(make_dataset(images, annotations), labels_dir=labels_dir)
+    assert delta["added"] == [1, 2, 3]
+    assert (labels_dir / "img1.txt").is_file()
+    assert pipeline.incremental_cleaner(make_dataset(images, annotations), labels_dir=labels_dir)["added"] == []
+
+def test_labels_skip_anomalies_and_follow_a_new_labels_dir(data_dir, tmp_path):
+    first_dir, second_dir = tmp_path / "labels_a", tmp_path / "labels_b"
+    run_incremental(make_dataset(images, annotations), data_dir, labels_dir=first_dir)
+    # La bbox aberrante (largeur nulle) de img2 n'est pas écrite
+    assert (first_dir / "img2.txt").read_text() == ""
+
+    # Aucun delta, mais nouveau dossier : toutes les images y reçoivent leur label
+    result = run_incremental(make_dataset(images, annotations), data_dir, labels_dir=second_dir)
+    assert result["added"] == result["changed"] == []
+    assert sorted(p.name for p in second_dir.iterdir()) == ["img1.txt", "img2.txt", "img3.txt"]
+    assert (second_dir / "img1.txt").read_text() == "0 0.250000 0.250000 0.500000 0.500000\n"
+    assert run_incremental(make_dataset(images, annotations), data_dir, labels_dir=second_dir)["labels"] == {}
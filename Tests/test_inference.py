@@ -0,0 +1,118 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import os
+import pytest
+import numpy as np
+from PIL import Image
+from prepare_data.inference import tile_grid, nms, run_inference, cut_by_tile_edge, load_as_memmap
+from prepare_data.data_cleaner import save_coco_json
+from prepare_data.data_loader import load_coco_json
+
+
+class BrightSpotPredictor:
+    """Faux modèle : détecte la boîte englobante des pixels très clairs de la tuile."""
+
+    def __call__(self, tiles):
+        results = []
+        for tile in tiles:
+            ys, xs = np.nonzero(tile[..., 0] > 200)
+            if len(xs):
+                boxes = np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]], dtype=np.float32)
+                results.append((boxes, np.array([0.9]), np.array([0])))
+            else:
+                results.append((np.empty((0, 4)), np.empty(0), np.empty(0, dtype=np.int64)))
+        return results
+
+# === Tests ===
+
+def test_tile_grid_covers_image_with_overlap():
+    tiles = tile_grid(1000, 700, tile_size=640, overlap=0.2)
+    assert tiles[:, 0].min() == 0 and tiles[:, 2].max() == 1000
+    assert tiles[:, 1].min() == 0 and tiles[:, 3].max() == 700
+    assert set((tiles[:, 2] - tiles[:, 0]).tolist()) == {640}
+    assert tile_grid(100, 50, tile_size=640).tolist() == [[0, 0, 100, 50]]
+
+def test_nms_keeps_best_box_per_class():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [0, 0, 10, 10], [50, 50, 60, 60]], dtype=np.float64)
+    scores = np.array([0.9, 0.8, 0.7, 0.6])
+    classes = np.array([0, 0, 1, 0])
+    assert sorted(nms(boxes, scores, classes, 0.5).tolist()) == [0, 2, 3]
+
+def test_cut_by_tile_edge_drops_small_fragments_only():
+    boxes = np.array([
+        [64, 10, 70, 20],   # petit fragment au bord gauche intérieur
+        [64, 0, 128, 60],   # plus grand que le recouvrement : conservé
+        [80, 20, 90, 30],   # à l'intérieur de la tuile
+    ], dtype=np.float64)
+    cut = cut_by_tile_edge(boxes, (64, 0, 128, 64), scene_size=(256, 64), overlap_px=32)
+    assert cut.tolist() == [True, False, False]
+    # bord gauche de la scène : conservé
+    assert not cut_by_tile_edge(np.array([[0., 10., 6., 20.]]), (0, 0, 64, 64), (256, 64), 32).any()
+
+def test_run_inference_merges_tiles(tmp_path):
+    scene = np.zeros((96, 128, 3), dtype=np.uint8)
+    scene[10:20, 40:56] = 255  # visible en entier dans deux tuiles
+    Image.fromarray(scene).save(tmp_path / "scene.png")
+
+    images_df, annotations_df = run_inference(
+        [tmp_path / "scene.png"], BrightSpotPredictor(), tile_size=64, overlap=0.5, batch_size=5, workers=1)
+    assert images_df[["width", "height"]].values.tolist() == [[128, 96]]
+    assert annotations_df["bbox"].tolist() == [[40, 10, 16, 10]]
+
+    # Le fichier produit se relit avec les outils de prepare_data
+    out = tmp_path / "predictions.coco.json"
+    save_coco_json(images_df, annotations_df, [{"id": 0, "name": "fire"}], out, compact=True)
+    _, loaded, _ = load_coco_json(out, use_cache=False)
+    assert loaded[["x", "y", "w", "h"]].values.tolist() == [[40, 10, 16, 10]]
+    assert loaded["score"].tolist() == [0.9]
+
+def test_run_inference_without_tile_fragments(tmp_path):
+    scene = np.zeros((64, 160, 3), dtype=np.uint8)
+    scene[20:30, 60:76] = 255  # coupé par le bord de la première tuile (x=64)
+    Image.fromarray(scene).save(tmp_path / "scene.png")
+
+    _, annotations_df = run_inference(
+        [tmp_path / "scene.png"], BrightSpotPredictor(), tile_size=64, overlap=0.5, batch_size=4, workers=1)
+    assert annotations_df["bbox"].tolist() == [[60, 20, 16, 10]]
+
+def test_scene_cache_keyed_by_path_and_state(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    for folder, x in (("a", 10), ("b", 40)):
+        (tmp_path / folder).mkdir()
+        scene = np.zeros((64, 64, 3), dtype=np.uint8)
+        scene[10:20, x:x + 10] = 255
+        Image.fromarray(scene).save(tmp_path / folder / "scene.png")
+
+    # Deux scènes homonymes dans des dossiers différents ne partagent pas leur cache
+    paths = [tmp_path / "a" / "scene.png", tmp_path / "b" / "scene.png"]
+    _, annotations_df = run_inference(paths, BrightSpotPredictor(), tile_size=64, workers=1, cache_dir=cache_dir)
+    assert annotations_df["bbox"].tolist() == [[10, 10, 10, 10], [40, 10, 10, 10]]
+
+    # Une scène modifiée est redécodée, l'ancien cache est supprimé
+    scene = np.zeros((64, 64, 3), dtype=np.uint8)
+    scene[30:40, 20:30] = 255
+    Image.fromarray(scene).save(paths[0])
+    os.utime(paths[0], ns=(0, 10**9))
+    _, annotations_df = run_inference(paths[:1], BrightSpotPredictor(), tile_size=64, workers=1, cache_dir=cache_dir)
+    assert annotations_df["bbox"].tolist() == [[20, 30, 10, 10]]
+    assert len(list(cache_dir.glob("*.npy"))) == 2
+
+def test_load_as_memmap_keeps_pil_bomb_guard(tmp_path):
+    Image.fromarray(np.zeros((8, 8, 3), dtype=np.uint8)).save(tmp_path / "scene.png")
+    limit = Image.MAX_IMAGE_PIXELS
+    pixels = load_as_memmap(tmp_path / "scene.png", tmp_path)
+    assert pixels.shape == (8, 8, 3)
+    assert limit is not None and Image.MAX_IMAGE_PIXELS == limit
+
+def test_run_inference_creates_cache_dir(tmp_path):
+    scene = np.zeros((64, 64, 3), dtype=np.uint8)
+    scene[10:20, 10:20] = 255
+    Image.fromarray(scene).save(tmp_path / "scene.png")
+    cache_dir = tmp_path / "cache" / "scenes"  # n'existe pas encore
+    _, annotations_df = run_inference([tmp_path / "scene.png"], BrightSpotPredictor(), tile_size=64,
+                                      workers=1, cache_dir=cache_dir)
+    assert annotations_df["bbox"].tolist() == [[10, 10, 10, 10]]
+    assert len(list(cache_dir.glob("*.npy"))) == 1
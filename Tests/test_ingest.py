@@ -0,0 +1,140 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import asyncio
+import json
+import time
+import pytest
+from prepare_data.data_preparation import SPLITS, assign_split
+from prepare_data.ingest import TileIngestor, ingest
+
+
+# === Outils ===
+def write_fragment(path, images, annotations):
+    path.write_text(json.dumps({"images": images, "annotations": annotations, "categories": []}))
+
+async def run_until(watch_dir, output_dir, done, actions=(), queue_size=2, timeout=10.0):
+    """Lance l'ingestion, exécute les actions une à une puis s'arrête quand done() est vrai."""
+    stop = asyncio.Event()
+    task = asyncio.create_task(ingest(watch_dir, output_dir, poll_interval=0.01,
+                                      queue_size=queue_size, stop=stop))
+    for action in actions:
+        await asyncio.sleep(0.05)
+        action()
+    deadline = time.monotonic() + timeout
+    while not done() and time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+    stop.set()
+    return await task
+
+def labels_of(output_dir):
+    return {p.name: p.read_text() for p in output_dir.glob("*/labels/*.txt")}
+
+# === Tests ===
+
+def test_assign_split_is_deterministic_and_balanced():
+    names = [f"tile{i}_jpg.rf.{i:04x}.jpg" for i in range(5000)]
+    splits = [assign_split(name) for name in names]
+    assert splits == [assign_split(name) for name in names]
+    for split, fraction in SPLITS.items():
+        assert abs(splits.count(split) / len(names) - fraction) < 0.03
+    # Le hash Roboflow ne change pas le split
+    assert assign_split("a_rf.111.jpg") == assign_split("a_rf.222.jpg")
+
+def test_ingest_matches_images_and_fragments_in_any_order(tmp_path):
+    watch, output = tmp_path / "data", tmp_path / "dataset"
+    watch.mkdir()
+    (watch / "a.jpg").write_bytes(b"a")  # image avant son fragment
+    images = [{"id": 1, "file_name": "a.jpg", "width": 100, "height": 100},
+              {"id": 2, "file_name": "b.jpg", "width": 100, "height": 50},
+              {"id": 3, "file_name": "c.jpg", "width": 100, "height": 100}]
+    annotations = [{"id": 10, "image_id": 1, "category_id": 0, "bbox": [0, 0, 50, 50]},
+                   {"id": 11, "image_id": 2, "category_id": 1, "bbox": [0, 0, 50, 25]},
+                   {"id": 12, "image_id": 2, "category_id": 0, "bbox": [5, 5, 0, 10]},  # aberrante
+                   {"id": 13, "image_id": 99, "category_id": 0, "bbox": [0, 0, 1, 1]}]  # sans image
+
+    report = asyncio.run(run_until(
+        watch, output, lambda: len(labels_of(output)) == 2,
+        actions=[lambda: write_fragment(watch / "batch1.fragment.json", images, annotations),
+                 lambda: (watch / "d.jpg").write_bytes(b"d"),
+                 lambda: (watch / "b.jpg").write_bytes(b"b")]))
+
+    labels = labels_of(output)
+    assert labels["a.txt"] == "0 0.250000 0.250000 0.500000 0.500000\n"
+    assert labels["b.txt"] == "1 0.250000 0.250000 0.500000 0.500000\n"
+    assert (output / assign_split("a.jpg") / "images" / "a.jpg").read_bytes() == b"a"
+    assert report["processed"] == 2
+    assert report["bbox_anomalies"] == [12]
+    assert report["annotations_without_image"] == [13]
+    assert report["images_without_annotations"] == ["d.jpg"]
+    assert report["missing_files"] == ["c.jpg"]
+
+def test_ingest_burst_with_small_queues(tmp_path):
+    watch, output = tmp_path / "data", tmp_path / "dataset"
+    watch.mkdir()
+    n = 60
+    images = [{"id": i, "file_name": f"t{i}.jpg", "width": 10, "height": 10} for i in range(n)]
+    annotations = [{"id": i, "image_id": i, "category_id": 0, "bbox": [0, 0, 5, 5]} for i in range(n)]
+    write_fragment(watch / "burst.fragment.json", images, annotations)
+    for i in range(n):
+        (watch / f"t{i}.jpg").write_bytes(b"x")
+
+    report = asyncio.run(run_until(watch, output, lambda: len(labels_of(output)) == n, queue_size=1))
+    assert report["processed"] == n
+    assert report["missing_files"] == []
+
+def test_ingest_quarantines_invalid_fragments(tmp_path):
+    watch, output = tmp_path / "data", tmp_path / "dataset"
+    watch.mkdir()
+    (watch / "bad.jpg").write_bytes(b"x")
+    (watch / "ok.jpg").write_bytes(b"y")
+    write_fragment(watch / "bad.fragment.json", [{"id": 1, "file_name": "bad.jpg"}],  # sans width / height
+                   [{"id": 10, "image_id": 1, "category_id": 0, "bbox": [0, 0, 5, 5]}])
+    (watch / "broken.fragment.json").write_text('{"images": [{"id": 1,')
+
+    report = asyncio.run(run_until(
+        watch, output, lambda: len(labels_of(output)) == 1,
+        actions=[lambda: write_fragment(watch / "ok.fragment.json", [{"id": 1, "file_name": "ok.jpg", "width": 10, "height": 10}],
+                                        [{"id": 10, "image_id": 1, "category_id": 0, "bbox": [0, 0, 5, 5]}])]))
+
+    # Le démon a continué après les fragments invalides
+    assert list(labels_of(output)) == ["ok.txt"]
+    assert sorted(report["quarantined"]) == ["bad.fragment.json", "broken.fragment.json"]
+    assert sorted(p.name for p in (output / "quarantine").iterdir()) == ["bad.fragment.json", "broken.fragment.json"]
+    assert not (watch / "bad.fragment.json").exists()
+
+def test_ingest_skips_base_export_and_bounds_pending_state(tmp_path):
+    watch, output = tmp_path / "data", tmp_path / "dataset"
+    watch.mkdir()
+    (watch / "old.jpg").write_bytes(b"o")
+    write_fragment(watch / "_annotations.coco.json", [{"id": 1, "file_name": "old.jpg", "width": 10, "height": 10}],
+                   [{"id": 10, "image_id": 1, "category_id": 0, "bbox": [0, 0, 5, 5]}])
+    # Sortie du pipeline déposée dans le même dossier : ce n'est pas un fragment
+    write_fragment(watch / "_annotations_clean.coco.json", [{"id": 1, "file_name": "old.jpg", "width": 10, "height": 10}],
+                   [{"id": 10, "image_id": 1, "category_id": 0, "bbox": [0, 0, 5, 5]}])
+
+    async def scenario():
+        stop = asyncio.Event()
+        task = asyncio.create_task(ingest(watch, output, poll_interval=0.01, stop=stop,
+                                          base_json=watch / "_annotations.coco.json"))
+        await asyncio.sleep(0.05)
+        for i in range(5):
+            (watch / f"new{i}.jpg").write_bytes(b"n")
+        await asyncio.sleep(0.3)
+        stop.set()
+        return await task
+
+    report = asyncio.run(scenario())
+    # L'export de base et ses images ne sont pas réingérés
+    assert report["processed"] == 0
+    assert report["images_without_annotations"] == [f"new{i}.jpg" for i in range(5)]
+    assert report["missing_files"] == []  # _annotations_clean.coco.json n'a pas été lu
+
+def test_tile_ingestor_evicts_oldest_pending_records(tmp_path):
+    ingestor = TileIngestor(tmp_path, max_pending=2)
+    for i in range(3):
+        image = {"id": i, "file_name": f"t{i}.jpg", "width": 10, "height": 10}
+        asyncio.run(ingestor.handle(("record", image, [], tmp_path / "f.json")))
+    assert list(ingestor.records) == ["t1.jpg", "t2.jpg"]
+    assert ingestor.report()["missing_files"] == ["t0.jpg", "t1.jpg", "t2.jpg"]
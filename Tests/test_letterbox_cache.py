@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import numpy as np
+from PIL import Image
+from prepare_data.data_preparation import build_file_index
+from prepare_data.letterbox_cache import (
+    PAD_VALUE,
+    build_split_caches,
+    letterbox_image,
+    letterbox_labels,
+    load_letterbox_cache,
+)
+
+
+# === Fausses images ===
+@pytest.fixture
+def data_dir(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    wide = np.zeros((50, 100, 3), dtype=np.uint8)
+    wide[:, :50] = 255  # moitié gauche blanche
+    Image.fromarray(wide).save(data / "wide_rf.1.png")
+    Image.fromarray(np.full((80, 40, 3), 200, dtype=np.uint8)).save(data / "tall_rf.2.png")
+    return data
+
+images = [
+    {"id": 1, "file_name": "wide_rf.1.png", "width": 100, "height": 50},
+    {"id": 2, "file_name": "tall_rf.2.png", "width": 40, "height": 80},
+]
+annotations_per_image = {
+    1: [{"image_id": 1, "category_id": 0, "bbox": [0, 0, 50, 50]}],
+    2: [{"image_id": 2, "category_id": 1, "bbox": [0, 0, 40, 40]},
+        {"image_id": 2, "category_id": 0, "bbox": [10, 60, 20, 20]}],
+}
+
+# === Tests ===
+
+def test_letterbox_image_keeps_aspect_ratio(data_dir):
+    canvas, shape = letterbox_image(data_dir / "wide_rf.1.png", size=64)
+    assert shape == (100, 50) and canvas.shape == (64, 64, 3)
+    assert (canvas[:16] == PAD_VALUE).all() and (canvas[48:] == PAD_VALUE).all()
+    assert (canvas[20:44, :30] == 255).all() and (canvas[20:44, 34:] == 0).all()
+
+def test_letterbox_labels_follow_the_image():
+    labels = np.array([[0, 0.25, 0.5, 0.5, 1.0]])  # moitié gauche d'une image 100x50
+    out = letterbox_labels(labels, [100], [50], size=64)
+    np.testing.assert_allclose(out, [[0, 0.25, 0.5, 0.5, 0.5]])
+
+def test_build_split_caches(data_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr("prepare_data.letterbox_cache.CHUNK_IMAGES", 1)  # une tâche par image, deux processus
+    output = tmp_path / "dataset"
+    split = {"train": images, "val": [], "test": []}
+    build_split_caches(split, build_file_index(data_dir), annotations_per_image, output, size=32, workers=2)
+
+    pixels, files, labels, offsets, shapes = load_letterbox_cache(output / "train", size=32)
+    assert isinstance(pixels, np.memmap) and pixels.shape == (2, 32, 32, 3) and pixels.dtype == np.uint8
+    assert files == ["wide_rf.1.png", "tall_rf.2.png"]
+    assert offsets.tolist() == [0, 1, 3]
+    assert shapes.tolist() == [[100, 50], [40, 80]]
+    # image haute 40x80 -> 16x32 centrée : bandes de 8 px à gauche et à droite
+    assert (pixels[1, :, :8] == PAD_VALUE).all() and (pixels[1, :, 8:24] == 200).all()
+    np.testing.assert_allclose(labels[1], [1, 0.5, 0.25, 0.5, 0.5])
+    assert load_letterbox_cache(output / "val", size=32)[0].shape == (0, 32, 32, 3)
+
+def test_cache_is_reused_when_sources_are_unchanged(data_dir, tmp_path):
+    output = tmp_path / "dataset"
+    split = {"train": images}
+    npy_path, _ = build_split_caches(split, build_file_index(data_dir), annotations_per_image, output, size=32)["train"]
+    mtime = npy_path.stat().st_mtime_ns
+    build_split_caches(split, build_file_index(data_dir), annotations_per_image, output, size=32)
+    assert npy_path.stat().st_mtime_ns == mtime
+
+def test_cache_labels_follow_annotation_changes(data_dir, tmp_path):
+    output = tmp_path / "dataset"
+    split = {"train": images}
+    one_box = {1: annotations_per_image[1], 2: annotations_per_image[2][:1]}
+    npy_path, _ = build_split_caches(split, build_file_index(data_dir), one_box, output, size=32)["train"]
+    mtime = npy_path.stat().st_mtime_ns
+    build_split_caches(split, build_file_index(data_dir), annotations_per_image, output, size=32)
+    _, _, labels, offsets, _ = load_letterbox_cache(output / "train", size=32)
+    assert offsets.tolist() == [0, 1, 3] and len(labels) == 3
+    # Les images n'ont pas changé : elles ne sont pas redécodées
+    assert npy_path.stat().st_mtime_ns == mtime
@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import json
+import pstats
+import tracemalloc
+from prepare_data.profiling import (
+    enable_profiling,
+    profile_stage,
+    reset_metrics,
+    stage_metrics,
+    write_report,
+)
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+@profile_stage("build", rows=len)
+def build(n):
+    return [i * i for i in range(n)]
+
+# === Tests ===
+
+def test_profile_stage_records_metrics():
+    assert build(1000)[-1] == 999 ** 2
+    (metrics,) = stage_metrics()
+    assert metrics["stage"] == "build"
+    assert metrics["rows"] == 1000
+    assert metrics["wall_time_s"] >= 0 and metrics["cpu_time_s"] >= 0
+
+def test_hooks_enabled_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("PREPARE_DATA_PROFILE", "build:cprofile,build:tracemalloc")
+    build(10_000)
+    report_path = write_report(tmp_path / "metrics.json")
+    report = json.loads(report_path.read_text())
+    (stage,) = report["stages"]
+    assert stage["tracemalloc_peak_mb"] > 0
+    stats = pstats.Stats(str(tmp_path / stage["profile_file"]))
+    assert stats.total_calls > 0
+
+def test_enable_profiling_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        enable_profiling("build", "perf")
+
+def test_tracemalloc_stopped_when_stage_fails(monkeypatch):
+    monkeypatch.setenv("PREPARE_DATA_PROFILE", "failing:tracemalloc")
+
+    @profile_stage("failing")
+    def failing():
+        raise RuntimeError("échec")
+
+    with pytest.raises(RuntimeError):
+        failing()
+    assert not tracemalloc.is_tracing()
+
+def test_tracemalloc_left_running_if_started_by_caller(monkeypatch):
+    monkeypatch.setenv("PREPARE_DATA_PROFILE", "build:tracemalloc")
+    tracemalloc.start()
+    try:
+        build(100)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
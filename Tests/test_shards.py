@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import io
+import tarfile
+import pytest
+from prepare_data.data_preparation import build_file_index
+from prepare_data.shards import ShardReader, export_shards, iter_shards, parse_label, write_shards
+
+
+# === Faux échantillons ===
+@pytest.fixture
+def samples(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    items = []
+    for i in range(25):
+        name = f"tile{i}_jpg.rf.{i:03d}.jpg"
+        (data / name).write_bytes(bytes([i]) * (100 + 37 * i))
+        items.append((name, str(data / name), f"0 0.{i:06d} 0.500000 0.100000 0.100000\n"))
+    return items
+
+# === Tests ===
+
+def test_write_shards_respects_limits(samples, tmp_path):
+    write_shards(samples, tmp_path / "shards", "train", max_samples=10)
+    assert sorted(p.name for p in (tmp_path / "shards").glob("*.tar")) == [
+        "train-000000.tar", "train-000001.tar", "train-000002.tar"]
+
+    write_shards(samples, tmp_path / "by_size", "train", max_bytes=2000)
+    for shard in (tmp_path / "by_size").glob("*.tar"):
+        with tarfile.open(shard) as tar:
+            assert sum(m.size for m in tar.getmembers() if m.name.endswith(".jpg")) <= 2000
+
+def test_random_access_matches_sources(samples, tmp_path):
+    write_shards(samples, tmp_path / "shards", "val", max_samples=7)
+    with ShardReader(tmp_path / "shards", "val") as reader:
+        assert len(reader) == len(samples)
+        for i in [24, 0, 13, 7]:
+            file_name, image, label = reader[i]
+            assert file_name == samples[i][0]
+            assert image == Path(samples[i][1]).read_bytes()
+            assert label == samples[i][2]
+        assert reader.get("tile3_jpg.rf.003.jpg")[1] == bytes([3]) * 211
+
+def test_streaming_reader_and_tar_compatibility(samples, tmp_path):
+    write_shards(samples, tmp_path / "shards", "test", max_samples=10)
+    streamed = list(iter_shards(tmp_path / "shards", "test"))
+    assert [key for key, _, _ in streamed] == [f"tile{i}_jpg_rf_{i:03d}" for i in range(25)]
+    assert streamed[5][1] == Path(samples[5][1]).read_bytes()
+    assert parse_label(streamed[5][2]).tolist() == [[0, pytest.approx(0.000005), 0.5, pytest.approx(0.1), pytest.approx(0.1)]]
+
+    # Un tar standard : lisible par tarfile (et donc par WebDataset)
+    with tarfile.open(tmp_path / "shards" / "test-000000.tar") as tar:
+        assert tar.getnames()[:2] == ["tile0_jpg_rf_000.jpg", "tile0_jpg_rf_000.txt"]
+
+def test_rewrite_removes_stale_shards(samples, tmp_path):
+    write_shards(samples, tmp_path / "shards", "train", max_samples=5)
+    write_shards(samples[:8], tmp_path / "shards", "train", max_samples=5)
+    assert len(list((tmp_path / "shards").glob("train-*.tar"))) == 2
+    assert len(ShardReader(tmp_path / "shards", "train")) == 8
+
+def test_duplicate_keys_are_rejected(samples, tmp_path):
+    with pytest.raises(ValueError):
+        write_shards(samples[:2] + samples[:1], tmp_path / "shards", "train")
+
+def test_export_shards_writes_labels(samples, tmp_path):
+    data_dir = Path(samples[0][1]).parent
+    images = [{"id": 1, "file_name": samples[0][0], "width": 100, "height": 50}]
+    annotations_per_image = {1: [{"image_id": 1, "category_id": 0, "bbox": [0, 0, 50, 25]}]}
+    export_shards({"train": images, "val": [], "test": []}, build_file_index(data_dir),
+                  annotations_per_image, tmp_path / "dataset")
+    with ShardReader(tmp_path / "dataset" / "shards", "train") as reader:
+        assert reader[0][2] == "0 0.250000 0.250000 0.500000 0.500000\n"
+    assert list(iter_shards(tmp_path / "dataset" / "shards", "val")) == []
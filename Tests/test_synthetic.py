@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from prepare_data.synthetic import generate_coco, write_synthetic_dataset
+from prepare_data.data_loader import load_coco_json
+from prepare_data.data_cleaner import get_images_without_annotations
+from prepare_data.image_scan import scan_images
+
+# === Tests ===
+
+def test_generate_coco_is_deterministic():
+    assert generate_coco(50, seed=3) == generate_coco(50, seed=3)
+    assert generate_coco(50, seed=3) != generate_coco(50, seed=4)
+
+def test_generate_coco_contains_anomalies():
+    coco = generate_coco(2000, invalid_fraction=0.05, empty_fraction=0.1)
+    assert len(coco["images"]) == 2000
+    assert any(ann["bbox"][2] == 0 for ann in coco["annotations"])
+    annotated = {ann["image_id"] for ann in coco["annotations"]}
+    assert 0 < len(annotated) < 2000
+
+def test_write_synthetic_dataset_with_images(tmp_path):
+    json_file = write_synthetic_dataset(tmp_path, 20, write_images=True, pixels=(8, 6))
+    images_df, annotations_df, _ = load_coco_json(json_file, use_cache=False)
+    assert len(images_df) == 20
+    scan_df = scan_images(tmp_path, workers=1)
+    assert set(scan_df["width"]) == {8} and set(scan_df["height"]) == {6}
+    missing = get_images_without_annotations(tmp_path, json_file)
+    assert len(missing) == 20 - annotations_df["image_id"].nunique()
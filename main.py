@@ -1,6 +1,39 @@
-from prepare_data.pipeline import loader, explorer, cleaner
+import argparse
+
+from prepare_data.pipeline import (loader, explorer, cleaner, scanner, incremental_cleaner,
+                                   DATA_DIR, BASE_DIR, JSON_FILE, LABELS_DIR)
+from prepare_data.profiling import write_report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline de préparation des données")
+    parser.add_argument("--watch", action="store_true",
+                        help="surveiller data/ et ingérer les nouvelles tuiles au fil de l'eau")
+    parser.add_argument("--output", default=str(BASE_DIR / "dataset"),
+                        help="dossier de sortie du mode --watch")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--full", action="store_true",
+                        help="explorer / nettoyer / scanner tout le dataset au lieu du seul delta")
+    parser.add_argument("--labels", default=str(LABELS_DIR),
+                        help="dossier des labels YOLO mis à jour par le passage incrémental")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-   loader()
-   explorer()
-   cleaner()
\ No newline at end of file
+   args = parse_args()
+   if args.watch:
+      from prepare_data.ingest import run_watch
+      # L'export de base et ses images relèvent du pipeline complet : seuls les ajouts sont ingérés
+      report = run_watch(DATA_DIR, args.output, poll_interval=args.poll_interval, base_json=JSON_FILE)
+      print(f"{report['processed']} images ingérées")
+   else:
+      loader()
+      if args.full:
+         explorer()
+         cleaner()
+         scanner()
+      else:
+         # Seules les images ajoutées / modifiées / supprimées depuis le dernier passage
+         delta = incremental_cleaner(labels_dir=args.labels)
+         print(f"{len(delta['added'])} ajoutées, {len(delta['changed'])} modifiées, "
+               f"{len(delta['removed'])} supprimées")
+      write_report()
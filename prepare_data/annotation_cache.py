@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Incrémenter si le format du cache change
+CACHE_VERSION = 2
+CACHE_DIR_NAME = ".coco_cache"
+FRAME_NAMES = ("images", "annotations", "categories")
+MANIFEST_FILE = "manifest.json"
+
+
+def file_digest(path: str | Path, block_size: int = 1 << 20) -> str:
+    """Empreinte (blake2b) du contenu d'un fichier, lu par blocs."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path_for(json_file: Path, cache_dir: str | Path | None = None) -> Path:
+    """Dossier de cache associé à un fichier JSON (par défaut à côté du fichier)."""
+    base = Path(cache_dir) if cache_dir is not None else json_file.parent / CACHE_DIR_NAME
+    return base / json_file.name
+
+
+# === Encodage des colonnes ===
+# Colonnes numériques : un .npy, relu en memory-map tel quel.
+# Colonnes texte / JSON : valeurs encodées en JSON, concaténées (séparées par des virgules)
+# dans un blob uint8, avec un tableau int64 des offsets (valeur i : data[offsets[i]:offsets[i+1] - 1]).
+# Contrairement à un tableau fixed-width, une seule longue valeur (segmentation) ne gonfle
+# pas toutes les lignes. Ces deux tableaux sont mémoire-mappables, mais les colonnes texte
+# sont décodées en objets Python au chargement : seules les colonnes numériques restent
+# en memory-map dans les DataFrames renvoyés.
+
+def _encode_column(col: pd.Series) -> tuple[str, list[np.ndarray]]:
+    """Convertit une colonne en tableaux NumPy mémoire-mappables et renvoie (type, tableaux)."""
+    if isinstance(col.dtype, np.dtype) and col.dtype.kind in "biuf":
+        return "numeric", [np.ascontiguousarray(col.to_numpy())]
+    # Chaînes, ou listes / dictionnaires / valeurs mixtes : stockés en JSON
+    kind = "str" if pd.api.types.infer_dtype(col, skipna=False) == "string" else "json"
+    encoded = [json.dumps(value, ensure_ascii=False).encode() for value in col.tolist()]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)) + 1, out=offsets[1:])
+    return kind, [offsets, np.frombuffer(b",".join(encoded), dtype=np.uint8)]
+
+
+def _decode_column(kind: str, arrays: list[np.ndarray]):
+    if kind == "numeric":
+        return arrays[0]
+    # Un seul appel à json.loads pour toute la colonne (le blob est déjà séparé par des virgules)
+    values = json.loads("[" + arrays[1].tobytes().decode() + "]")
+    return np.array(values, dtype=object) if kind == "str" else values
+
+
+# === Lecture / écriture ===
+
+def _read_manifest(cache_path: Path) -> dict | None:
+    try:
+        with open(cache_path / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_valid(manifest: dict | None, json_file: Path, cache_path: Path) -> bool:
+    """
+    Le cache est valide si la taille et la date de modification correspondent.
+    Si seule la date diffère (fichier copié ou touché), on compare l'empreinte.
+    """
+    if manifest is None or manifest.get("version") != CACHE_VERSION:
+        return False
+    stat = json_file.stat()
+    if manifest["size"] != stat.st_size:
+        return False
+    if manifest["mtime_ns"] == stat.st_mtime_ns:
+        return True
+    if manifest["digest"] != file_digest(json_file):
+        return False
+    manifest["mtime_ns"] = stat.st_mtime_ns
+    with open(cache_path / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return True
+
+
+def load_cached_frames(json_file: str | Path, cache_dir: str | Path | None = None):
+    """
+    Renvoie (images_df, annotations_df, categories_df) depuis le cache si celui-ci
+    correspond au fichier JSON, sinon None. Les tableaux sont ouverts en memory-map ;
+    les colonnes numériques le restent, les colonnes texte / JSON sont décodées.
+    """
+    json_file = Path(json_file)
+    cache_path = cache_path_for(json_file, cache_dir)
+    manifest = _read_manifest(cache_path)
+    try:
+        if not _is_valid(manifest, json_file, cache_path):
+            return None
+        frames = []
+        for name in FRAME_NAMES:
+            columns = manifest["frames"][name]
+            data = {
+                column["name"]: _decode_column(
+                    column["kind"], [np.load(cache_path / file, mmap_mode="r") for file in column["files"]])
+                for column in columns
+            }
+            frames.append(pd.DataFrame(data, columns=[column["name"] for column in columns]))
+    except (OSError, ValueError, KeyError):
+        return None
+    return tuple(frames)
+
+
+def save_cached_frames(json_file: str | Path, frames, cache_dir: str | Path | None = None) -> Path:
+    """
+    Écrit les trois DataFrames dans le cache (une colonne = un fichier .npy).
+    L'écriture se fait dans un dossier temporaire renommé à la fin.
+    """
+    json_file = Path(json_file)
+    cache_path = cache_path_for(json_file, cache_dir)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    stat = json_file.stat()
+    manifest = {
+        "version": CACHE_VERSION,
+        "source": json_file.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "digest": file_digest(json_file),
+        "frames": {},
+    }
+    for name, df in zip(FRAME_NAMES, frames):
+        columns = []
+        for i, column_name in enumerate(df.columns):
+            kind, arrays = _encode_column(df[column_name])
+            files = [f"{name}_{i}_{j}.npy" for j in range(len(arrays))]
+            for file_name, array in zip(files, arrays):
+                np.save(tmp_path / file_name, array, allow_pickle=False)
+            columns.append({"name": column_name, "kind": kind, "files": files})
+        manifest["frames"][name] = columns
+    with open(tmp_path / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(cache_path, ignore_errors=True)
+    os.replace(tmp_path, cache_path)
+    return cache_path
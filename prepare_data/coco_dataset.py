@@ -0,0 +1,94 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from prepare_data.data_loader import load_coco_json
+
+
+class CocoDataset:
+    """
+    Jeu de données COCO chargé une seule fois en mémoire.
+
+    Les index (id d'image, nom de fichier, catégories, annotations par image)
+    sont construits à l'initialisation pour que toutes les étapes du pipeline
+    partagent le même objet sans relire le fichier JSON.
+    """
+
+    def __init__(self, images_df: pd.DataFrame, annotations_df: pd.DataFrame,
+                 categories_df: pd.DataFrame, json_path: str | Path | None = None):
+        self.images_df = images_df
+        self.annotations_df = annotations_df
+        self.categories_df = categories_df
+        self.json_path = Path(json_path) if json_path is not None else None
+        self._build_indexes()
+
+    @classmethod
+    def from_json(cls, json_path: str | Path) -> "CocoDataset":
+        """Charge un fichier COCO JSON (une seule lecture) et construit les index."""
+        images_df, annotations_df, categories_df = load_coco_json(json_path)
+        return cls(images_df, annotations_df, categories_df, json_path=json_path)
+
+    # === Index ===
+
+    def _build_indexes(self):
+        images = self.images_df
+        annotations = self.annotations_df
+        categories = self.categories_df
+
+        image_ids = images['id'].to_numpy() if 'id' in images.columns else np.empty(0, dtype=np.int64)
+        file_names = images['file_name'].to_numpy() if 'file_name' in images.columns else np.empty(0, dtype=object)
+
+        # id d'image -> position de la ligne dans images_df
+        self.image_index = dict(zip(image_ids.tolist(), range(len(image_ids))))
+        # nom de fichier -> id d'image
+        self.file_name_index = dict(zip(file_names.tolist(), image_ids.tolist()))
+
+        if 'id' in categories.columns and 'name' in categories.columns:
+            self.category_index = dict(zip(categories['id'].tolist(), categories['name'].tolist()))
+        else:
+            self.category_index = {}
+
+        # id d'image -> positions des annotations dans annotations_df
+        self.annotations_by_image = {}
+        if 'image_id' in annotations.columns and len(annotations):
+            ann_image_ids = annotations['image_id'].to_numpy()
+            order = np.argsort(ann_image_ids, kind='stable')
+            unique_ids, starts = np.unique(ann_image_ids[order], return_index=True)
+            for image_id, positions in zip(unique_ids.tolist(), np.split(order, starts[1:])):
+                self.annotations_by_image[image_id] = positions
+
+    # === Accès ===
+
+    def frames(self) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Retourne les DataFrames images, annotations et categories."""
+        return self.images_df, self.annotations_df, self.categories_df
+
+    def image(self, image_id) -> dict:
+        """Retourne les informations d'une image à partir de son id."""
+        return self.images_df.iloc[self.image_index[image_id]].to_dict()
+
+    def annotations_for(self, image_id) -> pd.DataFrame:
+        """Retourne les annotations d'une image (DataFrame vide si aucune)."""
+        positions = self.annotations_by_image.get(image_id, np.empty(0, dtype=np.intp))
+        return self.annotations_df.iloc[positions]
+
+    def annotated_image_ids(self) -> set:
+        """Ids des images ayant au moins une annotation."""
+        return set(self.annotations_by_image)
+
+    def annotated_file_names(self) -> set:
+        """Noms de fichiers des images référencées et annotées dans le JSON."""
+        return {
+            file_name
+            for file_name, image_id in self.file_name_index.items()
+            if image_id in self.annotations_by_image
+        }
+
+    def __len__(self) -> int:
+        return len(self.images_df)
+
+    def __repr__(self) -> str:
+        return (f"CocoDataset(images={len(self.images_df)}, "
+                f"annotations={len(self.annotations_df)}, "
+                f"categories={len(self.categories_df)})")
@@ -0,0 +1,143 @@
+import json
+from pathlib import Path
+from typing import Iterator
+
+
+# Nombre d'éléments (images / annotations) par morceau
+CHUNK_SIZE = 10_000
+# Taille des blocs lus sur le disque (en caractères)
+READ_SIZE = 1 << 20
+
+COCO_SECTIONS = ("images", "annotations", "categories")
+
+_WHITESPACE = " \t\n\r"
+
+
+class _JsonStream:
+    """
+    Lecteur JSON incrémental minimal : parcourt l'objet racine d'un fichier
+    COCO et décode les éléments des tableaux un par un, sans jamais charger
+    tout le fichier en mémoire.
+    """
+
+    def __init__(self, f, read_size: int = READ_SIZE):
+        self.f = f
+        self.read_size = read_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        data = self.f.read(self.read_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Retourne le prochain caractère significatif sans le consommer ('' en fin de fichier)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def next_char(self) -> str:
+        char = self.peek()
+        self.pos += 1
+        return char
+
+    def expect(self, char: str):
+        found = self.next_char()
+        if found != char:
+            raise ValueError(f"JSON invalide : '{char}' attendu, '{found}' trouvé")
+
+    def value(self):
+        """Décode une valeur JSON complète à la position courante."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Un nombre en fin de tampon peut être tronqué : on relit pour en être sûr
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def iter_array(self) -> Iterator:
+        """Itère sur les éléments du tableau JSON à la position courante."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.next_char()
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"JSON invalide : ',' ou ']' attendu, '{char}' trouvé")
+
+
+def _batched(items: Iterator, chunk_size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_coco_chunks(json_path: str | Path, sections=COCO_SECTIONS,
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, list[dict]]]:
+    """
+    Parcourt un fichier COCO JSON en streaming et renvoie des couples
+    (section, liste d'au plus chunk_size éléments) dans l'ordre du fichier.
+    Les sections non demandées sont ignorées élément par élément.
+    """
+    json_file = Path(json_path)
+    if not json_file.is_file():
+        raise FileNotFoundError(f"Fichier JSON introuvable : {json_file}")
+
+    with json_file.open("r", encoding="utf-8") as f:
+        stream = _JsonStream(f, READ_SIZE)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if stream.peek() == "[":
+                items = stream.iter_array()
+                if key in sections:
+                    for chunk in _batched(items, chunk_size):
+                        yield key, chunk
+                else:
+                    for _ in items:
+                        pass
+            else:
+                stream.value()
+            char = stream.next_char()
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"JSON invalide : ',' ou '}}' attendu, '{char}' trouvé")
+
+
+def iter_coco_section(json_path: str | Path, section: str,
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[list[dict]]:
+    """Renvoie les éléments d'une seule section ('images', 'annotations', ...) par morceaux."""
+    for _, chunk in iter_coco_chunks(json_path, sections=(section,), chunk_size=chunk_size):
+        yield chunk
+
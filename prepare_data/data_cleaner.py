@@ -3,9 +3,14 @@ from pathlib import Path
 import pandas as pd
 import json
 import os
+import gzip
+import numpy as np
 from PIL import Image
 from collections import Counter
 #from prepare_data.data_loader import load_coco_json
+from prepare_data.coco_dataset import CocoDataset
+from prepare_data.coco_stream import iter_coco_chunks
+from prepare_data.data_loader import bbox_array, bbox_lists, BBOX_COLUMNS
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
@@ -46,18 +51,28 @@ def remove_file(file_path: Path):
 def get_images_without_annotations(images_folder, json_file):
     # Ensure we are working with Path objects
     images_folder = Path(images_folder)
-    json_file = Path(json_file)
 
-    # Load COCO JSON
-    with open(json_file, "r", encoding="utf-8") as f:
-        coco = json.load(f)
-
-    # Get annotated image filenames
-    annotated = {
-        img["file_name"]
-        for img in coco.get("images", [])
-        if any(ann["image_id"] == img["id"] for ann in coco.get("annotations", []))
-    }
+    if isinstance(json_file, CocoDataset):
+        # Dataset déjà chargé : on réutilise ses index au lieu de relire le JSON
+        annotated = json_file.annotated_file_names()
+    else:
+        json_file = Path(json_file)
+
+        # Load COCO JSON en streaming : on ne garde que les ids et noms de fichiers
+        image_names = {}
+        annotated_ids = set()
+        for section, chunk in iter_coco_chunks(json_file, sections=("images", "annotations")):
+            if section == "images":
+                image_names.update((img["id"], img["file_name"]) for img in chunk)
+            else:
+                annotated_ids.update(ann["image_id"] for ann in chunk)
+
+        # Get annotated image filenames (un seul passage sur les annotations)
+        annotated = {
+            file_name
+            for image_id, file_name in image_names.items()
+            if image_id in annotated_ids
+        }
 
     # Get all images in the folder
     all_images = {p.name for p in images_folder.glob("*.jpg")}
@@ -77,10 +92,9 @@ def annotations_without_image(annotations_df: pd.DataFrame, images_df: pd.DataFr
 
 def detect_bbox_anomalies(annotations_df: pd.DataFrame) -> pd.DataFrame:
     """Détecte les BBoxes aberrantes"""
-    def is_abnormal(bbox):
-        w, h = bbox[2], bbox[3]
-        return w == 0 or h == 0
-    anomalies = annotations_df[annotations_df['bbox'].apply(is_abnormal)]
+    boxes = bbox_array(annotations_df)
+    is_abnormal = (boxes[:, 2] == 0) | (boxes[:, 3] == 0)
+    anomalies = annotations_df[is_abnormal]
     return anomalies
 
 def remove_images_without_annotations(images_df: pd.DataFrame, annotations_df: pd.DataFrame, DATA_DIR) -> pd.DataFrame:
@@ -99,12 +113,72 @@ def clean_annotations(annotations_df: pd.DataFrame, images_df: pd.DataFrame) ->
     annotations_df = annotations_df[annotations_df['image_id'].isin(images_df['id'])]
     return annotations_df
 
-def save_coco_json(images_df: pd.DataFrame, annotations_df: pd.DataFrame, categories: list, save_path: Path):
-    """Sauvegarde un fichier COCO JSON"""
-    coco_clean = {
-        "images": images_df.to_dict(orient="records"),
-        "annotations": annotations_df.to_dict(orient="records"),
-        "categories": categories
-    }
-    with open(save_path, "w", encoding="utf-8") as f:
-        json.dump(coco_clean, f, ensure_ascii=False, indent=4)
+def _json_default(value):
+    """Convertit les scalaires NumPy restants en types Python."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Type non sérialisable : {type(value)}")
+
+def _iter_records(df: pd.DataFrame, chunk_size: int):
+    """Parcourt les lignes d'un DataFrame par morceaux, en reconstruisant 'bbox' si besoin."""
+    rebuild_bbox = 'bbox' not in df.columns and all(col in df.columns for col in BBOX_COLUMNS)
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        if rebuild_bbox:
+            # Reconstruire la colonne COCO 'bbox' à partir des colonnes x, y, w, h
+            chunk = chunk.drop(columns=BBOX_COLUMNS).assign(bbox=bbox_lists(chunk))
+        yield from chunk.to_dict(orient="records")
+
+def save_coco_json(images_df: pd.DataFrame, annotations_df: pd.DataFrame, categories: list, save_path: Path,
+                   compact: bool = False, use_gzip: bool | None = None, chunk_size: int = 10_000):
+    """
+    Sauvegarde un fichier COCO JSON.
+    Les images et annotations sont sérialisées par morceaux directement depuis les
+    DataFrames, sans construire le dictionnaire complet en mémoire. compact supprime
+    l'indentation ; use_gzip (par défaut si save_path finit par .gz) compresse la sortie.
+    Le fichier est écrit sous un nom temporaire puis renommé une fois complet.
+    """
+    save_path = Path(save_path)
+    if use_gzip is None:
+        use_gzip = save_path.suffix == ".gz"
+    if isinstance(categories, pd.DataFrame):
+        categories = categories.to_dict(orient="records")
+
+    indent = None if compact else 4
+    separators = (",", ":") if compact else (",", ": ")
+    item_sep = "," if compact else ",\n"
+    item_prefix = "" if compact else " " * 8
+
+    def dumps(obj):
+        text = json.dumps(obj, ensure_ascii=False, indent=indent, separators=separators, default=_json_default)
+        return text if compact else text.replace("\n", "\n" + item_prefix)
+
+    tmp_path = save_path.with_name(f".{save_path.name}.tmp-{os.getpid()}")
+    opener = gzip.open if use_gzip else open
+    try:
+        with opener(tmp_path, "wt", encoding="utf-8") as f:
+            f.write("{" if compact else "{\n")
+            sections = [("images", _iter_records(images_df, chunk_size)),
+                        ("annotations", _iter_records(annotations_df, chunk_size)),
+                        ("categories", iter(categories))]
+            for i, (name, records) in enumerate(sections):
+                f.write(f'"{name}":[' if compact else f'    "{name}": [\n')
+                buffer = []
+                first = True
+                for record in records:
+                    # Séparateur uniquement entre deux éléments (pas de virgule finale)
+                    buffer.append(("" if first else item_sep) + item_prefix + dumps(record))
+                    first = False
+                    if len(buffer) >= chunk_size:
+                        f.write("".join(buffer))
+                        buffer = []
+                f.write("".join(buffer))
+                closing = "]" if compact else "\n    ]"
+                f.write(closing + ("," if i < len(sections) - 1 else "") + ("" if compact else "\n"))
+            f.write("}")
+        os.replace(tmp_path, save_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
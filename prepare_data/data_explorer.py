@@ -1,6 +1,7 @@
-import json
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from prepare_data.data_loader import bbox_array
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -8,14 +9,18 @@ DATA_DIR = BASE_DIR / "data"
 JSON_FILE = DATA_DIR / "_annotations.coco.json"
 
 
-# === Charger le fichier COCO ===
-with open(JSON_FILE, "r") as f:
-    coco = json.load(f)
+# === Chargement paresseux du fichier COCO ===
+# images_df, annotations_df et categories_df ne sont lus qu'au premier accès
+# (PEP 562) : importer le module ne fait aucune lecture disque.
+_LAZY_FRAMES = ("images_df", "annotations_df", "categories_df")
 
-# Transformer en DataFrames
-images_df = pd.DataFrame(coco["images"])
-annotations_df = pd.DataFrame(coco["annotations"])
-categories_df = pd.DataFrame(coco["categories"])
+def __getattr__(name):
+    if name in _LAZY_FRAMES:
+        from prepare_data.pipeline import get_dataset  # import local : pipeline importe ce module
+        frames = dict(zip(_LAZY_FRAMES, get_dataset().frames()))
+        globals().update(frames)
+        return frames[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # === Fonctions d'exploration ===
 def annotations_per_image(annotations_df: pd.DataFrame) -> pd.DataFrame:
@@ -33,32 +38,34 @@ def images_per_category(annotations_df: pd.DataFrame, categories_df: pd.DataFram
 
 def bbox_stats(annotations_df: pd.DataFrame) -> pd.DataFrame:
     """Stats sur les bounding boxes (largeur, hauteur, surface)."""
-    df = annotations_df.copy()
-    df['width'] = df['bbox'].apply(lambda x: x[2])
-    df['height'] = df['bbox'].apply(lambda x: x[3])
-    df['area'] = df['width'] * df['height']
-    return df[['width', 'height', 'area']].describe()
+    boxes = bbox_array(annotations_df)
+    df = pd.DataFrame({
+        'width': boxes[:, 2],
+        'height': boxes[:, 3],
+        'area': boxes[:, 2] * boxes[:, 3],
+    })
+    return df.describe()
 
 def bbox_issues(annotations_df: pd.DataFrame, images_df: pd.DataFrame) -> pd.DataFrame:
     """Detecte bboxes hors limites ou surface nulle."""
     merged = annotations_df.merge(images_df, left_on='image_id', right_on='id', suffixes=('_ann', '_img'))
     
-    # Extraire les coordonnées
-    merged['x_min'] = merged['bbox'].apply(lambda x: x[0])
-    merged['y_min'] = merged['bbox'].apply(lambda x: x[1])
-    merged['w'] = merged['bbox'].apply(lambda x: x[2])
-    merged['h'] = merged['bbox'].apply(lambda x: x[3])
+    # Extraire les coordonnées (vectorisé)
+    boxes = bbox_array(merged)
+    x_min, y_min, w, h = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    width = merged['width'].to_numpy(dtype=np.float32)
+    height = merged['height'].to_numpy(dtype=np.float32)
     
     # Conditions invalides
-    invalid = merged[
-        (merged['x_min'] < 0) | 
-        (merged['y_min'] < 0) |
-        (merged['x_min'] + merged['w'] > merged['width']) |
-        (merged['y_min'] + merged['h'] > merged['height']) |
-        (merged['w'] == 0) |
-        (merged['h'] == 0)
-    ]
-    return invalid
+    invalid = (
+        (x_min < 0) |
+        (y_min < 0) |
+        (x_min + w > width) |
+        (y_min + h > height) |
+        (w == 0) |
+        (h == 0)
+    )
+    return merged[invalid]
 
 def missing_values(df: pd.DataFrame) -> pd.Series:
     """Nombre de valeurs manquantes par colonne."""
@@ -1,6 +1,9 @@
-import json
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from typing import Iterator
+from prepare_data.annotation_cache import load_cached_frames, save_cached_frames
+from prepare_data.coco_stream import CHUNK_SIZE, COCO_SECTIONS, iter_coco_chunks, iter_coco_section
 
 
 # Base directory (root of the project)
@@ -8,21 +11,96 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 JSON_FILE = DATA_DIR / "_annotations.coco.json"
 
+# Colonnes float32 qui remplacent la colonne objet 'bbox' [x, y, w, h]
+BBOX_COLUMNS = ['x', 'y', 'w', 'h']
 
-def load_coco_json(json_path: str | Path) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+
+def bbox_array(annotations_df: pd.DataFrame) -> np.ndarray:
+    """
+    Retourne les bounding boxes sous forme de tableau (N, 4) float32.
+    Utilise les colonnes x, y, w, h si elles existent, sinon la colonne 'bbox'.
+    """
+    if all(col in annotations_df.columns for col in BBOX_COLUMNS):
+        return annotations_df[BBOX_COLUMNS].to_numpy(dtype=np.float32)
+    if 'bbox' not in annotations_df.columns or annotations_df.empty:
+        return np.empty((0, 4), dtype=np.float32)
+    return np.asarray(annotations_df['bbox'].tolist(), dtype=np.float32).reshape(-1, 4)
+
+
+def expand_bbox(annotations_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Remplace la colonne 'bbox' (listes Python) par des colonnes float32 x, y, w, h, area.
+    """
+    if 'bbox' not in annotations_df.columns:
+        return annotations_df
+    boxes = bbox_array(annotations_df)
+    df = annotations_df.drop(columns='bbox')
+    for i, col in enumerate(BBOX_COLUMNS):
+        df[col] = boxes[:, i]
+    if 'area' in df.columns:
+        df['area'] = df['area'].astype(np.float32)
+    else:
+        df['area'] = boxes[:, 2] * boxes[:, 3]
+    return df
+
+
+def bbox_lists(annotations_df: pd.DataFrame) -> list:
+    """Reconstruit la liste des bbox [x, y, w, h] (format COCO) d'un DataFrame d'annotations."""
+    if 'bbox' in annotations_df.columns:
+        return annotations_df['bbox'].tolist()
+    return bbox_array(annotations_df).astype(np.float64).round(4).tolist()
+
+
+def chunk_to_frame(section: str, chunk: list[dict]) -> pd.DataFrame:
+    """Morceau d'une section COCO -> DataFrame (annotations au format colonnes x, y, w, h, area)."""
+    df = pd.DataFrame(chunk)
+    if section == "annotations":
+        df = expand_bbox(df)
+    return df
+
+
+def iter_coco_frames(json_path: str | Path, section: str,
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Renvoie une section du fichier COCO sous forme de DataFrames d'au plus chunk_size lignes.
+    Les annotations sont converties au format colonnes (x, y, w, h, area).
+    """
+    for chunk in iter_coco_section(json_path, section, chunk_size=chunk_size):
+        yield chunk_to_frame(section, chunk)
+
+
+def _parse_coco_json(json_file: Path, chunk_size: int) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    frames = {section: [] for section in COCO_SECTIONS}
+    for section, chunk in iter_coco_chunks(json_file, chunk_size=chunk_size):
+        frames[section].append(chunk_to_frame(section, chunk))
+    return tuple(
+        pd.concat(frames[section], ignore_index=True) if frames[section] else pd.DataFrame()
+        for section in COCO_SECTIONS
+    )
+
+
+def load_coco_json(json_path: str | Path, chunk_size: int = CHUNK_SIZE, use_cache: bool = True,
+                   cache_dir: str | Path | None = None) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Charge un fichier COCO JSON et renvoie les DataFrames images, annotations et categories.
+    Le fichier est lu en streaming : seuls les DataFrames finaux et un morceau de
+    chunk_size éléments sont en mémoire, jamais le dictionnaire JSON complet.
+    Avec use_cache, les DataFrames sont relus depuis un cache binaire (.npy)
+    tant que le fichier JSON n'a pas changé.
     """
     json_file = Path(json_path)
     if not json_file.is_file():
         raise FileNotFoundError(f"Fichier JSON introuvable : {json_file}")
     
-    with json_file.open('r', encoding='utf-8') as f:
-        coco_dict = json.load(f)
-    # print(coco_dict)
-    images_df = pd.DataFrame(coco_dict.get("images", []))
-    annotations_df = pd.DataFrame(coco_dict.get("annotations", []))
-    categories_df = pd.DataFrame(coco_dict.get("categories", []))
+    frames = load_cached_frames(json_file, cache_dir) if use_cache else None
+    if frames is None:
+        frames = _parse_coco_json(json_file, chunk_size)
+        if use_cache:
+            try:
+                save_cached_frames(json_file, frames, cache_dir)
+            except OSError as e:
+                print(f"Cache non écrit : {e}")
+    images_df, annotations_df, categories_df = frames
     
     # Affichage résumé
     print(f"Nombre d'images : {len(images_df)}")
@@ -0,0 +1,489 @@
+import os
+import sys
+import json
+import shutil
+import random
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from prepare_data.coco_stream import iter_coco_chunks
+from prepare_data.dedup import HASH_CACHE_FILE, HAMMING_THRESHOLD, compute_hashes, group_duplicates
+
+# --- CONFIG ---
+DATASET_DIR = "data"      # dossier contenant toutes les images et annotations
+OUTPUT_DIR = "dataset"    # dossier de sortie
+SPLITS = {"train": 0.7, "val": 0.2, "test": 0.1}
+ANNOTATION_FILE = "_annotations.coco.json"
+RANDOM_SEED = 42
+LINK_MODE = "copy"        # "copy", "hardlink", "symlink" ou "reflink"
+LINK_MODES = ("copy", "hardlink", "symlink", "reflink")
+SPLIT_MANIFEST = "split_manifest.json"  # affectation des fichiers, pour les re-découpages incrémentaux
+NUM_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+LABEL_FORMAT = "%d %.6f %.6f %.6f %.6f\n"
+LABEL_CACHE = "labels.npz"  # labels compactés d'un split (tableaux + offsets)
+
+# Strates du découpage stratifié
+COUNT_EDGES = np.array([0, 1, 2, 4, 8])              # nombre de boxes : 0, 1, 2-3, 4-7, 8+
+AREA_EDGES = np.array([0.0, 0.0025, 0.01, 0.04])     # surface moyenne des boxes / surface de l'image
+GOLDEN = (np.sqrt(5) - 1) / 2                         # pas de la suite de Weyl (faible discrépance)
+MAX_COUNT_MATRIX = 50_000_000                         # taille max de la matrice unités x catégories
+
+# ioctl Linux pour cloner un fichier (reflink) sur btrfs / xfs
+FICLONE = 0x40049409
+
+# --- FONCTIONS --- Conversion des annotations COCO → YOLO
+def convert_coco_to_yolo(annotation, img_width, img_height):
+    x, y, w, h = annotation['bbox']
+    x_center = (x + w/2) / img_width
+    y_center = (y + h/2) / img_height
+    w_norm = w / img_width
+    h_norm = h / img_height
+    class_id = annotation['category_id']
+    return [class_id, x_center, y_center, w_norm, h_norm]
+
+def convert_coco_to_yolo_batch(bboxes, img_widths, img_heights):
+    """Version vectorisée : bboxes COCO (N, 4) en pixels -> (N, 4) YOLO normalisées."""
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    widths = np.asarray(img_widths, dtype=np.float64)
+    heights = np.asarray(img_heights, dtype=np.float64)
+    sizes = np.stack([widths, heights, widths, heights], axis=1)
+    centers = bboxes[:, :2] + bboxes[:, 2:] / 2
+    return np.concatenate([centers, bboxes[:, 2:]], axis=1) / sizes
+
+def build_split_labels(images, annotations_per_image):
+    """
+    Convertit en une seule opération toutes les annotations d'une liste d'images.
+    Retourne labels (M, 5) [classe, xc, yc, w, h] et offsets (n + 1,) :
+    les labels de l'image i sont labels[offsets[i]:offsets[i + 1]].
+    """
+    anns_per_img = [annotations_per_image.get(img['id'], []) for img in images]
+    counts = np.array([len(anns) for anns in anns_per_img], dtype=np.int64)
+    offsets = np.zeros(len(images) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    anns = [ann for img_anns in anns_per_img for ann in img_anns]
+    bboxes = np.array([ann['bbox'] for ann in anns], dtype=np.float64).reshape(-1, 4)
+    class_ids = np.array([ann['category_id'] for ann in anns], dtype=np.float64)
+    widths = np.repeat(np.array([img['width'] for img in images], dtype=np.float64), counts)
+    heights = np.repeat(np.array([img['height'] for img in images], dtype=np.float64), counts)
+    labels = np.column_stack([class_ids, convert_coco_to_yolo_batch(bboxes, widths, heights)])
+    return labels, offsets
+
+def format_labels(labels, offsets):
+    """Texte des fichiers labels YOLO de chaque image, formaté en un seul passage."""
+    lines = [LABEL_FORMAT % row for row in map(tuple, labels.tolist())]
+    bounds = offsets.tolist()
+    return ["".join(lines[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+def save_label_cache(path, file_names, labels, offsets):
+    """Écrit les labels d'un split dans un seul fichier (évite d'ouvrir des milliers de .txt)."""
+    np.savez(path, files=np.array(file_names, dtype=str),
+             labels=labels.astype(np.float32), offsets=offsets)
+
+def load_label_cache(path):
+    """Relit un cache de labels : (noms de fichiers, labels (M, 5), offsets)."""
+    with np.load(path) as cache:
+        return cache['files'].tolist(), cache['labels'], cache['offsets']
+
+
+#Organisation des dossiers
+def prepare_dirs(output_dir):
+    for split in SPLITS.keys():
+        os.makedirs(os.path.join(output_dir, split, "images"), exist_ok=True)
+        os.makedirs(os.path.join(output_dir, split, "labels"), exist_ok=True)
+
+#Découpage du dataset en train/val/test
+def split_dataset(file_list, groups=None):
+    """
+    Mélange et découpe la liste selon SPLITS. Si groups est fourni (un numéro de
+    groupe par élément, ex. quasi-doublons), tout un groupe va dans le même split.
+    """
+    if groups is None:
+        random.seed(RANDOM_SEED)
+        random.shuffle(file_list)
+        n = len(file_list)
+        train_end = int(SPLITS['train'] * n)
+        val_end = train_end + int(SPLITS['val'] * n)
+        return {
+            "train": file_list[:train_end],
+            "val": file_list[train_end:val_end],
+            "test": file_list[val_end:]
+        }
+
+    members = {}
+    for item, group in zip(file_list, groups):
+        members.setdefault(int(group), []).append(item)
+    group_ids = sorted(members)
+    random.seed(RANDOM_SEED)
+    random.shuffle(group_ids)
+
+    # On remplit les splits dans l'ordre, groupe par groupe, jusqu'à leur quota
+    n = len(file_list)
+    train_end = int(SPLITS['train'] * n)
+    val_end = train_end + int(SPLITS['val'] * n)
+    dataset_split = {"train": [], "val": [], "test": []}
+    assigned = 0
+    for group_id in group_ids:
+        split = "train" if assigned < train_end else "val" if assigned < val_end else "test"
+        dataset_split[split].extend(members[group_id])
+        assigned += len(members[group_id])
+    return dataset_split
+
+def assign_split(file_name):
+    """
+    Split d'un fichier isolé, déduit du hash de son nom de base : le même fichier
+    tombe toujours dans le même split, sans connaître le reste du dataset.
+    """
+    digest = hashlib.md5(f"{RANDOM_SEED}:{base_name_of(file_name)}".encode()).digest()
+    position = int.from_bytes(digest[:8], "big") / 2**64
+    cumulative = 0.0
+    for split, fraction in SPLITS.items():
+        cumulative += fraction
+        if position < cumulative:
+            return split
+    return split
+
+#Découpage stratifié (nombre de boxes, taille des boxes, catégorie)
+def stratify_keys(n_units, box_units, box_rel_areas, box_categories):
+    """
+    Strate de chaque unité (image ou groupe) : classe du nombre de boxes, classe de
+    surface relative moyenne et catégorie majoritaire, combinées en un entier.
+    box_units : indice de l'unité de chaque box (0 <= indice < n_units).
+    """
+    box_units = np.asarray(box_units, dtype=np.int64)
+    counts = np.bincount(box_units, minlength=n_units)
+    area_sum = np.bincount(box_units, weights=box_rel_areas, minlength=n_units)
+    mean_area = np.divide(area_sum, counts, out=np.zeros(n_units), where=counts > 0)
+
+    # Catégorie majoritaire : comptage des paires (unité, catégorie) puis maximum par unité
+    categories, category_index = np.unique(box_categories, return_inverse=True)
+    dominant = np.full(n_units, -1, dtype=np.int64)
+    if len(categories) and n_units * len(categories) <= MAX_COUNT_MATRIX:
+        per_category = np.bincount(box_units * len(categories) + category_index,
+                                   minlength=n_units * len(categories)).reshape(n_units, len(categories))
+        dominant = np.where(counts > 0, per_category.argmax(axis=1), -1)
+    elif len(categories):
+        # Beaucoup de catégories : paires uniques triées par (unité, -effectif, catégorie),
+        # puis première paire de chaque unité (à égalité, la plus petite catégorie, comme argmax)
+        pairs, pair_counts = np.unique(box_units * len(categories) + category_index, return_counts=True)
+        pair_units, pair_categories = pairs // len(categories), pairs % len(categories)
+        order = np.lexsort((pair_categories, -pair_counts, pair_units))
+        units, first = np.unique(pair_units[order], return_index=True)
+        dominant[units] = pair_categories[order][first]
+
+    count_bucket = np.searchsorted(COUNT_EDGES, counts, side='right') - 1
+    area_bucket = np.searchsorted(AREA_EDGES, mean_area, side='right') - 1
+    return (count_bucket * len(AREA_EDGES) + area_bucket) * (len(categories) + 1) + dominant + 1
+
+def stratified_split(strata, seed=RANDOM_SEED):
+    """
+    Indice du split (dans l'ordre de SPLITS) de chaque unité. Les unités sont triées
+    par strate puis dans un ordre aléatoire (seed), et reçoivent une position de la
+    suite de Weyl frac(phase + i * GOLDEN) : chaque strate, comme tout le dataset,
+    est répartie selon les proportions de SPLITS à quelques unités près.
+    """
+    strata = np.asarray(strata)
+    rng = np.random.default_rng(seed)
+    shuffled = rng.permutation(len(strata))
+    order = shuffled[np.argsort(strata[shuffled], kind='stable')]  # par strate, ordre aléatoire dans la strate
+    positions = (rng.random() + np.arange(len(strata)) * GOLDEN) % 1.0
+    thresholds = np.cumsum(list(SPLITS.values()))[:-1]
+    assignment = np.empty(len(strata), dtype=np.int8)
+    assignment[order] = np.searchsorted(thresholds, positions, side='right')
+    return assignment
+
+def split_quality(assignment, box_images, box_rel_areas, box_categories):
+    """Statistiques par split (effectifs, boxes par image, surfaces, catégories) pour repérer un déséquilibre."""
+    assignment = np.asarray(assignment)
+    box_images = np.asarray(box_images, dtype=np.int64)
+    box_rel_areas = np.asarray(box_rel_areas, dtype=np.float64)
+    box_categories = np.asarray(box_categories)
+    box_splits = assignment[box_images]
+    counts = np.bincount(box_images, minlength=len(assignment))
+    categories = np.unique(box_categories).tolist()
+    rows = []
+    for i, split in enumerate(SPLITS):
+        in_split = assignment == i
+        boxes = box_splits == i
+        row = {
+            'split': split,
+            'images': int(in_split.sum()),
+            'image_share': in_split.mean() if len(assignment) else np.nan,
+            'boxes': int(boxes.sum()),
+            'boxes_per_image': counts[in_split].mean() if in_split.any() else np.nan,
+            'empty_share': (counts[in_split] == 0).mean() if in_split.any() else np.nan,
+            'median_rel_area': np.median(box_rel_areas[boxes]) if boxes.any() else np.nan,
+        }
+        for category in categories:
+            row[f'category_{category}_share'] = (box_categories[boxes] == category).mean() if boxes.any() else np.nan
+        rows.append(row)
+    return pd.DataFrame(rows).set_index('split')
+
+def split_dataset_stratified(images, annotations_per_image, groups=None):
+    """
+    Découpage stratifié d'une liste d'images COCO ; retourne (dataset_split, split_quality).
+    Avec groups (ex. quasi-doublons), la strate et le split sont décidés par groupe.
+    """
+    n = len(images)
+    widths = np.array([img['width'] for img in images], dtype=np.float64)
+    heights = np.array([img['height'] for img in images], dtype=np.float64)
+    anns = [annotations_per_image.get(img['id'], []) for img in images]
+    box_images = np.repeat(np.arange(n), [len(a) for a in anns])
+    flat = [ann for img_anns in anns for ann in img_anns]
+    bboxes = np.array([ann['bbox'] for ann in flat], dtype=np.float64).reshape(-1, 4)
+    box_categories = np.array([ann['category_id'] for ann in flat], dtype=np.int64)
+    box_rel_areas = bboxes[:, 2] * bboxes[:, 3] / np.maximum(widths * heights, 1)[box_images]
+
+    if groups is None:
+        unit_of_image, n_units = np.arange(n), n
+    else:
+        _, unit_of_image = np.unique(np.asarray(groups), return_inverse=True)
+        n_units = int(unit_of_image.max()) + 1 if n else 0
+    strata = stratify_keys(n_units, unit_of_image[box_images], box_rel_areas, box_categories)
+    assignment = stratified_split(strata)[unit_of_image]
+
+    dataset_split = {split: [] for split in SPLITS}
+    names = list(SPLITS)
+    for img, split_index in zip(images, assignment.tolist()):
+        dataset_split[names[split_index]].append(img)
+    return dataset_split, split_quality(assignment, box_images, box_rel_areas, box_categories)
+
+#Index des fichiers : un seul parcours du dossier
+def base_name_of(file_name):
+    return file_name.split('_rf.')[0]  # ignorer le hash
+
+def build_file_index(dataset_dir):
+    """Associe le nom de base Roboflow (avant '_rf.') au chemin du fichier, en un seul passage."""
+    index = {}
+    with os.scandir(dataset_dir) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            if entry.is_file() and not entry.name.endswith('.json'):
+                index.setdefault(base_name_of(entry.name), entry.path)
+    return index
+
+#Copie / liens des images
+def _reflink(src, dst):
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+def place_file(src, dst, mode=LINK_MODE):
+    """Place src en dst par copie, lien physique, lien symbolique ou reflink (copie en repli si non supporté)."""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass  # autre système de fichiers : on copie
+    elif mode == "symlink":
+        os.symlink(os.path.abspath(src), dst)
+        return
+    elif mode == "reflink" and fcntl is not None:
+        try:
+            _reflink(src, dst)
+            return
+        except OSError:
+            if os.path.lexists(dst):
+                os.remove(dst)
+    shutil.copy(src, dst)
+
+def remove_if_exists(path):
+    if os.path.lexists(path):
+        os.remove(path)
+
+#Création des labels YOLO
+def write_label(label_path, label_text):
+    with open(label_path, 'w') as f:
+        f.write(label_text)
+
+#Manifeste des affectations (re-découpage incrémental)
+def load_split_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, SPLIT_MANIFEST), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"mode": None, "files": {}}
+
+def save_split_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, SPLIT_MANIFEST)
+    with open(path + ".tmp", 'w') as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+def stale_split_files(output_dir, new_files, old_files=None):
+    """Fichiers des dossiers images/ et labels/ des splits qui ne font pas partie du nouveau découpage."""
+    old_files = old_files or {}
+    splits = {entry["split"] for entry in new_files.values()} | {entry["split"] for entry in old_files.values()}
+    splits |= {split for split in SPLITS if os.path.isdir(os.path.join(output_dir, split))}
+    planned = {(entry["split"], name) for name, entry in new_files.items()}
+    planned_labels = {(split, os.path.splitext(name)[0] + '.txt') for split, name in planned}
+    stale = []
+    for split in sorted(splits):
+        for kind, expected in (("images", planned), ("labels", planned_labels)):
+            folder = os.path.join(output_dir, split, kind)
+            if not os.path.isdir(folder):
+                continue
+            with os.scandir(folder) as entries:
+                stale.extend(entry.path for entry in entries
+                             if (split, entry.name) not in expected
+                             and (entry.is_file(follow_symlinks=False) or entry.is_symlink()))
+    return stale
+
+def materialize_split(dataset_split, file_index, annotations_per_image, output_dir,
+                      mode=LINK_MODE, workers=NUM_WORKERS, incremental=True, label_cache=False):
+    """
+    Place les images et écrit les labels de chaque split en parallèle (pool de threads).
+    En mode incrémental, seuls les fichiers dont le split, la source ou le label
+    ont changé depuis le dernier passage sont touchés ; les autres sont laissés en place.
+    Sinon tout est réécrit, et tout fichier des dossiers de split absent du nouveau
+    découpage est supprimé (même sans manifeste), pour qu'une image ne reste pas dans deux splits.
+    Avec label_cache, les labels de chaque split sont aussi écrits dans labels.npz.
+    """
+    # Le manifeste précédent sert toujours : il liste les copies à retirer
+    previous = load_split_manifest(output_dir)
+    old_files = previous["files"]
+    same_mode = incremental and previous["mode"] == mode
+    new_files = {}
+    tasks = []
+
+    for split, images in dataset_split.items():
+        print(f"{split}: {len(images)} images")
+        found = []
+        for img_info in images:
+            img_path = file_index.get(base_name_of(img_info['file_name']))
+            if img_path is None:
+                print(f" Fichier introuvable pour {img_info['file_name']}")
+                continue
+            found.append((img_info, img_path))
+
+        # Conversion COCO -> YOLO de tout le split en une fois
+        labels, offsets = build_split_labels([img for img, _ in found], annotations_per_image)
+        label_texts = format_labels(labels, offsets)
+        file_names = [os.path.basename(img_path) for _, img_path in found]
+        if label_cache:
+            save_label_cache(os.path.join(output_dir, split, LABEL_CACHE), file_names, labels, offsets)
+
+        for (img_info, img_path), file_name, label_text in zip(found, file_names, label_texts):
+            label_name = os.path.splitext(file_name)[0] + '.txt'
+            image_dst = os.path.join(output_dir, split, "images", file_name)
+            label_dst = os.path.join(output_dir, split, "labels", label_name)
+            stat = os.stat(img_path)
+            entry = {"split": split, "src": img_path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                     "label": hashlib.md5(label_text.encode()).hexdigest()}
+            new_files[file_name] = entry
+
+            old = old_files.get(file_name)
+            moved = old is None or old["split"] != split
+            # Source modifiée sur place : une copie (copy / reflink) doit être refaite
+            edited = old is not None and (old.get("size"), old.get("mtime_ns")) != (entry["size"], entry["mtime_ns"])
+            if (moved or edited or old["src"] != img_path or not same_mode
+                    or not os.path.lexists(image_dst)):
+                tasks.append((place_file, img_path, image_dst, mode))
+            if (moved or not incremental or old["label"] != entry["label"]
+                    or not os.path.exists(label_dst)):
+                tasks.append((write_label, label_dst, label_text))
+
+    # Fichiers retirés du dataset ou changés de split : supprimer l'ancienne copie
+    for file_name, old in old_files.items():
+        new = new_files.get(file_name)
+        if new is None or new["split"] != old["split"]:
+            label_name = os.path.splitext(file_name)[0] + '.txt'
+            tasks.append((remove_if_exists, os.path.join(output_dir, old["split"], "images", file_name)))
+            tasks.append((remove_if_exists, os.path.join(output_dir, old["split"], "labels", label_name)))
+    if not incremental:
+        tasks.extend((remove_if_exists, path) for path in stale_split_files(output_dir, new_files, old_files))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(*task) for task in tasks]
+        for future in futures:
+            future.result()  # remonte les erreurs éventuelles
+
+    save_split_manifest(output_dir, {"mode": mode, "files": new_files})
+    print(f"{len(tasks)} opérations sur les fichiers ({len(new_files)} images dans le dataset)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Découpage du dataset COCO en train/val/test au format YOLO")
+    parser.add_argument("--link-mode", choices=LINK_MODES, default=LINK_MODE,
+                        help="copie des images ou liens vers les fichiers de data/")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--full", action="store_true",
+                        help="ignorer le manifeste et tout réécrire")
+    parser.add_argument("--split", choices=("stratified", "random"), default="stratified",
+                        help="découpage stratifié (nombre, taille et catégorie des boxes) ou aléatoire")
+    parser.add_argument("--dedup", action="store_true",
+                        help="regrouper les quasi-doublons (hash perceptuel) dans le même split")
+    parser.add_argument("--dedup-threshold", type=int, default=HAMMING_THRESHOLD,
+                        help="distance de Hamming max entre deux quasi-doublons")
+    parser.add_argument("--label-cache", action="store_true",
+                        help="écrire aussi les labels de chaque split dans un seul fichier labels.npz")
+    parser.add_argument("--shards", action="store_true",
+                        help="exporter chaque split en shards tar indexés (dataset/shards) au lieu de fichiers séparés")
+    parser.add_argument("--shard-size", type=int, default=512, help="taille cible d'un shard (Mo)")
+    parser.add_argument("--letterbox", type=int, metavar="SIZE",
+                        help="pré-calculer aussi les images letterboxées SIZExSIZE de chaque split (images_SIZE.npy)")
+    return parser.parse_args()
+
+# --- MAIN ---
+if __name__ == "__main__":
+    args = parse_args()
+    if not args.shards:
+        prepare_dirs(OUTPUT_DIR)
+
+    # Charger annotations COCO (lecture en streaming, par morceaux)
+    images_info = {}
+    annotations_per_image = {}
+    for section, chunk in iter_coco_chunks(os.path.join(DATASET_DIR, ANNOTATION_FILE),
+                                           sections=("images", "annotations")):
+        if section == "images":
+            images_info.update((img['id'], img) for img in chunk)
+            continue
+        for ann in chunk:
+            img_id = ann['image_id']
+            annotations_per_image.setdefault(img_id, []).append(ann)
+
+    # --- FILTRER LES IMAGES RÉELLEMENT PRÉSENTES ---
+    file_index = build_file_index(DATASET_DIR)
+    found_images = [img for img in images_info.values() if base_name_of(img['file_name']) in file_index]
+
+    image_files = found_images
+    groups = None
+    if args.dedup:
+        # --- QUASI-DOUBLONS : même scène => même split ---
+        paths = [file_index[base_name_of(img['file_name'])] for img in image_files]
+        hashes = compute_hashes(paths, cache_path=os.path.join(DATASET_DIR, HASH_CACHE_FILE))
+        groups = group_duplicates(hashes, threshold=args.dedup_threshold)
+        print(f"{len(set(groups.tolist()))} groupes pour {len(image_files)} images")
+    if args.split == "stratified":
+        dataset_split, quality = split_dataset_stratified(image_files, annotations_per_image, groups)
+        print(quality.to_string(float_format=lambda v: f"{v:.4f}"))
+    else:
+        dataset_split = split_dataset(image_files, groups)
+
+    if args.shards:
+        # --- EXPORT EN SHARDS (image + label par échantillon, index d'offsets) ---
+        from prepare_data.shards import export_shards
+        export_shards(dataset_split, file_index, annotations_per_image, OUTPUT_DIR,
+                      max_bytes=args.shard_size * 1024 * 1024)
+    else:
+        # --- COPIE DES IMAGES ET CREATION DES LABELS ---
+        materialize_split(dataset_split, file_index, annotations_per_image, OUTPUT_DIR,
+                          mode=args.link_mode, workers=args.workers, incremental=not args.full,
+                          label_cache=args.label_cache)
+
+    if args.letterbox:
+        # --- CACHE LETTERBOX : décodage et redimensionnement une seule fois ---
+        from prepare_data.letterbox_cache import build_split_caches
+        build_split_caches(dataset_split, file_index, annotations_per_image, OUTPUT_DIR, size=args.letterbox)
+
+    print("Préparation du dataset terminée !")
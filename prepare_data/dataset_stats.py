@@ -0,0 +1,349 @@
+"""
+Statistiques du dataset calculées en un seul passage, par morceaux.
+
+Chaque morceau d'annotations met à jour des compteurs, des histogrammes
+logarithmiques (qui servent aussi d'estimateurs de quantiles) et les contrôles
+hors limites, par catégorie. Deux DatasetStats calculés sur des morceaux ou des
+workers différents se fusionnent avec merge() et donnent le même résultat qu'un
+seul passage sur tout le dataset : aucune jointure images/annotations n'est faite.
+
+Condition pour la fusion : chaque worker doit recevoir les images de ses propres
+annotations (partition par image). Une annotation dont l'image est chez un autre
+worker serait comptée comme sans image ; merge() refuse ce cas (ValueError).
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from prepare_data.coco_stream import CHUNK_SIZE, iter_coco_chunks, iter_coco_section
+from prepare_data.data_loader import bbox_array, chunk_to_frame
+
+
+RELATIVE_ACCURACY = 0.01  # erreur relative max des quantiles
+MIN_VALUE = 1e-2          # en dessous (0 compris) : bucket des valeurs nulles
+MAX_VALUE = 1e10          # au-delà : dernier bucket
+BBOX_MEASURES = ("width", "height", "area")
+
+
+# === Estimateur de quantiles ===
+
+class QuantileSketch:
+    """
+    Histogramme à buckets logarithmiques (principe de DDSketch) : taille fixe,
+    fusion par simple addition et quantiles à RELATIVE_ACCURACY près en relatif.
+    Moyenne, écart-type, min et max sont exacts.
+    """
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        n_buckets = int(np.ceil(np.log(MAX_VALUE / MIN_VALUE) / self._log_gamma))
+        self.counts = np.zeros(n_buckets + 1, dtype=np.int64)  # bucket 0 : valeurs <= MIN_VALUE
+        self.count = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        buckets = np.zeros(len(values), dtype=np.int64)
+        positive = values > MIN_VALUE
+        buckets[positive] = np.clip(
+            np.ceil(np.log(values[positive] / MIN_VALUE) / self._log_gamma), 1, len(self.counts) - 1)
+        self.counts += np.bincount(buckets, minlength=len(self.counts))
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.sum_sq += float(np.square(values).sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Impossible de fusionner des sketches de précisions différentes")
+        self.counts += other.counts
+        self.count += other.count
+        self.sum += other.sum
+        self.sum_sq += other.sum_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return np.nan
+        rank = q * (self.count - 1)
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank, side="right"))
+        if bucket == 0:
+            value = self.min
+        else:
+            value = MIN_VALUE * 2 * self.gamma ** bucket / (self.gamma + 1)
+        return float(np.clip(value, self.min, self.max))
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else np.nan
+
+    def std(self) -> float:
+        """Écart-type de l'échantillon (ddof=1, comme pandas)."""
+        if self.count < 2:
+            return np.nan
+        variance = (self.sum_sq - self.sum ** 2 / self.count) / (self.count - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def histogram(self, buckets_per_bin: int | None = None) -> pd.Series:
+        """Effectifs regroupés par puissance de 2 (par défaut), indexés par la borne basse."""
+        if buckets_per_bin is None:
+            buckets_per_bin = max(1, int(round(np.log(2) / self._log_gamma)))
+        bins = np.concatenate([[0], (np.arange(1, len(self.counts)) - 1) // buckets_per_bin + 1])
+        counts = np.bincount(bins, weights=self.counts).astype(np.int64)
+        lower = np.concatenate([[0.0], MIN_VALUE * self.gamma ** ((np.arange(1, len(counts)) - 1) * buckets_per_bin)])
+        hist = pd.Series(counts, index=lower.round(4), name="count")
+        return hist[hist > 0]
+
+
+# === Statistiques du dataset ===
+
+class _CategoryStats:
+    def __init__(self):
+        self.num_annotations = 0
+        self.out_of_bounds = 0
+        self.zero_size = 0
+        self._image_ids = [np.empty(0, dtype=np.int64)]  # morceaux, dédoublonnés à la lecture
+        self.sketches = {measure: QuantileSketch() for measure in BBOX_MEASURES}
+
+    def image_ids(self) -> np.ndarray:
+        if len(self._image_ids) > 1:
+            self._image_ids = [np.unique(np.concatenate(self._image_ids))]
+        return self._image_ids[0]
+
+    def merge(self, other: "_CategoryStats"):
+        self.num_annotations += other.num_annotations
+        self.out_of_bounds += other.out_of_bounds
+        self.zero_size += other.zero_size
+        self._image_ids.append(other.image_ids())
+        for measure, sketch in self.sketches.items():
+            sketch.merge(other.sketches[measure])
+
+
+class DatasetStats:
+    """
+    Accumulateur de statistiques : add_images() puis update() par morceau d'annotations.
+    Les dimensions d'une image doivent être connues (add_images) avant ses annotations ;
+    sinon l'annotation est comptée comme sans image, comme dans un fichier COCO incomplet.
+    """
+
+    def __init__(self, categories_df: pd.DataFrame | None = None):
+        self.category_names = {}
+        self.categories = {}
+        self.num_annotations = 0
+        self.annotations_without_image = 0
+        self.invalid_annotation_ids = []
+        self._image_ids = np.empty(0, dtype=np.int64)
+        self._image_sizes = np.empty((0, 2), dtype=np.float64)
+        self._annotation_counts = np.empty(0, dtype=np.int64)
+        self._pending_images = []
+        self._orphan_image_ids = []   # image_id des annotations sans image (contrôle de merge)
+        if categories_df is not None:
+            self.add_categories(categories_df)
+
+    # === Construction ===
+
+    @classmethod
+    def from_frames(cls, images_df: pd.DataFrame, annotations_df: pd.DataFrame,
+                    categories_df: pd.DataFrame | None = None, chunk_size: int = CHUNK_SIZE) -> "DatasetStats":
+        stats = cls(categories_df)
+        stats.add_images(images_df)
+        for start in range(0, len(annotations_df), chunk_size):
+            stats.update(annotations_df.iloc[start:start + chunk_size])
+        return stats
+
+    @classmethod
+    def from_dataset(cls, dataset) -> "DatasetStats":
+        return cls.from_frames(dataset.images_df, dataset.annotations_df, dataset.categories_df)
+
+    @classmethod
+    def from_json(cls, json_path: str | Path, chunk_size: int = CHUNK_SIZE) -> "DatasetStats":
+        """
+        Un seul passage en streaming sur le fichier COCO, sans construire les DataFrames complets.
+        Si les annotations précèdent les images dans le fichier, elles sont relues dans un
+        second passage, une fois toutes les images connues.
+        """
+        stats = cls()
+        seen_images, deferred = False, False
+        for section, chunk in iter_coco_chunks(json_path, chunk_size=chunk_size):
+            if section == "annotations" and not seen_images:
+                deferred = True
+                continue
+            frame = chunk_to_frame(section, chunk)
+            if section == "images":
+                seen_images = True
+                stats.add_images(frame)
+            elif section == "annotations":
+                stats.update(frame)
+            else:
+                stats.add_categories(frame)
+        if deferred:
+            for chunk in iter_coco_section(json_path, "annotations", chunk_size=chunk_size):
+                stats.update(chunk_to_frame("annotations", chunk))
+        return stats
+
+    def add_categories(self, categories_df: pd.DataFrame):
+        if len(categories_df):
+            self.category_names.update(zip(categories_df['id'].tolist(), categories_df['name'].tolist()))
+
+    def add_images(self, images_df: pd.DataFrame):
+        if len(images_df):
+            self._pending_images.append((
+                images_df['id'].to_numpy(dtype=np.int64),
+                images_df[['width', 'height']].to_numpy(dtype=np.float64),
+                np.zeros(len(images_df), dtype=np.int64),
+            ))
+
+    def _image_table(self):
+        """Table des images triée par id (les ajouts en attente sont fusionnés une seule fois)."""
+        if self._pending_images:
+            parts = [(self._image_ids, self._image_sizes, self._annotation_counts)] + self._pending_images
+            self._pending_images = []
+            ids = np.concatenate([p[0] for p in parts])
+            sizes = np.concatenate([p[1] for p in parts])
+            counts = np.concatenate([p[2] for p in parts])
+            unique_ids, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+            self._image_ids = unique_ids
+            self._image_sizes = sizes[first]
+            self._annotation_counts = np.bincount(inverse, weights=counts, minlength=len(unique_ids)).astype(np.int64)
+        return self._image_ids, self._image_sizes, self._annotation_counts
+
+    def update(self, annotations_df: pd.DataFrame):
+        """Ajoute un morceau d'annotations (colonnes x, y, w, h ou bbox)."""
+        if not len(annotations_df):
+            return
+        image_ids, image_sizes, _ = self._image_table()
+        boxes = bbox_array(annotations_df)
+        ann_image_ids = annotations_df['image_id'].to_numpy(dtype=np.int64)
+        category_ids = annotations_df['category_id'].to_numpy(dtype=np.int64)
+
+        # Dimensions de l'image de chaque annotation, par recherche dichotomique (pas de jointure)
+        if len(image_ids):
+            positions = np.minimum(np.searchsorted(image_ids, ann_image_ids), len(image_ids) - 1)
+            found = image_ids[positions] == ann_image_ids
+            sizes = np.where(found[:, None], image_sizes[positions], np.nan).astype(np.float32)
+        else:
+            positions = np.zeros(len(boxes), dtype=np.int64)
+            found = np.zeros(len(boxes), dtype=bool)
+            sizes = np.full((len(boxes), 2), np.nan, dtype=np.float32)
+        self._annotation_counts += np.bincount(positions[found], minlength=len(image_ids))
+        self.annotations_without_image += int((~found).sum())
+        if not found.all():
+            self._orphan_image_ids.append(np.unique(ann_image_ids[~found]))
+        self.num_annotations += len(boxes)
+
+        x, y, w, h = boxes.T
+        width, height = sizes.T
+        out_of_bounds = found & ((x < 0) | (y < 0) | (x + w > width) | (y + h > height))
+        zero_size = (w == 0) | (h == 0)
+        invalid = found & (out_of_bounds | zero_size)
+        self.invalid_annotation_ids.extend(annotations_df['id'].to_numpy()[invalid].tolist())
+
+        measures = {"width": w, "height": h, "area": w.astype(np.float64) * h}
+        for category_id in np.unique(category_ids).tolist():
+            mask = category_ids == category_id
+            stats = self.categories.setdefault(category_id, _CategoryStats())
+            stats.num_annotations += int(mask.sum())
+            stats.out_of_bounds += int(out_of_bounds[mask].sum())
+            stats.zero_size += int(zero_size[mask].sum())
+            stats._image_ids.append(np.unique(ann_image_ids[mask]))
+            for measure, values in measures.items():
+                stats.sketches[measure].add(values[mask])
+
+    def _orphan_ids(self) -> np.ndarray:
+        if not self._orphan_image_ids:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(self._orphan_image_ids))
+
+    def merge(self, other: "DatasetStats") -> "DatasetStats":
+        """
+        Fusionne les statistiques d'un autre morceau ou worker (les images partagées ne sont
+        comptées qu'une fois). Les deux parties doivent être partitionnées par image : une
+        annotation sans image d'un côté ne doit pas avoir son image de l'autre.
+        """
+        own_ids = self._image_table()[0]
+        other_ids, other_sizes, other_counts = other._image_table()
+        own_orphans, other_orphans = self._orphan_ids(), other._orphan_ids()
+        split_ids = np.union1d(other_orphans[np.isin(other_orphans, own_ids)],
+                               own_orphans[np.isin(own_orphans, other_ids)])
+        if len(split_ids):
+            raise ValueError(f"Annotations séparées de leur image entre deux workers "
+                             f"(image_id {split_ids[:5].tolist()}) : partitionner par image")
+        self._pending_images.append((other_ids, other_sizes, other_counts))
+        self.category_names.update(other.category_names)
+        for category_id, stats in other.categories.items():
+            self.categories.setdefault(category_id, _CategoryStats()).merge(stats)
+        self.num_annotations += other.num_annotations
+        self.annotations_without_image += other.annotations_without_image
+        self.invalid_annotation_ids.extend(other.invalid_annotation_ids)
+        self._orphan_image_ids.extend(other._orphan_image_ids)
+        return self
+
+    # === Résultats ===
+
+    @property
+    def num_images(self) -> int:
+        return len(self._image_table()[0])
+
+    def annotations_per_image(self) -> pd.DataFrame:
+        image_ids, _, counts = self._image_table()
+        annotated = counts > 0
+        return pd.DataFrame({'image_id': image_ids[annotated], 'num_annotations': counts[annotated]})
+
+    def images_without_annotations(self) -> np.ndarray:
+        image_ids, _, counts = self._image_table()
+        return image_ids[counts == 0]
+
+    def images_per_category(self) -> pd.DataFrame:
+        counts = pd.DataFrame({
+            'category': [self.category_names.get(c, c) for c in self.categories],
+            'num_images': [len(stats.image_ids()) for stats in self.categories.values()],
+        })
+        return counts.sort_values(by='num_images', ascending=False)
+
+    def _sketches(self, measure: str, category_id=None) -> QuantileSketch:
+        if category_id is not None:
+            return self.categories[category_id].sketches[measure]
+        merged = QuantileSketch()
+        for stats in self.categories.values():
+            merged.merge(stats.sketches[measure])
+        return merged
+
+    def bbox_stats(self, category_id=None) -> pd.DataFrame:
+        """Même forme que DataFrame.describe() ; les quartiles sont approchés à RELATIVE_ACCURACY près."""
+        rows = {}
+        for measure in BBOX_MEASURES:
+            sketch = self._sketches(measure, category_id)
+            rows[measure] = [sketch.count, sketch.mean(), sketch.std(),
+                             sketch.min if sketch.count else np.nan,
+                             sketch.quantile(0.25), sketch.quantile(0.5), sketch.quantile(0.75),
+                             sketch.max if sketch.count else np.nan]
+        return pd.DataFrame(rows, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
+
+    def histogram(self, measure: str, category_id=None) -> pd.Series:
+        return self._sketches(measure, category_id).histogram()
+
+    def per_category(self) -> pd.DataFrame:
+        """Résumé par catégorie : effectifs, contrôles et médianes des boxes."""
+        rows = []
+        for category_id, stats in sorted(self.categories.items()):
+            rows.append({
+                'category_id': category_id,
+                'category': self.category_names.get(category_id, category_id),
+                'num_annotations': stats.num_annotations,
+                'num_images': len(stats.image_ids()),
+                'out_of_bounds': stats.out_of_bounds,
+                'zero_size': stats.zero_size,
+                **{f'{measure}_median': stats.sketches[measure].quantile(0.5) for measure in BBOX_MEASURES},
+            })
+        return pd.DataFrame(rows)
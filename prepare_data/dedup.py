@@ -0,0 +1,175 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+
+HASH_SIZE = 8             # hash de 8 x 8 = 64 bits
+DCT_SIZE = 32             # image réduite avant la DCT
+HAMMING_THRESHOLD = 4     # distance max (en bits) entre deux quasi-doublons
+MAX_BUCKET_LAG = 512      # voisins comparés par décalage ; au-delà, comparaison complète du segment
+PAIR_BLOCK = 1024         # lignes par bloc lors de la comparaison complète d'un grand segment
+HASH_CACHE_FILE = ".phash_cache.json"
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+
+_DCT = _dct_matrix(DCT_SIZE)
+_BIT_WEIGHTS = np.uint64(1) << np.arange(HASH_SIZE * HASH_SIZE, dtype=np.uint64)
+
+
+def phash(image_path: str | Path) -> int:
+    """Hash perceptuel (pHash, 64 bits) : signe des basses fréquences de la DCT."""
+    with Image.open(image_path) as img:
+        img.draft("L", (DCT_SIZE * 2, DCT_SIZE * 2))  # décodage JPEG réduit, beaucoup plus rapide
+        small = img.convert("L").resize((DCT_SIZE, DCT_SIZE), Image.Resampling.LANCZOS)
+    pixels = np.asarray(small, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    bits = low > np.median(low[1:])  # on ignore la composante continue
+    return int(_BIT_WEIGHTS[bits].sum())
+
+
+# === Cache des hashes ===
+
+def _load_hash_cache(cache_path: Path) -> dict:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_hash_cache(cache_path: Path, cache: dict):
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def compute_hashes(paths, cache_path: str | Path | None = None, workers: int | None = None,
+                   chunksize: int = 64) -> np.ndarray:
+    """
+    Calcule les pHash d'une liste d'images avec un pool de processus.
+    Les hashes sont mis en cache par fichier (taille + date de modification) ;
+    seuls les fichiers nouveaux ou modifiés sont recalculés.
+    """
+    paths = [str(p) for p in paths]
+    cache_path = Path(cache_path) if cache_path is not None else None
+    cache = _load_hash_cache(cache_path) if cache_path is not None else {}
+
+    keys = []
+    todo = []
+    for i, path in enumerate(paths):
+        stat = os.stat(path)
+        key = [stat.st_size, stat.st_mtime_ns]
+        keys.append(key)
+        entry = cache.get(path)
+        if entry is None or entry[:2] != key:
+            todo.append(i)
+
+    if todo:
+        todo_paths = [paths[i] for i in todo]
+        if workers == 1 or len(todo) < chunksize:
+            hashes = [phash(p) for p in todo_paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                hashes = list(pool.map(phash, todo_paths, chunksize=chunksize))
+        for i, value in zip(todo, hashes):
+            cache[paths[i]] = keys[i] + [value]
+        if cache_path is not None:
+            _save_hash_cache(cache_path, cache)
+
+    return np.array([cache[path][2] for path in paths], dtype=np.uint64)
+
+
+# === Recherche des quasi-doublons ===
+
+def hamming_distance(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.bitwise_count(np.bitwise_xor(a, b))
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _union(parent: np.ndarray, pairs_i, pairs_j):
+    for i, j in zip(pairs_i, pairs_j):
+        root_i, root_j = _find(parent, i), _find(parent, j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def _union_bucket(parent: np.ndarray, hashes: np.ndarray, members: np.ndarray, threshold: int):
+    """Compare toutes les paires d'un segment trop peuplé pour la fenêtre de décalages, par blocs."""
+    member_hashes = hashes[members]
+    size = len(members)
+    for row in range(0, size - 1, PAIR_BLOCK):
+        block = member_hashes[row:row + PAIR_BLOCK]
+        # Colonnes j > row : on ne garde que le triangle supérieur (j > i)
+        close = hamming_distance(block[:, None], member_hashes[None, row + 1:]) <= threshold
+        close &= np.arange(row + 1, size)[None, :] > np.arange(row, row + len(block))[:, None]
+        rows, cols = np.nonzero(close)
+        _union(parent, members[rows + row].tolist(), members[cols + row + 1].tolist())
+
+
+def group_duplicates(hashes: np.ndarray, threshold: int = HAMMING_THRESHOLD) -> np.ndarray:
+    """
+    Regroupe les images dont les hashes sont à moins de threshold bits.
+
+    Index multiple : le hash est découpé en threshold + 1 segments. Deux hashes
+    à distance <= threshold ont forcément un segment identique (principe des
+    tiroirs), donc on ne compare que les voisins dans chaque segment trié,
+    sans comparer toutes les paires. Un segment qui regroupe plus de MAX_BUCKET_LAG
+    hashes (distribution déséquilibrée) est comparé paire à paire, pour ne manquer
+    aucun quasi-doublon.
+    Retourne un numéro de groupe par image.
+    """
+    if threshold < 0:
+        raise ValueError(f"Seuil de Hamming négatif : {threshold}")
+    # Les hashes identiques sont traités une seule fois
+    hashes, image_to_hash = np.unique(np.asarray(hashes, dtype=np.uint64), return_inverse=True)
+    if threshold == 0:
+        return image_to_hash  # seuil nul : un groupe par hash exact
+    n = len(hashes)
+    parent = np.arange(n)
+    bounds = np.linspace(0, 64, threshold + 2).astype(np.uint64)
+
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        mask = (np.uint64(1) << (stop - start)) - np.uint64(1)
+        segment = (hashes >> start) & mask
+        order = np.argsort(segment, kind="stable")
+        sorted_segment = segment[order]
+        sorted_hashes = hashes[order]
+        for lag in range(1, min(n, MAX_BUCKET_LAG + 1)):
+            same = sorted_segment[lag:] == sorted_segment[:-lag]
+            if not same.any():
+                break
+            left = np.nonzero(same)[0]
+            close = hamming_distance(sorted_hashes[left], sorted_hashes[left + lag]) <= threshold
+            _union(parent, order[left[close]].tolist(), order[left[close] + lag].tolist())
+
+        # Segments plus grands que la fenêtre : les paires éloignées n'ont pas été vues
+        starts = np.flatnonzero(np.r_[True, sorted_segment[1:] != sorted_segment[:-1]])
+        sizes = np.diff(np.r_[starts, n])
+        large = sizes > MAX_BUCKET_LAG + 1
+        for bucket_start, size in zip(starts[large].tolist(), sizes[large].tolist()):
+            _union_bucket(parent, hashes, order[bucket_start:bucket_start + size], threshold)
+
+    # Saut de pointeurs jusqu'à ce que chaque image pointe vers la racine de son groupe
+    roots = parent
+    while True:
+        next_roots = roots[roots]
+        if np.array_equal(next_roots, roots):
+            break
+        roots = next_roots
+    _, groups = np.unique(roots, return_inverse=True)
+    return groups[image_to_hash]
@@ -0,0 +1,401 @@
+"""
+Évaluation locale de prédictions COCO (mAP, courbes PR, erreurs par taille et par image).
+
+    python prepare_data/evaluation.py data/_annotations.coco.json predictions.coco.json
+
+Vérité terrain et prédictions sont lues avec load_coco_json ; les prédictions
+portent une colonne score (cf. inference.py). L'appariement suit les règles de
+COCOeval (boxes, seuils IoU 0.50:0.95, 100 détections max par image et catégorie)
+et est calculé par lots de couples (image, catégorie) répartis sur un pool de processus.
+"""
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from prepare_data.data_loader import bbox_array, load_coco_json
+
+# --- CONFIG ---
+IOU_THRESHOLDS = np.round(np.linspace(0.5, 0.95, 10), 2)
+RECALL_POINTS = np.linspace(0, 1, 101)
+MAX_DETS = 100
+AREA_RANGES = {"all": (0, np.inf), "small": (0, 32 ** 2), "medium": (32 ** 2, 96 ** 2), "large": (96 ** 2, np.inf)}
+SCORE_THRESHOLD = 0.25    # pour le bilan par image
+LOC_IOU = 0.1             # en dessous : faux positif de fond
+BATCH_GROUPS = 1024       # couples (image, catégorie) par tâche
+NUM_WORKERS = os.cpu_count() or 1
+
+
+# === IoU ===
+
+def pairwise_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """IoU entre boxes xywh (..., N, 4) et (..., M, 4) -> (..., N, M)."""
+    a = boxes_a[..., :, None, :]
+    b = boxes_b[..., None, :, :]
+    iw = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+    ih = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+    inter = np.clip(iw, 0, None) * np.clip(ih, 0, None)
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - inter
+    return np.where(union > 0, inter / np.where(union > 0, union, 1), 0.0)
+
+
+def _padded(values: np.ndarray, counts: np.ndarray, width: int) -> tuple[np.ndarray, np.ndarray]:
+    """Valeurs groupées (à la suite) -> tableau (groupes, width, ...) complété et masque de validité."""
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+    valid = np.arange(width)[None, :] < counts[:, None]
+    index = np.where(valid, starts[:, None] + np.arange(width)[None, :], 0)
+    if not len(values):
+        return np.zeros(valid.shape + values.shape[1:], dtype=values.dtype), valid
+    return values[index], valid
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concaténation de arange(start, end) pour chaque couple, sans boucle Python."""
+    counts = (ends - starts).astype(np.int64)
+    shift = starts - np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return np.repeat(shift, counts) + np.arange(counts.sum(), dtype=np.int64)
+
+
+# === Appariement (worker) ===
+
+def match_groups(task) -> tuple:
+    """
+    Appariement glouton COCO pour un lot de couples (image, catégorie), triés par nombre
+    de détections décroissant. Les détections de rang r de tous les couples sont
+    traitées ensemble, pour tous les seuils IoU et toutes les tailles à la fois.
+    Retourne, par détection : tp (n, A, T), ignorée (n, A, T), gt appariée à IoU 0.5
+    (indice local au couple, -1 sinon) et meilleure IoU avec une gt de même catégorie.
+    """
+    det_boxes, det_counts, gt_boxes, gt_counts = task
+    n_groups, depth = len(det_counts), int(det_counts.max())
+    width = max(int(gt_counts.max(initial=0)), 1)
+    dets, det_valid = _padded(det_boxes, det_counts, depth)
+    gts, gt_valid = _padded(gt_boxes, gt_counts, width)
+    iou = np.where(gt_valid[:, None, :], pairwise_iou(dets, gts), -1.0)          # (B, D, G)
+
+    low = np.array([r[0] for r in AREA_RANGES.values()], dtype=np.float64)
+    high = np.array([r[1] for r in AREA_RANGES.values()], dtype=np.float64)
+    gt_area = gts[..., 2] * gts[..., 3]
+    det_area = dets[..., 2] * dets[..., 3]
+    gt_ignore = (gt_area[:, None, :] < low[None, :, None]) | (gt_area[:, None, :] > high[None, :, None])
+    det_outside = (det_area[:, :, None] < low) | (det_area[:, :, None] > high)  # (B, D, A)
+    thresholds = IOU_THRESHOLDS[None, None, :, None]
+
+    n_areas, n_thr = len(AREA_RANGES), len(IOU_THRESHOLDS)
+    matched = np.zeros((n_groups, n_areas, n_thr, width), dtype=bool)
+    tp = np.zeros((n_groups, depth, n_areas, n_thr), dtype=bool)
+    ignored = np.zeros_like(tp)
+    match50 = np.full((n_groups, depth), -1, dtype=np.int64)
+    for rank in range(depth):
+        k = int((det_counts > rank).sum())  # les couples ayant une détection de ce rang (préfixe)
+        row = iou[:k, rank, None, None, :]
+        candidates = (row >= thresholds) & ~matched[:k]
+        # Les gt non ignorées passent en priorité, puis la meilleure IoU
+        priority = np.where(candidates, row + 2.0 * ~gt_ignore[:k, :, None, :], -1.0)
+        best = priority.argmax(axis=3)                                              # (k, A, T)
+        found = np.take_along_axis(priority, best[..., None], axis=3)[..., 0] >= 0
+        groups, areas, thrs = np.nonzero(found)
+        matched[groups, areas, thrs, best[groups, areas, thrs]] = True
+        best_ignored = np.take_along_axis(gt_ignore[:k], best, axis=2)
+        tp[:k, rank] = found & ~best_ignored
+        ignored[:k, rank] = (found & best_ignored) | (~found & det_outside[:k, rank, :, None])
+        match50[:k, rank] = np.where(found[:, 0, 0], best[:, 0, 0], -1)
+
+    best_iou = iou.max(axis=2)
+    return tp[det_valid], ignored[det_valid], match50[det_valid], best_iou[det_valid]
+
+
+# === Chargement ===
+
+def _annotation_arrays(annotations_df: pd.DataFrame, with_score: bool) -> dict:
+    if 'image_id' not in annotations_df.columns or not len(annotations_df):
+        return {"image": np.empty(0, dtype=np.int64), "category": np.empty(0, dtype=np.int64),
+                "boxes": np.empty((0, 4)), "score": np.empty(0)}
+    scores = annotations_df['score'].to_numpy(dtype=np.float64) if with_score else np.ones(len(annotations_df))
+    return {
+        "image": annotations_df['image_id'].to_numpy(dtype=np.int64),
+        "category": annotations_df['category_id'].to_numpy(dtype=np.int64),
+        "boxes": bbox_array(annotations_df).astype(np.float64),
+        "score": scores,
+    }
+
+
+def align_predictions(gt_images: pd.DataFrame, pred_images: pd.DataFrame,
+                      pred_annotations: pd.DataFrame) -> pd.DataFrame:
+    """Ramène les image_id des prédictions sur ceux de la vérité terrain, via file_name."""
+    if not len(pred_images) or 'file_name' not in pred_images.columns or 'image_id' not in pred_annotations.columns:
+        return pred_annotations
+    gt_ids = pd.Series(gt_images['id'].to_numpy(), index=gt_images['file_name'].to_numpy())
+    mapping = pd.Series(gt_ids.reindex(pred_images['file_name']).to_numpy(), index=pred_images['id'].to_numpy())
+    image_ids = pred_annotations['image_id'].map(mapping)
+    unknown = image_ids.isna()
+    if unknown.any():
+        print(f" {int(unknown.sum())} prédictions sur des images absentes de la vérité terrain ignorées")
+    aligned = pred_annotations[~unknown].copy()
+    aligned['image_id'] = image_ids[~unknown].astype(np.int64)
+    return aligned
+
+
+# === Évaluation ===
+
+def _sorted_groups(keys: np.ndarray):
+    """Clés triées -> (clés uniques, début, fin) des groupes."""
+    unique, starts = np.unique(keys, return_index=True)
+    return unique, starts, np.append(starts[1:], len(keys)).astype(np.int64)
+
+
+def _run_batches(tasks, workers):
+    if workers == 1 or len(tasks) <= 1:
+        return [match_groups(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(match_groups, tasks))
+
+
+def accumulate(categories, det_category, det_score, tp, ignored, gt_counts):
+    """
+    Courbes précision/rappel interpolées (101 points) comme COCOeval.
+    Retourne precision (T, R, K, A), scores (T, R, K, A) et recall (T, K, A) ; -1 si aucune gt.
+    """
+    n_thr, n_rec, n_cat, n_areas = len(IOU_THRESHOLDS), len(RECALL_POINTS), len(categories), len(AREA_RANGES)
+    precision = -np.ones((n_thr, n_rec, n_cat, n_areas))
+    scores = -np.ones((n_thr, n_rec, n_cat, n_areas))
+    recall = -np.ones((n_thr, n_cat, n_areas))
+    order = np.argsort(-det_score, kind="mergesort")
+    for k in range(n_cat):
+        selected = order[det_category[order] == k]
+        for a in range(n_areas):
+            n_gt = gt_counts[a, k]
+            if n_gt == 0:
+                continue
+            if not len(selected):
+                precision[:, :, k, a] = scores[:, :, k, a] = recall[:, k, a] = 0
+                continue
+            kept = ~ignored[selected, a]                                        # (n, T)
+            tp_sum = np.cumsum(tp[selected, a] & kept, axis=0, dtype=np.float64)
+            fp_sum = np.cumsum(~tp[selected, a] & kept, axis=0, dtype=np.float64)
+            rc = tp_sum / n_gt
+            pr = tp_sum / np.maximum(tp_sum + fp_sum, np.finfo(np.float64).eps)
+            pr = np.maximum.accumulate(pr[::-1], axis=0)[::-1]                   # enveloppe décroissante
+            recall[:, k, a] = rc[-1]
+            for t in range(n_thr):
+                index = np.searchsorted(rc[:, t], RECALL_POINTS, side="left")
+                inside = index < len(selected)
+                index = np.minimum(index, len(selected) - 1)
+                precision[t, :, k, a] = np.where(inside, pr[index, t], 0)
+                scores[t, :, k, a] = np.where(inside, det_score[selected][index], 0)
+    return precision, scores, recall
+
+
+def _mean_valid(values: np.ndarray) -> float:
+    values = values[values > -1]
+    return float(values.mean()) if len(values) else np.nan
+
+
+def evaluate(gt_json: str | Path, pred_json: str | Path, workers: int = NUM_WORKERS,
+             score_threshold: float = SCORE_THRESHOLD) -> dict:
+    """
+    Évalue un fichier de prédictions COCO contre la vérité terrain.
+    Retourne un dict : summary, per_category, per_size, per_image (DataFrames / dict),
+    et precision / scores (T, R, K, A) pour tracer les courbes PR (cf. pr_curve).
+    """
+    gt_images, gt_annotations, categories_df = load_coco_json(gt_json)
+    pred_images, pred_annotations, _ = load_coco_json(pred_json)
+    pred_annotations = align_predictions(gt_images, pred_images, pred_annotations)
+    return evaluate_frames(gt_images, gt_annotations, categories_df, pred_annotations, workers, score_threshold)
+
+
+def evaluate_frames(gt_images: pd.DataFrame, gt_annotations: pd.DataFrame, categories_df: pd.DataFrame,
+                    pred_annotations: pd.DataFrame, workers: int = NUM_WORKERS,
+                    score_threshold: float = SCORE_THRESHOLD) -> dict:
+    gt = _annotation_arrays(gt_annotations, with_score=False)
+    det = _annotation_arrays(pred_annotations, with_score=True)
+    image_ids = np.sort(gt_images['id'].to_numpy(dtype=np.int64))
+    categories = np.unique(np.concatenate([gt["category"], det["category"]]))
+    n_cat = max(len(categories), 1)
+
+    # Clé (image, catégorie) ; prédictions triées par clé puis score décroissant, 100 max par clé
+    gt_image_pos = np.searchsorted(image_ids, gt["image"])
+    gt_keys = gt_image_pos * n_cat + np.searchsorted(categories, gt["category"])
+    gt_order = np.argsort(gt_keys, kind="stable")
+    det_keep = np.isin(det["image"], image_ids)
+    det = {name: values[det_keep] for name, values in det.items()}
+    det_image_pos = np.searchsorted(image_ids, det["image"])
+    det_keys = det_image_pos * n_cat + np.searchsorted(categories, det["category"])
+    det_order = np.lexsort((-det["score"], det_keys))
+    unique_keys, starts, ends = _sorted_groups(det_keys[det_order])
+    rank = np.arange(len(det_order)) - np.repeat(starts, ends - starts)
+    det_order = det_order[rank < MAX_DETS]
+    unique_keys, starts, ends = _sorted_groups(det_keys[det_order])
+    sorted_gt_keys = gt_keys[gt_order]
+    gt_starts = np.searchsorted(sorted_gt_keys, unique_keys, side="left")
+    gt_ends = np.searchsorted(sorted_gt_keys, unique_keys, side="right")
+
+    # Lots de couples de tailles voisines (tri par nombre de détections décroissant)
+    det_counts, gt_counts = ends - starts, gt_ends - gt_starts
+    group_order = np.lexsort((-gt_counts, -det_counts))
+    tasks, task_dets, task_gts = [], [], []
+    for first in range(0, len(group_order), BATCH_GROUPS):
+        groups = group_order[first:first + BATCH_GROUPS]
+        dets = det_order[_ranges(starts[groups], ends[groups])]
+        gts = gt_order[_ranges(gt_starts[groups], gt_ends[groups])]
+        tasks.append((det["boxes"][dets], det_counts[groups], gt["boxes"][gts], gt_counts[groups]))
+        task_dets.append(dets)
+        task_gts.append((gts, np.repeat(np.concatenate([[0], np.cumsum(gt_counts[groups])[:-1]]),
+                                        det_counts[groups])))
+
+    n_det, n_areas, n_thr = len(det["score"]), len(AREA_RANGES), len(IOU_THRESHOLDS)
+    tp = np.zeros((n_det, n_areas, n_thr), dtype=bool)
+    ignored = np.ones((n_det, n_areas, n_thr), dtype=bool)  # détections au-delà de MAX_DETS
+    matched_gt = np.full(n_det, -1, dtype=np.int64)
+    best_iou = np.zeros(n_det)
+    for dets, (gts, gt_offset), (batch_tp, batch_ignored, match50, batch_iou) in zip(
+            task_dets, task_gts, _run_batches(tasks, workers)):
+        tp[dets], ignored[dets], best_iou[dets] = batch_tp, batch_ignored, batch_iou
+        has_match = match50 >= 0
+        matched_gt[dets[has_match]] = gts[gt_offset[has_match] + match50[has_match]]
+
+    # Nombre de gt non ignorées par taille et catégorie
+    gt_area = gt["boxes"][:, 2] * gt["boxes"][:, 3]
+    gt_category = np.searchsorted(categories, gt["category"])
+    det_category = np.searchsorted(categories, det["category"])
+    gt_per_size = np.zeros((n_areas, n_cat), dtype=np.int64)
+    for a, (low, high) in enumerate(AREA_RANGES.values()):
+        inside = (gt_area >= low) & (gt_area <= high)
+        gt_per_size[a] = np.bincount(gt_category[inside], minlength=n_cat)
+
+    precision, scores, recall = accumulate(categories, det_category, det["score"], tp, ignored, gt_per_size)
+    sizes = list(AREA_RANGES)
+    t50, t75 = 0, int(np.argmin(np.abs(IOU_THRESHOLDS - 0.75)))
+    summary = {
+        "mAP": _mean_valid(precision[..., 0]),
+        "AP50": _mean_valid(precision[t50, ..., 0]),
+        "AP75": _mean_valid(precision[t75, ..., 0]),
+        **{f"AP_{size}": _mean_valid(precision[..., a]) for a, size in enumerate(sizes) if size != "all"},
+        "AR": _mean_valid(recall[..., 0]),
+    }
+
+    names = dict(zip(categories_df['id'].tolist(), categories_df['name'].tolist())) if len(categories_df) else {}
+    per_category = pd.DataFrame({
+        'category_id': categories,
+        'category': [names.get(c, c) for c in categories.tolist()],
+        'num_gt': gt_per_size[0, :len(categories)],
+        'AP': [_mean_valid(precision[:, :, k, 0]) for k in range(len(categories))],
+        'AP50': [_mean_valid(precision[t50, :, k, 0]) for k in range(len(categories))],
+        'AP75': [_mean_valid(precision[t75, :, k, 0]) for k in range(len(categories))],
+        'recall50': [_mean_valid(recall[t50, k, 0]) for k in range(len(categories))],
+    })
+    per_size = pd.DataFrame({
+        'num_gt': gt_per_size.sum(axis=1),
+        'AP': [_mean_valid(precision[..., a]) for a in range(n_areas)],
+        'AP50': [_mean_valid(precision[t50, ..., a]) for a in range(n_areas)],
+        'recall50': [_mean_valid(recall[t50, :, a]) for a in range(n_areas)],
+    }, index=pd.Index(sizes, name='size'))
+
+    per_image = image_errors(gt_images, image_ids, gt, gt_image_pos, det, det_image_pos,
+                             tp[:, 0, 0], best_iou, score_threshold)
+    return {"summary": summary, "per_category": per_category, "per_size": per_size, "per_image": per_image,
+            "precision": precision, "scores": scores, "categories": categories}
+
+
+# === Erreurs par image ===
+
+def image_errors(gt_images, image_ids, gt, gt_image_pos, det, det_image_pos, tp50, best_iou,
+                 score_threshold: float = SCORE_THRESHOLD) -> pd.DataFrame:
+    """
+    Bilan par image à IoU 0.5 pour les détections de score >= score_threshold :
+    vrais positifs, gt manquées, et faux positifs classés en doublon (gt déjà prise),
+    mauvaise classe (IoU >= 0.5 avec une gt d'une autre catégorie), localisation
+    (IoU entre LOC_IOU et 0.5 avec une gt de même catégorie) et fond.
+    """
+    n_images = len(image_ids)
+    confident = det["score"] >= score_threshold
+    fp = confident & ~tp50
+
+    # IoU avec les gt des autres catégories, image par image, pour les faux positifs restants
+    wrong_class = np.zeros(len(fp), dtype=bool)
+    candidates = np.nonzero(fp & (best_iou < 0.5))[0]
+    if len(candidates) and len(gt_image_pos):
+        candidates = candidates[np.argsort(det_image_pos[candidates], kind="stable")]
+        gt_order = np.argsort(gt_image_pos, kind="stable")
+        images, starts = np.unique(det_image_pos[candidates], return_index=True)
+        ends = np.append(starts[1:], len(candidates))
+        gt_starts = np.searchsorted(gt_image_pos[gt_order], images, side="left")
+        gt_ends = np.searchsorted(gt_image_pos[gt_order], images, side="right")
+        for first in range(0, len(images), BATCH_GROUPS):
+            batch = slice(first, first + BATCH_GROUPS)
+            dets = candidates[_ranges(starts[batch], ends[batch])]
+            gts = gt_order[_ranges(gt_starts[batch], gt_ends[batch])]
+            det_counts, gt_counts = ends[batch] - starts[batch], gt_ends[batch] - gt_starts[batch]
+            det_boxes, det_valid = _padded(det["boxes"][dets], det_counts, int(det_counts.max()))
+            gt_boxes, gt_valid = _padded(gt["boxes"][gts], gt_counts, max(int(gt_counts.max(initial=0)), 1))
+            det_cat, _ = _padded(det["category"][dets], det_counts, det_boxes.shape[1])
+            gt_cat, _ = _padded(gt["category"][gts], gt_counts, gt_boxes.shape[1])
+            other = gt_valid[:, None, :] & (det_cat[:, :, None] != gt_cat[:, None, :])
+            hit = ((pairwise_iou(det_boxes, gt_boxes) >= 0.5) & other).any(axis=2)
+            wrong_class[dets] = hit[det_valid]
+
+    duplicate = fp & (best_iou >= 0.5)
+    wrong_class &= fp & ~duplicate
+    localization = fp & ~duplicate & ~wrong_class & (best_iou >= LOC_IOU)
+    background = fp & ~duplicate & ~wrong_class & ~localization
+
+    def per_image(mask):
+        return np.bincount(det_image_pos[mask], minlength=n_images)
+
+    num_gt = np.bincount(gt_image_pos, minlength=n_images)
+    tp_count = per_image(confident & tp50)
+    file_names = gt_images.set_index('id')['file_name'].reindex(image_ids).to_numpy() \
+        if 'file_name' in gt_images.columns else None
+    return pd.DataFrame({
+        'image_id': image_ids, 'file_name': file_names,
+        'num_gt': num_gt, 'num_det': per_image(confident),
+        'tp': tp_count, 'fp': per_image(fp), 'fn': num_gt - tp_count,
+        'fp_duplicate': per_image(duplicate), 'fp_class': per_image(wrong_class),
+        'fp_localization': per_image(localization), 'fp_background': per_image(background),
+    })
+
+
+def pr_curve(result: dict, iou: float = 0.5, category_id=None, size: str = "all") -> pd.DataFrame:
+    """Courbe précision/rappel interpolée (101 points) ; moyenne des catégories si category_id est None."""
+    t = int(np.argmin(np.abs(IOU_THRESHOLDS - iou)))
+    a = list(AREA_RANGES).index(size)
+    precision = result["precision"][t, :, :, a]
+    if category_id is not None:
+        k = int(np.searchsorted(result["categories"], category_id))
+        return pd.DataFrame({'recall': RECALL_POINTS, 'precision': precision[:, k],
+                             'score': result["scores"][t, :, k, a]})
+    masked = np.where(precision > -1, precision, np.nan)
+    return pd.DataFrame({'recall': RECALL_POINTS, 'precision': np.nanmean(masked, axis=1)})
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Évaluation de prédictions COCO (mAP@[.5:.95], PR, erreurs)")
+    parser.add_argument("ground_truth", help="fichier COCO de vérité terrain")
+    parser.add_argument("predictions", help="fichier COCO des prédictions (avec score)")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--score-threshold", type=float, default=SCORE_THRESHOLD,
+                        help="score minimal pour le bilan par image")
+    parser.add_argument("--per-image", help="écrire le bilan par image dans ce fichier CSV")
+    return parser.parse_args()
+
+# --- MAIN ---
+if __name__ == "__main__":
+    args = parse_args()
+    result = evaluate(args.ground_truth, args.predictions, workers=args.workers,
+                      score_threshold=args.score_threshold)
+    for name, value in result["summary"].items():
+        print(f"{name:<10} {value:.4f}")
+    print("\n--- Par catégorie ---")
+    print(result["per_category"].to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print("\n--- Par taille ---")
+    print(result["per_size"].to_string(float_format=lambda v: f"{v:.4f}"))
+    errors = result["per_image"][['tp', 'fp', 'fn', 'fp_duplicate', 'fp_class', 'fp_localization', 'fp_background']]
+    print("\n--- Erreurs (score >= {}) ---".format(args.score_threshold))
+    print(errors.sum().to_string())
+    if args.per_image:
+        result["per_image"].to_csv(args.per_image, index=False)
@@ -0,0 +1,129 @@
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+PNG_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+
+JPEG_MODES = {1: "L", 3: "RGB", 4: "CMYK"}
+# Marqueurs Start Of Frame (contiennent les dimensions) ; C4, C8 et CC n'en sont pas
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Marqueurs sans champ longueur
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+# Nombre d'octets en fin de fichier où l'on cherche la fin d'image (EOI)
+JPEG_EOI_SEARCH = 32
+
+
+def _read_jpeg_header(f) -> tuple[int, int, str]:
+    """Parcourt les segments JPEG jusqu'au marqueur SOF, sans décoder l'image."""
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise ValueError("SOF introuvable")
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":  # octets de remplissage
+            marker = f.read(1)
+        if not marker:
+            raise ValueError("SOF introuvable")
+        marker = marker[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == 0xDA:  # début des données compressées : plus d'en-tête après
+            raise ValueError("SOF introuvable")
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            raise ValueError("segment JPEG tronqué")
+        length = struct.unpack(">H", length_bytes)[0]
+        if marker in JPEG_SOF_MARKERS:
+            segment = f.read(6)
+            if len(segment) < 6:
+                raise ValueError("segment SOF tronqué")
+            _, height, width, components = struct.unpack(">BHHB", segment)
+            return width, height, JPEG_MODES.get(components, f"{components}ch")
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _read_png_header(f) -> tuple[int, int, str]:
+    f.seek(8)
+    chunk = f.read(8 + 13)
+    if len(chunk) < 21 or chunk[4:8] != b"IHDR":
+        raise ValueError("en-tête IHDR invalide")
+    width, height, _, color_type = struct.unpack(">IIBB", chunk[8:18])
+    return width, height, PNG_MODES.get(color_type, str(color_type))
+
+
+def scan_image(path: str | Path) -> dict:
+    """
+    Lit uniquement l'en-tête d'une image JPEG/PNG : format, dimensions, mode
+    et présence du marqueur de fin (fichier tronqué ou non).
+    """
+    path = Path(path)
+    result = {"file_name": path.name, "format": None, "width": None, "height": None,
+              "mode": None, "truncated": False, "error": None}
+    try:
+        size = path.stat().st_size
+        with open(path, "rb") as f:
+            signature = f.read(8)
+            if signature[:2] == b"\xff\xd8":
+                result["format"] = "JPEG"
+                result["width"], result["height"], result["mode"] = _read_jpeg_header(f)
+                f.seek(max(0, size - JPEG_EOI_SEARCH))
+                result["truncated"] = b"\xff\xd9" not in f.read()
+            elif signature == PNG_SIGNATURE:
+                result["format"] = "PNG"
+                result["width"], result["height"], result["mode"] = _read_png_header(f)
+                f.seek(max(0, size - len(PNG_IEND)))
+                result["truncated"] = f.read() != PNG_IEND
+            else:
+                result["error"] = "format inconnu"
+    except (OSError, ValueError, struct.error) as e:
+        result["error"] = str(e)
+    return result
+
+
+def scan_images(folder: str | Path, workers: int | None = None, chunksize: int = 256) -> pd.DataFrame:
+    """
+    Analyse les en-têtes de toutes les images d'un dossier avec un pool de processus.
+    workers=1 exécute l'analyse dans le processus courant.
+    """
+    folder = Path(folder)
+    paths = sorted(p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS)
+    if workers == 1 or len(paths) < chunksize:
+        results = [scan_image(p) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(scan_image, paths, chunksize=chunksize))
+    columns = ["file_name", "format", "width", "height", "mode", "truncated", "error"]
+    return pd.DataFrame(results, columns=columns)
+
+
+def check_dimensions(scan_df: pd.DataFrame, images_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compare les dimensions lues dans les fichiers à celles de images_df.
+    Retourne les images manquantes, illisibles, tronquées ou aux dimensions différentes.
+    """
+    merged = images_df[['id', 'file_name', 'width', 'height']].merge(
+        scan_df, on='file_name', how='left', suffixes=('', '_file'), indicator=True)
+    missing = merged['_merge'] == 'left_only'
+    unreadable = ~missing & merged['error'].notna()
+    truncated = ~missing & merged['truncated'].fillna(False).astype(bool)
+    mismatch = ~missing & ~unreadable & (
+        (merged['width'] != merged['width_file']) | (merged['height'] != merged['height_file']))
+
+    merged['issue'] = None
+    merged.loc[mismatch, 'issue'] = 'dimensions'
+    merged.loc[truncated, 'issue'] = 'truncated'
+    merged.loc[unreadable, 'issue'] = 'unreadable'
+    merged.loc[missing, 'issue'] = 'missing'
+    issues = merged[merged['issue'].notna()]
+    return issues[['id', 'file_name', 'width', 'height', 'width_file', 'height_file', 'format', 'issue']]
@@ -0,0 +1,190 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from prepare_data.annotation_cache import file_digest
+from prepare_data.coco_dataset import CocoDataset
+from prepare_data.data_cleaner import detect_bbox_anomalies
+from prepare_data.data_loader import bbox_array
+from prepare_data.data_preparation import build_split_labels, format_labels
+from prepare_data.image_scan import IMAGE_EXTENSIONS
+
+
+MANIFEST_VERSION = 1
+MANIFEST_FILE = ".pipeline_manifest.json"
+
+
+# === Manifeste ===
+
+def load_manifest(manifest_path: str | Path) -> dict:
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        manifest = {"version": MANIFEST_VERSION, "files": {}, "images": {}}
+    return manifest
+
+
+def save_manifest(manifest_path: str | Path, manifest: dict):
+    manifest_path = Path(manifest_path)
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+# === Calcul du delta ===
+
+def file_delta(data_dir: str | Path, known_files: dict) -> tuple[dict, set, set]:
+    """
+    Compare les images présentes dans data_dir au manifeste.
+    Retourne (état courant des fichiers, noms nouveaux ou modifiés, noms supprimés).
+    L'empreinte n'est recalculée que si la taille ou la date de modification change.
+    """
+    current = {}
+    changed = set()
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            stat = entry.stat()
+            known = known_files.get(entry.name)
+            if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+                current[entry.name] = known
+                continue
+            digest = file_digest(entry.path)
+            current[entry.name] = [stat.st_size, stat.st_mtime_ns, digest]
+            if known is None or known[2] != digest:
+                changed.add(entry.name)
+    removed = set(known_files) - set(current)
+    return current, changed, removed
+
+
+def image_signatures(images_df: pd.DataFrame, annotations_df: pd.DataFrame) -> pd.Series:
+    """
+    Empreinte de chaque image (métadonnées + ses annotations), calculée de façon vectorisée.
+    Deux passages donnent la même empreinte tant que l'image et ses annotations sont inchangées.
+    """
+    signatures = pd.util.hash_pandas_object(
+        images_df[['id', 'file_name', 'width', 'height']], index=False).to_numpy()
+    if len(annotations_df):
+        boxes = bbox_array(annotations_df)
+        ann_frame = pd.DataFrame({
+            'image_id': annotations_df['image_id'].to_numpy(),
+            'id': annotations_df['id'].to_numpy(),
+            'category_id': annotations_df['category_id'].to_numpy(),
+            'x': boxes[:, 0], 'y': boxes[:, 1], 'w': boxes[:, 2], 'h': boxes[:, 3],
+        })
+        ann_frame['hash'] = pd.util.hash_pandas_object(ann_frame, index=False).to_numpy()
+        # Somme modulo 2**64 : indépendante de l'ordre des annotations
+        per_image = ann_frame.groupby('image_id')['hash'].sum()
+        signatures = signatures + per_image.reindex(images_df['id'], fill_value=0).to_numpy(dtype=np.uint64)
+    return pd.Series(signatures, index=images_df['id'].to_numpy(), dtype=np.uint64)
+
+
+# === Traitement incrémental ===
+
+def run_incremental(dataset: CocoDataset, data_dir: str | Path,
+                    manifest_path: str | Path | None = None,
+                    labels_dir: str | Path | None = None) -> dict:
+    """
+    Ne traite que les images nouvelles, modifiées ou supprimées depuis le dernier passage :
+    détection des bbox aberrantes, images sans annotation ou sans fichier, labels YOLO
+    (sans les bbox aberrantes). Les résultats des images inchangées sont repris du manifeste.
+    Le manifeste retient labels_dir : un nouveau dossier reçoit les labels de toutes les images.
+    """
+    data_dir = Path(data_dir)
+    manifest_path = Path(manifest_path) if manifest_path is not None else data_dir / MANIFEST_FILE
+    manifest = load_manifest(manifest_path)
+    images_df, annotations_df = dataset.images_df, dataset.annotations_df
+    if 'image_id' not in annotations_df.columns:
+        annotations_df = pd.DataFrame(columns=['id', 'image_id', 'category_id', 'bbox'])
+
+    files, changed_files, removed_files = file_delta(data_dir, manifest["files"])
+    signatures = image_signatures(images_df, annotations_df)
+
+    known_images = manifest["images"]
+    current_ids = {str(image_id) for image_id in signatures.index.tolist()}
+    removed_ids = sorted(set(known_images) - current_ids)
+    added_ids, changed_ids = [], []
+    file_names = dict(zip(images_df['id'].tolist(), images_df['file_name'].tolist()))
+    touched_files = changed_files | removed_files
+    for image_id, signature in zip(signatures.index.tolist(), signatures.tolist()):
+        known = known_images.get(str(image_id))
+        if known is None:
+            added_ids.append(image_id)
+        elif known["signature"] != signature or file_names[image_id] in touched_files:
+            changed_ids.append(image_id)
+    delta_ids = added_ids + changed_ids
+
+    # --- Contrôles limités au delta ---
+    delta_images = images_df[images_df['id'].isin(delta_ids)]
+    delta_annotations = annotations_df[annotations_df['image_id'].isin(delta_ids)]
+    anomalies = detect_bbox_anomalies(delta_annotations)
+    anomalies_per_image = anomalies.groupby('image_id')['id'].apply(list).to_dict()
+    annotated_ids = set(delta_annotations['image_id'].tolist())
+
+    # --- Labels YOLO du delta (tout le dataset si le dossier des labels a changé) ---
+    if labels_dir is not None:
+        labels_dir = Path(labels_dir).resolve()
+    relabel_all = labels_dir is not None and manifest.get("labels_dir") != str(labels_dir)
+    if relabel_all:
+        label_images, label_annotations = images_df, annotations_df
+        label_anomaly_ids = set(detect_bbox_anomalies(annotations_df)['id'].tolist())
+    else:
+        label_images, label_annotations = delta_images, delta_annotations
+        label_anomaly_ids = set(anomalies['id'].tolist())
+    # Les bbox aberrantes ne vont pas dans les labels (comme pour l'ingestion continue)
+    label_annotations = label_annotations[~label_annotations['id'].isin(label_anomaly_ids)]
+    label_records = label_images.to_dict(orient="records")
+    boxes = bbox_array(label_annotations).tolist()
+    annotations_per_image = {}
+    for image_id, category_id, bbox in zip(label_annotations['image_id'].tolist(),
+                                           label_annotations['category_id'].tolist(), boxes):
+        annotations_per_image.setdefault(image_id, []).append({"category_id": category_id, "bbox": bbox})
+    labels, offsets = build_split_labels(label_records, annotations_per_image)
+    label_texts = dict(zip([img['file_name'] for img in label_records], format_labels(labels, offsets)))
+
+    if labels_dir is not None:
+        labels_dir.mkdir(parents=True, exist_ok=True)
+        for file_name, text in label_texts.items():
+            (labels_dir / (Path(file_name).stem + ".txt")).write_text(text)
+        for image_id in removed_ids:
+            label_path = labels_dir / (Path(known_images[image_id]["file_name"]).stem + ".txt")
+            if label_path.exists():
+                label_path.unlink()
+        manifest["labels_dir"] = str(labels_dir)
+
+    # --- Mise à jour du manifeste ---
+    for image_id in removed_ids:
+        del known_images[image_id]
+    for image_id in delta_ids:
+        file_name = file_names[image_id]
+        known_images[str(image_id)] = {
+            "file_name": file_name,
+            "signature": int(signatures[image_id]),
+            "has_annotations": image_id in annotated_ids,
+            "file_present": file_name in files,
+            "bbox_anomalies": anomalies_per_image.get(image_id, []),
+        }
+    manifest["files"] = files
+    save_manifest(manifest_path, manifest)
+
+    return {
+        "added": added_ids,
+        "changed": changed_ids,
+        "removed": [int(image_id) if image_id.isdigit() else image_id for image_id in removed_ids],
+        "bbox_anomalies": anomalies,
+        "labels": label_texts,
+        "annotations_without_image": annotations_df.loc[
+            ~annotations_df['image_id'].isin(images_df['id']), 'id'].tolist(),
+        "images_without_annotations": sorted(
+            entry["file_name"] for entry in known_images.values() if not entry["has_annotations"]),
+        "missing_files": sorted(
+            entry["file_name"] for entry in known_images.values() if not entry["file_present"]),
+    }
@@ -0,0 +1,312 @@
+"""
+Inférence YOLO sur CPU pour de grandes scènes satellites, par tuiles.
+
+    python prepare_data/inference.py --weights best.pt --output predictions.coco.json scenes/*.jpg
+
+Chaque scène est décodée une seule fois dans un fichier .npy mémoire-mappé, découpée
+en tuiles qui se chevauchent, et les tuiles de toutes les scènes sont envoyées par
+lots à un pool de processus. Les détections sont ramenées dans le repère de la scène,
+fusionnées par NMS globale et écrites au format COCO (lisible par load_coco_json).
+"""
+import os
+import sys
+import argparse
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from prepare_data.data_cleaner import save_coco_json
+
+# --- CONFIG ---
+TILE_SIZE = 640           # taille des tuiles (celle de l'entraînement)
+OVERLAP = 0.2             # recouvrement entre tuiles voisines
+BATCH_SIZE = 16           # tuiles par lot envoyé à un worker
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.5       # seuil de la NMS globale
+EDGE_MARGIN = 2           # px : une box à moins de cette distance d'un bord de tuile est "coupée"
+NUM_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+MAX_SCENE_PIXELS = 50_000 * 50_000   # limite anti "decompression bomb" relevée pour les scènes
+BAND_ROWS = 1024          # lignes décodées à la fois lors de la mise en cache d'une scène
+RASTER_EXTENSIONS = {".tif", ".tiff", ".jp2"}   # lus par fenêtres avec rasterio s'il est installé
+
+
+# --- Découpage en tuiles ---
+def tile_grid(width, height, tile_size=TILE_SIZE, overlap=OVERLAP):
+    """Coordonnées (x0, y0, x1, y1) des tuiles couvrant l'image ; la dernière colle au bord."""
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return np.array([0])
+        positions = np.arange(0, length - tile_size, stride)
+        return np.append(positions, length - tile_size)
+
+    xs, ys = np.meshgrid(starts(width), starts(height))
+    x0, y0 = xs.ravel(), ys.ravel()
+    return np.stack([x0, y0, np.minimum(x0 + tile_size, width), np.minimum(y0 + tile_size, height)], axis=1)
+
+
+def scene_cache_path(image_path, cache_dir):
+    """
+    Chemin du .npy d'une scène : le nom porte une empreinte du chemin absolu (deux scènes
+    homonymes de dossiers différents ne se confondent pas) et de la taille / date du fichier
+    (une scène modifiée produit un nouveau cache).
+    """
+    image_path = Path(image_path).resolve()
+    stat = image_path.stat()
+    path_key = hashlib.blake2b(str(image_path).encode(), digest_size=6).hexdigest()
+    state_key = hashlib.blake2b(f"{stat.st_size}:{stat.st_mtime_ns}".encode(), digest_size=4).hexdigest()
+    return Path(cache_dir) / f"{image_path.stem}-{path_key}-{state_key}.npy"
+
+
+def _decode_with_rasterio(image_path, npy_path):
+    """Lecture fenêtrée (bandes de BAND_ROWS lignes) : la scène n'est jamais entière en RAM."""
+    import rasterio
+    from rasterio.windows import Window
+    with rasterio.open(image_path) as src:
+        width, height = src.width, src.height
+        channels = list(range(1, min(src.count, 3) + 1))
+        pixels = np.lib.format.open_memmap(npy_path, mode="w+", dtype=np.uint8, shape=(height, width, 3))
+        for y0 in range(0, height, BAND_ROWS):
+            rows = min(BAND_ROWS, height - y0)
+            band = np.moveaxis(src.read(channels, window=Window(0, y0, width, rows)), 0, -1)
+            if band.dtype != np.uint8:
+                band = np.clip(band, 0, 255).astype(np.uint8)
+            pixels[y0:y0 + rows] = band if band.shape[2] == 3 else band[..., :1]
+        pixels.flush()
+
+
+def _decode_with_pil(image_path, npy_path):
+    """
+    Décodage PIL : le buffer décodé par PIL est la seule copie complète, la conversion RGB
+    et l'écriture dans le .npy se font par bandes (pas de tableau RGB entier en plus).
+    """
+    limit = Image.MAX_IMAGE_PIXELS
+    if limit is not None:
+        Image.MAX_IMAGE_PIXELS = max(limit, MAX_SCENE_PIXELS)  # uniquement le temps du chargement
+    try:
+        with Image.open(image_path) as img:
+            img.load()
+            width, height = img.size
+            pixels = np.lib.format.open_memmap(npy_path, mode="w+", dtype=np.uint8, shape=(height, width, 3))
+            for y0 in range(0, height, BAND_ROWS):
+                y1 = min(y0 + BAND_ROWS, height)
+                pixels[y0:y1] = np.asarray(img.crop((0, y0, width, y1)).convert("RGB"))
+            pixels.flush()
+    finally:
+        Image.MAX_IMAGE_PIXELS = limit
+
+
+def load_as_memmap(image_path, cache_dir):
+    """Décode l'image une fois dans un .npy (H, W, 3) uint8 et le rouvre en memory-map."""
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    npy_path = scene_cache_path(image_path, cache_dir)
+    if not npy_path.exists():
+        # Caches périmés de la même scène (fichier modifié depuis)
+        prefix = npy_path.name.rsplit("-", 1)[0] + "-"
+        for stale in npy_path.parent.iterdir():
+            if stale.name.startswith(prefix) and stale.suffix == ".npy":
+                stale.unlink()
+        tmp_path = npy_path.with_name(npy_path.stem + ".tmp.npy")
+        try:
+            import rasterio  # noqa: F401  (dépendance optionnelle)
+            use_rasterio = Path(image_path).suffix.lower() in RASTER_EXTENSIONS
+        except ImportError:
+            use_rasterio = False
+        try:
+            (_decode_with_rasterio if use_rasterio else _decode_with_pil)(image_path, tmp_path)
+            os.replace(tmp_path, npy_path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+    return np.load(npy_path, mmap_mode="r")
+
+
+# --- NMS ---
+def box_iou(box, boxes):
+    """IoU entre une box (4,) et un tableau (N, 4) au format xyxy."""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def nms(boxes, scores, classes, iou_threshold=IOU_THRESHOLD):
+    """NMS par classe (décalage des boxes par classe) ; renvoie les indices conservés."""
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    offset = (boxes.max() + 1) * classes[:, None].astype(np.float64)
+    shifted = boxes + offset
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while len(order):
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        order = rest[box_iou(shifted[best], shifted[rest]) <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+# --- Modèle (un par worker) ---
+class YoloPredictor:
+    """Modèle ultralytics chargé paresseusement dans chaque worker."""
+
+    def __init__(self, weights, tile_size=TILE_SIZE, conf=CONF_THRESHOLD):
+        self.weights = weights
+        self.tile_size = tile_size
+        self.conf = conf
+        self._model = None
+
+    def _load(self):
+        if self._model is None:
+            import torch
+            from ultralytics import YOLO
+            torch.set_num_threads(1)  # un thread par worker : le parallélisme vient du pool
+            self._model = YOLO(self.weights)
+        return self._model
+
+    def names(self):
+        return dict(self._load().names)
+
+    def __call__(self, tiles):
+        """tiles : liste de tableaux RGB -> liste de (boxes xyxy, scores, classes) par tuile."""
+        model = self._load()
+        # ultralytics attend des tableaux BGR (convention OpenCV)
+        results = model.predict([tile[..., ::-1] for tile in tiles], imgsz=self.tile_size,
+                                conf=self.conf, device="cpu", verbose=False)
+        return [(r.boxes.xyxy.numpy(), r.boxes.conf.numpy(), r.boxes.cls.numpy().astype(np.int64))
+                for r in results]
+
+
+_worker_predictor = None
+
+def _init_worker(predictor):
+    global _worker_predictor
+    _worker_predictor = predictor
+
+
+def cut_by_tile_edge(boxes, tile, scene_size, overlap_px):
+    """
+    Masque des boxes coupées par un bord intérieur de la tuile. Un objet plus petit
+    que le recouvrement est vu en entier par la tuile voisine : on ne garde que celle-là.
+    """
+    x0, y0, x1, y1 = tile
+    width, height = scene_size
+    small_w = (boxes[:, 2] - boxes[:, 0]) < overlap_px
+    small_h = (boxes[:, 3] - boxes[:, 1]) < overlap_px
+    return (
+        (small_w & (x0 > 0) & (boxes[:, 0] <= x0 + EDGE_MARGIN)) |
+        (small_w & (x1 < width) & (boxes[:, 2] >= x1 - EDGE_MARGIN)) |
+        (small_h & (y0 > 0) & (boxes[:, 1] <= y0 + EDGE_MARGIN)) |
+        (small_h & (y1 < height) & (boxes[:, 3] >= y1 - EDGE_MARGIN))
+    )
+
+
+def _predict_batch(batch):
+    """batch : liste de (indice image, chemin .npy, taille scène, tuile xyxy, recouvrement) -> détections scène."""
+    tiles = []
+    for _, npy_path, _, (x0, y0, x1, y1), _ in batch:
+        scene = np.load(npy_path, mmap_mode="r")
+        tiles.append(np.ascontiguousarray(scene[y0:y1, x0:x1]))
+    rows = []
+    for (image_index, _, scene_size, tile, overlap_px), (boxes, scores, classes) in zip(
+            batch, _worker_predictor(tiles)):
+        if len(boxes):
+            shifted = np.asarray(boxes, dtype=np.float64) + np.array(tile[:2] * 2, dtype=np.float64)
+            keep = ~cut_by_tile_edge(shifted, tile, scene_size, overlap_px)
+            rows.append(np.column_stack([np.full(keep.sum(), image_index), shifted[keep],
+                                         np.asarray(scores)[keep], np.asarray(classes)[keep]]))
+    return np.concatenate(rows) if rows else np.empty((0, 7))
+
+
+def iter_batches(scenes, tile_size, overlap, batch_size):
+    """Lots de tuiles mélangeant les scènes : (indice image, chemin .npy, taille, tuile, recouvrement)."""
+    overlap_px = tile_size - max(1, int(tile_size * (1 - overlap)))
+    batch = []
+    for image_index, (npy_path, width, height) in enumerate(scenes):
+        for tile in tile_grid(width, height, tile_size, overlap).tolist():
+            batch.append((image_index, npy_path, (width, height), tuple(tile), overlap_px))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def run_inference(image_paths, predictor, tile_size=TILE_SIZE, overlap=OVERLAP, batch_size=BATCH_SIZE,
+                  iou_threshold=IOU_THRESHOLD, workers=NUM_WORKERS, cache_dir=None):
+    """
+    Détecte sur une liste de scènes et renvoie (images_df, annotations_df) au format COCO.
+    predictor doit être picklable et renvoyer (boxes xyxy, scores, classes) par tuile.
+    """
+    tmp = tempfile.TemporaryDirectory(prefix="tiles_") if cache_dir is None else None
+    cache_dir = Path(cache_dir or tmp.name)
+    try:
+        scenes, images = [], []
+        for image_id, image_path in enumerate(image_paths):
+            pixels = load_as_memmap(image_path, cache_dir)
+            height, width = pixels.shape[:2]
+            scenes.append((pixels.filename, width, height))
+            images.append({"id": image_id, "file_name": Path(image_path).name, "width": width, "height": height})
+
+        batches = iter_batches(scenes, tile_size, overlap, batch_size)
+        if workers == 1:
+            _init_worker(predictor)
+            parts = [_predict_batch(batch) for batch in batches]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(predictor,)) as pool:
+                parts = list(pool.map(_predict_batch, batches))
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    detections = np.concatenate(parts) if parts else np.empty((0, 7))
+    annotations = []
+    for image_id in range(len(images)):
+        dets = detections[detections[:, 0] == image_id]
+        keep = nms(dets[:, 1:5], dets[:, 5], dets[:, 6].astype(np.int64), iou_threshold)
+        for x1, y1, x2, y2, score, cls in dets[keep, 1:].tolist():
+            annotations.append({
+                "id": len(annotations), "image_id": image_id, "category_id": int(cls),
+                "bbox": [round(x1, 2), round(y1, 2), round(x2 - x1, 2), round(y2 - y1, 2)],
+                "area": round((x2 - x1) * (y2 - y1), 2), "score": round(score, 5),
+                "segmentation": [], "iscrowd": 0,
+            })
+    return pd.DataFrame(images), pd.DataFrame(annotations)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inférence YOLO par tuiles sur de grandes scènes (CPU)")
+    parser.add_argument("images", nargs="+", help="scènes à traiter")
+    parser.add_argument("--weights", required=True, help="poids YOLO (.pt), ex. runs/.../weights/best.pt")
+    parser.add_argument("--output", default="predictions.coco.json")
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--overlap", type=float, default=OVERLAP)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--conf", type=float, default=CONF_THRESHOLD)
+    parser.add_argument("--iou", type=float, default=IOU_THRESHOLD)
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--cache-dir", help="dossier des scènes décodées (.npy), conservé entre deux appels")
+    return parser.parse_args()
+
+# --- MAIN ---
+if __name__ == "__main__":
+    args = parse_args()
+    predictor = YoloPredictor(args.weights, args.tile_size, args.conf)
+    images_df, annotations_df = run_inference(
+        args.images, predictor, tile_size=args.tile_size, overlap=args.overlap, batch_size=args.batch_size,
+        iou_threshold=args.iou, workers=args.workers, cache_dir=args.cache_dir)
+    categories = [{"id": int(i), "name": name} for i, name in predictor.names().items()]
+    save_coco_json(images_df, annotations_df, categories, Path(args.output), compact=True)
+    print(f"{len(annotations_df)} détections sur {len(images_df)} scènes -> {args.output}")
@@ -0,0 +1,335 @@
+"""
+Ingestion continue d'un dossier alimenté en tuiles et en fragments COCO (*.fragment.json).
+
+    python main.py --watch
+
+Trois tâches asyncio reliées par des files bornées :
+    watch_directory -> arrivals -> read_arrivals -> events -> TileIngestor.run
+Quand une file est pleine, l'étape en amont attend (back-pressure) : une rafale
+de fichiers ne s'accumule pas en mémoire, elle ralentit simplement le scan.
+Un fragment invalide est déplacé dans <sortie>/quarantine sans arrêter la surveillance.
+"""
+import asyncio
+import os
+import shutil
+import signal
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from prepare_data.coco_stream import iter_coco_section
+from prepare_data.data_cleaner import detect_bbox_anomalies
+from prepare_data.data_preparation import (
+    LINK_MODE,
+    assign_split,
+    base_name_of,
+    build_split_labels,
+    format_labels,
+    place_file,
+    prepare_dirs,
+    write_label,
+)
+from prepare_data.image_scan import IMAGE_EXTENSIONS
+
+
+POLL_INTERVAL = 1.0   # secondes entre deux scans du dossier
+QUEUE_SIZE = 64       # éléments max en attente entre deux étapes
+FRAGMENT_CHUNK = 1_000   # images d'un fragment envoyées ensemble au reste de la chaîne
+MAX_PENDING = 10_000     # images (ou entrées COCO) en attente de leur correspondance
+MAX_PLACED = 100_000     # images déjà placées dont on garde le split (mises à jour)
+QUARANTINE_DIR = "quarantine"
+# Seuls les JSON portant ce suffixe sont des fragments : les autres JSON du dossier
+# (export de base, _annotations_clean.coco.json, pipeline_metrics.json...) sont ignorés
+FRAGMENT_SUFFIX = ".fragment.json"
+
+
+# === Surveillance du dossier ===
+
+def is_fragment(name: str) -> bool:
+    return name.lower().endswith(FRAGMENT_SUFFIX)
+
+
+def _list_files(watch_dir: Path) -> dict:
+    """Images et fragments (*.fragment.json) du dossier : {nom: (taille, date de modification)}."""
+    files = {}
+    with os.scandir(watch_dir) as entries:
+        for entry in entries:
+            suffix = os.path.splitext(entry.name)[1].lower()
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            if suffix in IMAGE_EXTENSIONS or is_fragment(entry.name):
+                stat = entry.stat()
+                files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def initial_seen(watch_dir: str | Path, base_json: str | Path) -> dict:
+    """
+    État de départ du scan : les images référencées par l'export COCO de base sont
+    considérées comme déjà vues (elles relèvent du pipeline complet, pas de l'ingestion).
+    """
+    watch_dir, base_json = Path(watch_dir), Path(base_json)
+    if not base_json.is_file():
+        return {}
+    current = _list_files(watch_dir)
+    names = set()
+    for chunk in iter_coco_section(base_json, "images"):
+        names.update(img.get('file_name') for img in chunk)
+    return {name: state for name, state in current.items() if name in names}
+
+
+async def watch_directory(watch_dir: str | Path, arrivals: asyncio.Queue, stop: asyncio.Event,
+                          poll_interval: float = POLL_INTERVAL, seen: dict | None = None):
+    """
+    Met en file chaque fichier nouveau ou modifié, une fois stable (même taille et même
+    date sur deux scans, pour ne pas lire un fichier en cours d'écriture).
+    seen : fichiers à ignorer tant qu'ils ne changent pas (voir initial_seen).
+    """
+    watch_dir = Path(watch_dir)
+    seen, candidates = dict(seen or {}), {}
+    while not stop.is_set():
+        current = await asyncio.to_thread(_list_files, watch_dir)
+        # Fichiers disparus (déplacés, supprimés) : on les oublie
+        seen = {name: state for name, state in seen.items() if name in current}
+        pending = {}
+        for name, state in sorted(current.items()):
+            if seen.get(name) == state:
+                continue
+            if candidates.get(name) != state:
+                pending[name] = state
+                continue
+            seen[name] = state
+            await arrivals.put(watch_dir / name)  # attend si l'étape suivante est en retard
+        candidates = pending
+        try:
+            await asyncio.wait_for(stop.wait(), poll_interval)
+        except asyncio.TimeoutError:
+            pass
+    await arrivals.put(None)
+
+
+# === Lecture des fragments COCO ===
+
+def iter_fragment(json_path: Path, chunk_size: int = FRAGMENT_CHUNK):
+    """
+    Lit un fragment COCO en streaming, en deux passes : les annotations sont regroupées
+    par image, puis les images sont relues par morceaux de chunk_size.
+    Produit ("records", [(image, ses annotations), ...]) par morceau, puis en dernier
+    ("orphans", ids des annotations sans image).
+    """
+    annotations_per_image = {}
+    for chunk in iter_coco_section(json_path, "annotations"):
+        for ann in chunk:
+            annotations_per_image.setdefault(ann['image_id'], []).append(ann)
+    for chunk in iter_coco_section(json_path, "images", chunk_size=chunk_size):
+        yield "records", [(img, annotations_per_image.pop(img['id'], [])) for img in chunk]
+    yield "orphans", [ann['id'] for anns in annotations_per_image.values() for ann in anns]
+
+
+def quarantine(path: Path, output_dir: str | Path, error: Exception):
+    """Déplace un fichier invalide dans <sortie>/quarantine pour inspection."""
+    print(f" Fichier mis en quarantaine {path.name} : {error!r}")
+    target = Path(output_dir) / QUARANTINE_DIR
+    target.mkdir(parents=True, exist_ok=True)
+    try:
+        shutil.move(str(path), target / path.name)
+    except OSError as e:
+        print(f" Quarantaine impossible pour {path.name} : {e}")
+
+
+async def read_arrivals(arrivals: asyncio.Queue, events: asyncio.Queue):
+    """
+    Transforme les fichiers arrivés en événements : ("image", chemin),
+    ("record", image, annotations, fragment), ("orphans", nom du fragment, ids)
+    ou ("invalid", fragment, erreur) pour un fragment illisible.
+    """
+    while (path := await arrivals.get()) is not None:
+        if not is_fragment(path.name):
+            await events.put(("image", path))
+            continue
+        parts = iter_fragment(path)
+        try:
+            # Morceau par morceau : les images du fragment ne sont pas toutes chargées d'un coup
+            while (part := await asyncio.to_thread(next, parts, None)) is not None:
+                kind, items = part
+                if kind == "orphans":
+                    if items:
+                        await events.put(("orphans", path.name, items))
+                    continue
+                for image, annotations in items:
+                    await events.put(("record", image, annotations, path))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            await events.put(("invalid", path, e))
+    await events.put(None)
+
+
+# === Validation, conversion et placement ===
+
+class TileIngestor:
+    """
+    Associe chaque image à son entrée COCO (dans n'importe quel ordre d'arrivée),
+    puis la valide, écrit son label YOLO et la place dans son split, une à la fois.
+    Les éléments en attente de leur correspondance sont bornés (MAX_PENDING) : au-delà,
+    les plus anciens sont abandonnés et comptés dans le bilan.
+    """
+
+    def __init__(self, output_dir: str | Path, mode: str = LINK_MODE,
+                 max_pending: int = MAX_PENDING, max_placed: int = MAX_PLACED):
+        self.output_dir = Path(output_dir)
+        self.mode = mode
+        self.max_pending = max_pending
+        self.max_placed = max_placed
+        self.files = OrderedDict()    # nom de base -> chemin d'une image sans entrée COCO
+        self.records = OrderedDict()  # nom de base -> (image, annotations, fragment) sans fichier
+        self.placed = OrderedDict()   # nom de base -> (split, chemin) des images déjà traitées
+        self.processed = 0
+        self.bbox_anomalies = []
+        self.annotations_without_image = []
+        self.empty_images = set()
+        self.dropped_files = []       # images abandonnées sans entrée COCO
+        self.dropped_records = []     # entrées COCO abandonnées sans fichier
+        self.quarantined = []
+
+    @staticmethod
+    def _remember(table: OrderedDict, key, value, limit: int):
+        """Ajoute à une table bornée ; renvoie l'entrée la plus ancienne évincée, ou None."""
+        table[key] = value
+        table.move_to_end(key)
+        return table.popitem(last=False)[1] if len(table) > limit else None
+
+    async def run(self, events: asyncio.Queue):
+        while (event := await events.get()) is not None:
+            try:
+                await self.handle(event)
+            except (KeyError, TypeError, ValueError, OSError) as e:
+                # Une entrée invalide ne doit pas arrêter le démon
+                if event[0] == "record":
+                    await self.reject(event[3], e)
+                else:
+                    print(f" Événement ignoré {event[:2]} : {e!r}")
+
+    async def reject(self, source: Path, error: Exception):
+        """Met en quarantaine le fragment d'où vient une entrée invalide (une seule fois)."""
+        if source.name in self.quarantined:
+            print(f" Entrée invalide dans {source.name} (déjà en quarantaine) : {error!r}")
+            return
+        self.quarantined.append(source.name)
+        await asyncio.to_thread(quarantine, source, self.output_dir, error)
+
+    async def _process(self, image: dict, annotations: list, image_path: Path, source: Path):
+        try:
+            await asyncio.to_thread(self.process, image, annotations, image_path)
+        except (KeyError, TypeError, ValueError) as e:
+            await self.reject(source, e)
+
+    async def handle(self, event: tuple):
+        kind = event[0]
+        if kind == "invalid":
+            await self.reject(event[1], event[2])
+        elif kind == "orphans":
+            print(f" {len(event[2])} annotations sans image dans {event[1]}")
+            self.annotations_without_image.extend(event[2])
+        elif kind == "image":
+            path = event[1]
+            key = base_name_of(path.name)
+            if key in self.records:
+                image, annotations, source = self.records.pop(key)
+                await self._process(image, annotations, path, source)
+            elif key in self.placed:  # image mise à jour : son label n'a pas changé
+                dst = self.output_dir / self.placed[key][0] / "images" / path.name
+                self.placed[key] = (self.placed[key][0], path)
+                await asyncio.to_thread(place_file, path, dst, self.mode)
+            else:
+                dropped = self._remember(self.files, key, path, self.max_pending)
+                if dropped is not None:
+                    self.dropped_files.append(dropped.name)
+        else:
+            _, image, annotations, source = event
+            key = base_name_of(image['file_name'])
+            if key in self.files:
+                await self._process(image, annotations, self.files.pop(key), source)
+            elif key in self.placed:  # entrée COCO mise à jour d'une image déjà placée
+                await self._process(image, annotations, self.placed[key][1], source)
+            else:
+                dropped = self._remember(self.records, key, (image, annotations, source), self.max_pending)
+                if dropped is not None:
+                    self.dropped_records.append(dropped[0]['file_name'])
+
+    def process(self, image: dict, annotations: list, image_path: Path) -> str:
+        """Valide une image et ses annotations, écrit le label YOLO et place le fichier ; renvoie le split."""
+        valid = annotations
+        if annotations:
+            anomalies = detect_bbox_anomalies(pd.DataFrame(annotations))
+            if len(anomalies):
+                print(f" BBoxes aberrantes ignorées pour {image['file_name']} : {anomalies['id'].tolist()}")
+                self.bbox_anomalies.extend(anomalies['id'].tolist())
+                bad_ids = set(anomalies['id'].tolist())
+                valid = [ann for ann in annotations if ann['id'] not in bad_ids]
+
+        # Conversion avant tout effet de bord : une entrée invalide ne laisse rien derrière elle
+        labels, offsets = build_split_labels([image], {image['id']: valid})
+        label_text = format_labels(labels, offsets)[0]
+        if annotations:
+            self.empty_images.discard(image['file_name'])
+        else:
+            self.empty_images.add(image['file_name'])
+        split = assign_split(image['file_name'])
+        file_name = image_path.name
+        place_file(image_path, self.output_dir / split / "images" / file_name, self.mode)
+        write_label(self.output_dir / split / "labels" / (Path(file_name).stem + ".txt"), label_text)
+        self._remember(self.placed, base_name_of(image['file_name']), (split, image_path), self.max_placed)
+        self.processed += 1
+        return split
+
+    def report(self) -> dict:
+        """Bilan des contrôles depuis le démarrage."""
+        files_without_record = [path.name for path in self.files.values()] + self.dropped_files
+        return {
+            "processed": self.processed,
+            "bbox_anomalies": self.bbox_anomalies,
+            "annotations_without_image": self.annotations_without_image,
+            "images_without_annotations": sorted(self.empty_images | set(files_without_record)),
+            "missing_files": sorted([image['file_name'] for image, _, _ in self.records.values()]
+                                    + self.dropped_records),
+            "quarantined": self.quarantined,
+        }
+
+
+# === Point d'entrée ===
+
+async def ingest(watch_dir: str | Path, output_dir: str | Path, mode: str = LINK_MODE,
+                 poll_interval: float = POLL_INTERVAL, queue_size: int = QUEUE_SIZE,
+                 stop: asyncio.Event | None = None, base_json: str | Path | None = None) -> dict:
+    """
+    Surveille watch_dir jusqu'à ce que stop soit levé ; renvoie le bilan des contrôles.
+    base_json : export COCO complet déjà présent dans watch_dir, ignoré avec ses images.
+    """
+    stop = stop if stop is not None else asyncio.Event()
+    prepare_dirs(output_dir)
+    seen = await asyncio.to_thread(initial_seen, watch_dir, base_json) if base_json else {}
+    arrivals = asyncio.Queue(maxsize=queue_size)
+    events = asyncio.Queue(maxsize=queue_size)
+    ingestor = TileIngestor(output_dir, mode)
+    await asyncio.gather(
+        watch_directory(watch_dir, arrivals, stop, poll_interval, seen),
+        read_arrivals(arrivals, events),
+        ingestor.run(events),
+    )
+    return ingestor.report()
+
+
+def run_watch(watch_dir: str | Path, output_dir: str | Path, **kwargs) -> dict:
+    """Lance l'ingestion ; Ctrl-C (ou SIGTERM) termine les fichiers en cours puis s'arrête."""
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):  # Windows
+                pass
+        return await ingest(watch_dir, output_dir, stop=stop, **kwargs)
+
+    print(f"Surveillance de {watch_dir} (Ctrl-C pour arrêter)")
+    return asyncio.run(main())
@@ -0,0 +1,178 @@
+"""
+Cache d'images pré-redimensionnées (letterbox) par split, pour l'entraînement.
+
+    python prepare_data/data_preparation.py --letterbox 640
+
+Chaque image est décodée une seule fois, réduite en conservant ses proportions et
+complétée par des bandes grises jusqu'à size x size. Les images d'un split sont
+stockées dans un seul tableau uint8 (N, size, size, 3) au format .npy, ouvert en
+memory-map à la lecture ; les labels YOLO sont recalculés pour la transformation.
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from prepare_data.data_preparation import base_name_of, build_split_labels
+
+
+IMAGE_SIZE = 640
+PAD_VALUE = 114           # gris des bandes (convention YOLO)
+CHUNK_IMAGES = 64         # images par tâche envoyée au pool
+NUM_PROCESSES = os.cpu_count() or 1
+
+
+# === Transformation ===
+
+def letterbox_params(width: int, height: int, size: int = IMAGE_SIZE) -> tuple[float, int, int, int, int]:
+    """(échelle, largeur et hauteur redimensionnées, décalages x et y) pour centrer l'image."""
+    scale = min(size / width, size / height)
+    new_w, new_h = max(1, round(width * scale)), max(1, round(height * scale))
+    return scale, new_w, new_h, (size - new_w) // 2, (size - new_h) // 2
+
+
+def letterbox_image(image_path: str | Path, size: int = IMAGE_SIZE) -> tuple[np.ndarray, tuple[int, int]]:
+    """Décode et letterboxe une image ; retourne (tableau (size, size, 3), taille d'origine)."""
+    with Image.open(image_path) as img:
+        width, height = img.size
+        _, new_w, new_h, pad_x, pad_y = letterbox_params(width, height, size)
+        img.draft("RGB", (new_w, new_h))  # JPEG : décodage directement à une résolution réduite
+        resized = img.convert("RGB").resize((new_w, new_h), Image.BILINEAR)
+    canvas = np.full((size, size, 3), PAD_VALUE, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = np.asarray(resized)
+    return canvas, (width, height)
+
+
+def letterbox_labels(labels: np.ndarray, widths: np.ndarray, heights: np.ndarray,
+                     size: int = IMAGE_SIZE) -> np.ndarray:
+    """
+    Labels YOLO (M, 5) normalisés sur l'image d'origine -> normalisés sur l'image letterboxée.
+    widths / heights : dimensions d'origine de l'image de chaque label.
+    """
+    widths = np.asarray(widths, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float64)
+    scale = np.minimum(size / widths, size / heights)
+    new_w = np.maximum(1, np.round(widths * scale))
+    new_h = np.maximum(1, np.round(heights * scale))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    out = labels.astype(np.float64, copy=True)
+    out[:, 1] = (labels[:, 1] * new_w + pad_x) / size
+    out[:, 2] = (labels[:, 2] * new_h + pad_y) / size
+    out[:, 3] = labels[:, 3] * new_w / size
+    out[:, 4] = labels[:, 4] * new_h / size
+    return out
+
+
+# === Construction du cache ===
+
+def _fill_chunk(task) -> list[tuple[int, int]]:
+    """Worker : letterboxe un bloc d'images directement dans le .npy partagé."""
+    npy_path, start, paths, size = task
+    images = np.load(npy_path, mmap_mode="r+")
+    shapes = []
+    for i, path in enumerate(paths):
+        try:
+            images[start + i], shape = letterbox_image(path, size)
+        except OSError as e:
+            print(f" Image illisible {path} : {e}")
+            images[start + i] = PAD_VALUE
+            shape = (0, 0)
+        shapes.append(shape)
+    images.flush()
+    return shapes
+
+
+def sources_signature(paths: list[str], size: int) -> str:
+    """
+    Empreinte des images sources (nom, taille, date) et des paramètres du letterbox :
+    les images ne sont redécodées que si elle change.
+    """
+    digest = hashlib.blake2b(f"{size}:{PAD_VALUE}:bilinear".encode(), digest_size=16)
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def labels_signature(labels: np.ndarray, offsets: np.ndarray, size: int) -> str:
+    """Empreinte des labels YOLO du split (avant letterbox) : une annotation modifiée invalide les labels du cache."""
+    digest = hashlib.blake2b(f"{size}".encode(), digest_size=16)
+    digest.update(np.ascontiguousarray(labels, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(offsets, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+def cache_paths(split_dir: str | Path, size: int = IMAGE_SIZE) -> tuple[Path, Path]:
+    split_dir = Path(split_dir)
+    return split_dir / f"images_{size}.npy", split_dir / f"labels_{size}.npz"
+
+
+def build_letterbox_cache(images: list[dict], image_paths: list[str], annotations_per_image: dict,
+                          split_dir: str | Path, size: int = IMAGE_SIZE,
+                          workers: int = NUM_PROCESSES) -> tuple[Path, Path]:
+    """
+    Écrit images_<size>.npy (N, size, size, 3) et labels_<size>.npz pour un split.
+    Les images sont letterboxées par un pool de processus qui écrivent chacun
+    leur bloc dans le même fichier mémoire-mappé.
+    """
+    npy_path, labels_path = cache_paths(split_dir, size)
+    Path(split_dir).mkdir(parents=True, exist_ok=True)
+    signature = sources_signature(image_paths, size)
+    labels, offsets = build_split_labels(images, annotations_per_image)
+    label_signature = labels_signature(labels, offsets, size)
+    shapes = None
+    if npy_path.exists() and labels_path.exists():
+        with np.load(labels_path) as cache:
+            if str(cache['signature']) == signature:
+                if 'labels_signature' in cache.files and str(cache['labels_signature']) == label_signature:
+                    return npy_path, labels_path
+                shapes = cache['shapes'].astype(np.float64)  # images inchangées : seuls les labels sont refaits
+
+    if shapes is None:
+        tmp_path = npy_path.with_name(npy_path.stem + ".tmp.npy")
+        np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=(len(image_paths), size, size, 3)).flush()
+        tasks = [(str(tmp_path), start, image_paths[start:start + CHUNK_IMAGES], size)
+                 for start in range(0, len(image_paths), CHUNK_IMAGES)]
+        if workers == 1 or len(tasks) <= 1:
+            shapes = [shape for task in tasks for shape in _fill_chunk(task)]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                shapes = [shape for chunk in pool.map(_fill_chunk, tasks) for shape in chunk]
+        os.replace(tmp_path, npy_path)
+
+        # Dimensions réelles des fichiers ; celles du COCO pour les images illisibles
+        shapes = np.array(shapes, dtype=np.float64).reshape(-1, 2)
+        coco_shapes = np.array([(img['width'], img['height']) for img in images], dtype=np.float64).reshape(-1, 2)
+        shapes = np.where(shapes > 0, shapes, coco_shapes)
+
+    counts = np.diff(offsets)
+    boxed = letterbox_labels(labels, np.repeat(shapes[:, 0], counts), np.repeat(shapes[:, 1], counts), size)
+    np.savez(labels_path, files=np.array([os.path.basename(p) for p in image_paths], dtype=str),
+             labels=boxed.astype(np.float32), offsets=offsets, shapes=shapes.astype(np.int32),
+             signature=np.array(signature), labels_signature=np.array(label_signature))
+    return npy_path, labels_path
+
+
+def load_letterbox_cache(split_dir: str | Path, size: int = IMAGE_SIZE):
+    """Relit le cache d'un split : (images memory-map, noms, labels (M, 5), offsets, tailles d'origine)."""
+    npy_path, labels_path = cache_paths(split_dir, size)
+    with np.load(labels_path) as cache:
+        files, labels, offsets, shapes = (cache['files'].tolist(), cache['labels'],
+                                          cache['offsets'], cache['shapes'])
+    return np.load(npy_path, mmap_mode="r"), files, labels, offsets, shapes
+
+
+def build_split_caches(dataset_split: dict, file_index: dict, annotations_per_image: dict, output_dir,
+                       size: int = IMAGE_SIZE, workers: int = NUM_PROCESSES) -> dict:
+    """Construit le cache letterbox de chaque split dans output_dir/<split>/."""
+    caches = {}
+    for split, images in dataset_split.items():
+        found = [img for img in images if base_name_of(img['file_name']) in file_index]
+        paths = [file_index[base_name_of(img['file_name'])] for img in found]
+        caches[split] = build_letterbox_cache(found, paths, annotations_per_image,
+                                              Path(output_dir) / split, size, workers)
+        print(f"{split}: {len(found)} images letterboxées en {size}x{size} -> {caches[split][0].name}")
+    return caches
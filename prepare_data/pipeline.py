@@ -1,43 +1,71 @@
+from functools import lru_cache
 from pathlib import Path
-from prepare_data.data_loader import load_coco_json
-from prepare_data.data_explorer import annotations_per_image, images_without_annotations, images_per_category, bbox_stats
+from prepare_data.coco_dataset import CocoDataset
+from prepare_data.dataset_stats import DatasetStats
 from prepare_data.data_cleaner import get_file_extensions, get_images_without_annotations, detect_bbox_anomalies
+from prepare_data.image_scan import scan_images, check_dimensions
+from prepare_data.incremental import run_incremental
+from prepare_data.profiling import profile_stage
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 JSON_FILE = DATA_DIR / "_annotations.coco.json"
+LABELS_DIR = BASE_DIR / "labels"   # labels YOLO tenus à jour par incremental_cleaner
 
-def loader():
-    images_df, annotations_df, categories_df = load_coco_json(JSON_FILE)
+
+@lru_cache(maxsize=1)
+def _load_dataset(json_file: Path) -> CocoDataset:
+    return CocoDataset.from_json(json_file)
+
+def get_dataset(json_file: Path = JSON_FILE) -> CocoDataset:
+    """
+    Charge le dataset COCO une seule fois ; les appels suivants réutilisent le même objet.
+    Le chemin est normalisé : get_dataset() et get_dataset(JSON_FILE) partagent le même cache.
+    """
+    return _load_dataset(Path(json_file).resolve())
+
+@profile_stage("loader", rows=lambda result: len(result[0]) + len(result[1]))
+def loader(dataset: CocoDataset | None = None):
+    if dataset is None:
+        dataset = get_dataset()
+    images_df, annotations_df, categories_df = dataset.frames()
 
     return images_df, annotations_df, categories_df
 
-def explorer():
-    images_df, annotations_df, categories_df = loader()
-    ann_per_img = annotations_per_image(annotations_df)
+@profile_stage("explorer", rows=lambda result: int(result[0]["num_annotations"].sum()))
+def explorer(dataset: CocoDataset | None = None):
+    if dataset is None:
+        dataset = get_dataset()
+    # Un seul passage sur les annotations pour toutes les statistiques (pas de jointure)
+    stats = DatasetStats.from_dataset(dataset)
+    ann_per_img = stats.annotations_per_image()
     #print(ann_per_img)
 
-    img_no_ann = images_without_annotations(images_df, annotations_df)
+    images_df = dataset.images_df
+    img_no_ann = images_df[images_df['id'].isin(stats.images_without_annotations())]
     #print(img_no_ann)
 
 
-    img_per_category = images_per_category(annotations_df, categories_df)
+    img_per_category = stats.images_per_category()
     #print(img_per_category)
 
 
-    box_stats = bbox_stats(annotations_df)
+    box_stats = stats.bbox_stats()
     #print(box_stats)
     return ann_per_img, img_no_ann, img_per_category, box_stats
 
-def cleaner():
+@profile_stage("cleaner", rows=lambda result: sum(result[0].values()))
+def cleaner(dataset: CocoDataset | None = None):
+    if dataset is None:
+        dataset = get_dataset()
     clean = get_file_extensions(DATA_DIR)
     # print(clean)
 
-    
-    filter_imgs_without_ann = get_images_without_annotations(DATA_DIR, JSON_FILE)
+
+    filter_imgs_without_ann = get_images_without_annotations(DATA_DIR, dataset)
     #print(f" list of images without annotation: {filter_imgs_without_ann}")
 
-    images_df, annotations_df, categories_df = loader()
+    annotations_df = dataset.annotations_df
     detect_box_annom = detect_bbox_anomalies(annotations_df)
     #print(f" Détecte les BBoxes aberrantes{detect_box_annom}")
 
@@ -45,6 +73,26 @@ def cleaner():
 
     return clean, filter_imgs_without_ann, detect_box_annom
 
-
-
-
+@profile_stage("scanner", rows=lambda result: len(result[0]))
+def scanner(dataset: CocoDataset | None = None):
+    if dataset is None:
+        dataset = get_dataset()
+    # Lecture des en-têtes uniquement (pas de décodage des images)
+    scan_df = scan_images(DATA_DIR)
+    #print(scan_df)
+
+    dimension_issues = check_dimensions(scan_df, dataset.images_df)
+    #print(f" Images aux dimensions incohérentes ou corrompues {dimension_issues}")
+
+    return scan_df, dimension_issues
+
+@profile_stage("incremental_cleaner",
+               rows=lambda result: len(result["added"]) + len(result["changed"]) + len(result["removed"]))
+def incremental_cleaner(dataset: CocoDataset | None = None, labels_dir: Path | None = LABELS_DIR):
+    if dataset is None:
+        dataset = get_dataset()
+    # Seules les images nouvelles / modifiées / supprimées depuis le dernier passage sont traitées
+    delta = run_incremental(dataset, DATA_DIR, labels_dir=labels_dir)
+    #print(f" ajoutées {len(delta['added'])}, modifiées {len(delta['changed'])}, supprimées {len(delta['removed'])}")
+
+    return delta
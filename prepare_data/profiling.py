@@ -0,0 +1,135 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = BASE_DIR / "data"
+REPORT_FILE = DATA_DIR / "pipeline_metrics.json"
+
+# Profilage détaillé par étape, ex. PREPARE_DATA_PROFILE="loader:cprofile,explorer:tracemalloc"
+PROFILE_ENV = "PREPARE_DATA_PROFILE"
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+# Mesures des étapes exécutées depuis le début du processus
+_stage_metrics = []
+_enabled_hooks = {}
+
+
+def enable_profiling(stage: str, mode: str):
+    """Active un profilage détaillé (cprofile ou tracemalloc) pour une étape."""
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Mode de profilage inconnu : {mode}")
+    _enabled_hooks.setdefault(stage, set()).add(mode)
+
+
+def _hooks_for(stage: str) -> set:
+    hooks = set(_enabled_hooks.get(stage, ()))
+    for item in os.environ.get(PROFILE_ENV, "").split(","):
+        name, _, mode = item.strip().partition(":")
+        if name in (stage, "*") and mode in PROFILE_MODES:
+            hooks.add(mode)
+    return hooks
+
+
+def _peak_rss_mb() -> float | None:
+    """Pic de mémoire résidente du processus depuis son démarrage (en Mo), pas celui d'une étape."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets sous Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def profile_stage(name: str, rows=None):
+    """
+    Décorateur qui mesure une étape du pipeline : temps réel, temps CPU, mémoire
+    résidente et nombre de lignes traitées (rows(result) si fourni).
+    process_peak_rss_mb est le pic du processus depuis son démarrage ;
+    peak_rss_increase_mb est de combien l'étape a relevé ce pic (0 si elle est restée
+    sous le pic d'une étape précédente). Pour le pic propre à une étape, activer tracemalloc.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            hooks = _hooks_for(name)
+            profiler = cProfile.Profile() if "cprofile" in hooks else None
+            # On n'arrête tracemalloc que si cet appel l'a démarré
+            trace = "tracemalloc" in hooks and not tracemalloc.is_tracing()
+            rss_before = _peak_rss_mb()
+            metrics = {"stage": name}
+            if trace:
+                tracemalloc.start()
+            try:
+                wall_start, cpu_start = time.perf_counter(), time.process_time()
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                    metrics["wall_time_s"] = round(time.perf_counter() - wall_start, 6)
+                    metrics["cpu_time_s"] = round(time.process_time() - cpu_start, 6)
+                if trace:
+                    metrics["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 3)
+            finally:
+                if trace:
+                    tracemalloc.stop()
+
+            rss_after = _peak_rss_mb()
+            metrics.update({
+                "process_peak_rss_mb": rss_after,
+                "peak_rss_increase_mb": round(rss_after - rss_before, 3) if rss_before is not None else None,
+                "rows": rows(result) if rows is not None else None,
+            })
+            if profiler is not None:
+                metrics["profiler"] = profiler
+            _stage_metrics.append(metrics)
+            return result
+        return wrapper
+    return decorator
+
+
+def stage_metrics() -> list[dict]:
+    """Mesures collectées (sans les objets cProfile)."""
+    return [{k: v for k, v in m.items() if k != "profiler"} for m in _stage_metrics]
+
+
+def reset_metrics():
+    _stage_metrics.clear()
+
+
+def write_report(report_path: str | Path = REPORT_FILE) -> Path:
+    """
+    Écrit les mesures au format JSON. Les profils cProfile sont enregistrés
+    à côté du rapport (<stage>.prof, lisibles avec pstats ou snakeviz).
+    """
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    stages = []
+    for i, metrics in enumerate(_stage_metrics):
+        entry = {k: v for k, v in metrics.items() if k != "profiler"}
+        if "profiler" in metrics:
+            prof_path = report_path.with_name(f"{report_path.stem}_{i}_{metrics['stage']}.prof")
+            metrics["profiler"].dump_stats(prof_path)
+            entry["profile_file"] = prof_path.name
+        stages.append(entry)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "total_wall_time_s": round(sum(s["wall_time_s"] for s in stages), 6),
+        "stages": stages,
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report_path
@@ -0,0 +1,205 @@
+"""
+Export d'un split en shards tar (format WebDataset) avec un index d'offsets.
+
+    python prepare_data/data_preparation.py --shards
+
+Chaque échantillon <clé> est stocké dans un shard sous la forme <clé>.jpg + <clé>.txt
+(label YOLO). Les shards sont des tar non compressés lus séquentiellement
+(iter_shards) ; l'index <split>.index.npz donne pour chaque échantillon le shard,
+l'offset et la taille des données : ShardReader y accède en O(1) sans parcourir le tar.
+"""
+import io
+import os
+import tarfile
+from pathlib import Path
+
+import numpy as np
+
+from prepare_data.data_preparation import base_name_of, build_split_labels, format_labels
+
+
+SHARD_MAX_BYTES = 512 * 1024 * 1024   # taille cible d'un shard
+SHARD_MAX_SAMPLES = 10_000            # nombre max d'échantillons par shard
+SHARDS_DIR = "shards"
+READ_SIZE = 1 << 22                   # lecture séquentielle par blocs de 4 Mo
+
+
+def sample_key(file_name: str) -> str:
+    """Clé WebDataset : le nom sans extension, sans point (le point sépare la clé de l'extension)."""
+    return Path(file_name).stem.replace(".", "_")
+
+
+def shard_name(split: str, number: int) -> str:
+    return f"{split}-{number:06d}.tar"
+
+
+def index_path(shards_dir: str | Path, split: str) -> Path:
+    return Path(shards_dir) / f"{split}.index.npz"
+
+
+# === Écriture ===
+
+def _add_member(tar: tarfile.TarFile, name: str, fileobj, size: int) -> int:
+    """Ajoute un membre au tar et renvoie l'offset de ses données dans le fichier."""
+    info = tarfile.TarInfo(name)
+    info.size = size
+    info.mode = 0o444
+    info.mtime = 0  # shards identiques d'un export à l'autre
+    tar.addfile(info, fileobj)
+    # addfile() travaille sur une copie de info : on déduit l'offset de la fin du membre
+    padded = -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+    return tar.offset - padded
+
+
+def write_shards(samples, shards_dir: str | Path, split: str,
+                 max_bytes: int = SHARD_MAX_BYTES, max_samples: int = SHARD_MAX_SAMPLES) -> Path:
+    """
+    Écrit les échantillons (nom du fichier image, chemin de l'image, texte du label) dans
+    des shards <split>-NNNNNN.tar et leur index. Retourne le chemin de l'index.
+    """
+    shards_dir = Path(shards_dir)
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    keys, file_names, shard_ids = [], [], []
+    offsets = []  # (offset image, taille image, offset label, taille label)
+    seen = set()
+    tar, shard_bytes, shard_samples, number = None, 0, 0, -1
+
+    try:
+        for file_name, image_path, label_text in samples:
+            key = sample_key(file_name)
+            if key in seen:
+                raise ValueError(f"Clé en double dans le split {split} : {key} ({file_name})")
+            seen.add(key)
+            image_size = os.path.getsize(image_path)
+            label_bytes = label_text.encode()
+
+            full = shard_samples >= max_samples or (shard_samples and shard_bytes + image_size > max_bytes)
+            if tar is None or full:
+                if tar is not None:
+                    tar.close()
+                number += 1
+                tar = tarfile.open(shards_dir / shard_name(split, number), "w")
+                shard_bytes, shard_samples = 0, 0
+
+            with open(image_path, "rb") as f:
+                image_offset = _add_member(tar, key + Path(file_name).suffix.lower(), f, image_size)
+            label_offset = _add_member(tar, key + ".txt", io.BytesIO(label_bytes), len(label_bytes))
+            shard_bytes += image_size + len(label_bytes) + 2 * tarfile.BLOCKSIZE
+            shard_samples += 1
+
+            keys.append(key)
+            file_names.append(file_name)
+            shard_ids.append(number)
+            offsets.append((image_offset, image_size, label_offset, len(label_bytes)))
+    finally:
+        if tar is not None:
+            tar.close()
+
+    # Shards d'un export précédent devenus inutiles
+    stale = number + 1
+    while (shards_dir / shard_name(split, stale)).exists():
+        (shards_dir / shard_name(split, stale)).unlink()
+        stale += 1
+
+    path = index_path(shards_dir, split)
+    tmp_path = path.with_name(path.name + ".tmp.npz")
+    np.savez(tmp_path,
+             keys=np.array(keys, dtype=str),
+             file_names=np.array(file_names, dtype=str),
+             shards=np.array([shard_name(split, n) for n in range(number + 1)], dtype=str),
+             shard_ids=np.array(shard_ids, dtype=np.int32),
+             offsets=np.array(offsets, dtype=np.int64).reshape(-1, 4))
+    os.replace(tmp_path, path)
+    return path
+
+
+def export_shards(dataset_split, file_index, annotations_per_image, output_dir,
+                  max_bytes: int = SHARD_MAX_BYTES, max_samples: int = SHARD_MAX_SAMPLES) -> dict:
+    """Exporte chaque split en shards dans output_dir/shards ; retourne {split: chemin de l'index}."""
+    shards_dir = Path(output_dir) / SHARDS_DIR
+    indexes = {}
+    for split, images in dataset_split.items():
+        found = [(img, file_index[base_name_of(img['file_name'])]) for img in images
+                 if base_name_of(img['file_name']) in file_index]
+        labels, offsets = build_split_labels([img for img, _ in found], annotations_per_image)
+        samples = ((os.path.basename(path), path, text)
+                   for (_, path), text in zip(found, format_labels(labels, offsets)))
+        indexes[split] = write_shards(samples, shards_dir, split, max_bytes, max_samples)
+        print(f"{split}: {len(found)} images -> {indexes[split].name}")
+    return indexes
+
+
+# === Lecture ===
+
+def parse_label(label_text: str) -> np.ndarray:
+    """Texte d'un label YOLO -> tableau (N, 5) [classe, xc, yc, w, h]."""
+    return np.array(label_text.split(), dtype=np.float32).reshape(-1, 5)
+
+
+def iter_shards(shards_dir: str | Path, split: str):
+    """
+    Lecture séquentielle des shards d'un split : (clé, octets de l'image, texte du label).
+    Chaque tar est lu d'un bout à l'autre en mode flux, sans accès aléatoire.
+    """
+    with np.load(index_path(shards_dir, split)) as index:
+        shards = index['shards'].tolist()
+    for name in shards:
+        with open(Path(shards_dir) / name, "rb", buffering=READ_SIZE) as f, \
+                tarfile.open(fileobj=f, mode="r|") as tar:
+            key, image = None, None
+            for member in tar:
+                member_key, _, extension = member.name.partition(".")
+                data = tar.extractfile(member).read()
+                if extension != "txt":
+                    key, image = member_key, data
+                elif member_key == key:
+                    yield key, image, data.decode()
+
+
+class ShardReader:
+    """Accès aléatoire en O(1) aux échantillons d'un split via l'index d'offsets."""
+
+    def __init__(self, shards_dir: str | Path, split: str):
+        self.shards_dir = Path(shards_dir)
+        with np.load(index_path(shards_dir, split)) as index:
+            self.keys = index['keys']
+            self.file_names = index['file_names']
+            self.shards = index['shards'].tolist()
+            self.shard_ids = index['shard_ids']
+            self.offsets = index['offsets']
+        self._positions = {key: i for i, key in enumerate(self.keys.tolist())}
+        self._fds = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _read(self, shard_id: int, offset: int, size: int) -> bytes:
+        fd = self._fds.get(shard_id)
+        if fd is None:
+            flags = os.O_RDONLY | getattr(os, "O_BINARY", 0)
+            fd = self._fds[shard_id] = os.open(self.shards_dir / self.shards[shard_id], flags)
+        if hasattr(os, "pread"):
+            return os.pread(fd, size, offset)
+        os.lseek(fd, offset, os.SEEK_SET)  # Windows : pas de pread
+        return os.read(fd, size)
+
+    def __getitem__(self, i: int) -> tuple[str, bytes, str]:
+        """Échantillon i : (nom du fichier image, octets de l'image, texte du label)."""
+        shard_id = int(self.shard_ids[i])
+        image_offset, image_size, label_offset, label_size = self.offsets[i].tolist()
+        return (str(self.file_names[i]), self._read(shard_id, image_offset, image_size),
+                self._read(shard_id, label_offset, label_size).decode())
+
+    def get(self, file_name: str) -> tuple[str, bytes, str]:
+        return self[self._positions[sample_key(file_name)]]
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,72 @@
+import json
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+
+def generate_coco(n_images: int, boxes_per_image: float = 3.0, n_categories: int = 2,
+                  image_size: tuple[int, int] = (640, 640), invalid_fraction: float = 0.01,
+                  empty_fraction: float = 0.05, seed: int = 0) -> dict:
+    """
+    Génère un jeu COCO synthétique reproductible (même seed => même contenu).
+    Le nombre de boxes par image suit une loi de Poisson ; une fraction des images
+    n'a aucune annotation et une fraction des boxes est invalide (largeur nulle
+    ou hors de l'image), pour exercer les fonctions de nettoyage.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = image_size
+
+    counts = rng.poisson(boxes_per_image, size=n_images)
+    counts[rng.random(n_images) < empty_fraction] = 0
+    n_boxes = int(counts.sum())
+    image_ids = np.repeat(np.arange(n_images), counts)
+
+    w = rng.uniform(4, width / 4, size=n_boxes).round(1)
+    h = rng.uniform(4, height / 4, size=n_boxes).round(1)
+    x = (rng.random(n_boxes) * (width - w)).round(1)
+    y = (rng.random(n_boxes) * (height - h)).round(1)
+    invalid = rng.random(n_boxes) < invalid_fraction
+    w[invalid & (rng.random(n_boxes) < 0.5)] = 0
+    x[invalid] += width / 2
+    category_ids = rng.integers(1, n_categories + 1, size=n_boxes)
+    hashes = rng.integers(0, 16 ** 8, size=n_images)
+
+    images = [
+        {"id": i, "license": 1, "file_name": f"tile{i:07d}_jpg.rf.{hashes[i]:08x}.jpg",
+         "height": height, "width": width, "date_captured": "2024-01-01T00:00:00+00:00"}
+        for i in range(n_images)
+    ]
+    annotations = [
+        {"id": k, "image_id": img_id, "category_id": cat, "bbox": [bx, by, bw, bh],
+         "area": round(bw * bh, 2), "segmentation": [], "iscrowd": 0}
+        for k, (img_id, cat, bx, by, bw, bh) in enumerate(zip(
+            image_ids.tolist(), category_ids.tolist(), x.tolist(), y.tolist(), w.tolist(), h.tolist()))
+    ]
+    categories = [{"id": 0, "name": "fires", "supercategory": "none"}] + [
+        {"id": c, "name": f"fire_{c}", "supercategory": "fires"} for c in range(1, n_categories + 1)
+    ]
+    return {"images": images, "annotations": annotations, "categories": categories}
+
+
+def write_synthetic_dataset(out_dir: str | Path, n_images: int, write_images: bool = False,
+                            pixels: tuple[int, int] = (8, 8), seed: int = 0, **kwargs) -> Path:
+    """
+    Écrit un dossier au format Roboflow : _annotations.coco.json et, si demandé,
+    une petite image JPEG par entrée (pixels = taille réelle des fichiers).
+    Retourne le chemin du fichier JSON.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    coco = generate_coco(n_images, seed=seed, **kwargs)
+    json_file = out_dir / "_annotations.coco.json"
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(coco, f)
+
+    if write_images:
+        rng = np.random.default_rng(seed)
+        base = rng.integers(0, 256, size=(pixels[1], pixels[0], 3), dtype=np.uint8)
+        for img in coco["images"]:
+            tile = np.roll(base, img["id"], axis=1)
+            Image.fromarray(tile).save(out_dir / img["file_name"], quality=75)
+    return json_file